@@ -34,7 +34,22 @@ def main():
     import time
     import optparse
 
-    usage = "usage: %prog [options] [file.js]"
+    if sys.argv[1:2] == ['profile']:
+        from .profiler import main as profile
+        return profile(sys.argv[2:])
+
+    if sys.argv[1:2] == ['graph']:
+        from .graph import main as graph
+        return graph(sys.argv[2:])
+
+    if sys.argv[1:2] == ['duplicates']:
+        from .duplicates import main as duplicates
+        return duplicates(sys.argv[2:])
+
+    usage = (
+        "usage: %prog [options] [file.js]\n       %prog profile [options] file.js|directory...\n"
+        "       %prog graph [options] directory\n       %prog duplicates [options] directory"
+    )
     parser = optparse.OptionParser(usage=usage, version=version)
     parser.add_option("--comment", dest="comment",
                       action="store_true", default=False,
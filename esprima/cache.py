@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals, division
+
+import gc
+import sys
+import pickle
+import threading
+from collections import OrderedDict
+
+from .compat import basestring
+from .nodes import Node
+from .objects import Array, Object
+from .scanner import Position, SourceLocation
+
+# Bodies shorter than this are parsed faster than they are looked up.
+MIN_LENGTH = 256
+
+# Options of parse() which do not change the tree.
+NEUTRAL_OPTIONS = ('workers', 'shared', 'bodyCache')
+
+
+class CachedBody(Object):
+    """The statements of a function body, as parsed from `open`, the offset
+    of its opening brace, at `line` and `column`, with what the parser goes
+    on with after the closing brace: the line and column of the brace, the
+    cover grammar flags and whether some statement is parsed differently in
+    strict mode."""
+
+    def __init__(self, statements, open, line, column, closeLine, closeColumn, flags, sensitive):
+        self.statements = statements
+        self.open = open
+        self.line = line
+        self.column = column
+        self.closeLine = closeLine
+        self.closeColumn = closeColumn
+        self.flags = flags
+        self.sensitive = sensitive
+
+
+class Relocation(object):
+    """Copies subtrees parsed at one offset, moving their ranges and locations
+    `delta` characters and `lineDelta` lines further. The positions on
+    `line`, where the subtree starts, move `columnDelta` columns too."""
+
+    def __init__(self, delta, line=None, lineDelta=0, columnDelta=0):
+        self.delta = delta
+        self.line = line
+        self.lineDelta = lineDelta
+        self.columnDelta = columnDelta
+
+    def position(self, position, skewed=False):
+        line = position.line
+        column = position.column
+        if skewed:
+            # Counted from a later line, in the subtree too (see Shift).
+            if column >= 0:
+                column += self.delta
+        elif line == self.line:
+            column += self.columnDelta
+        return Position(line + self.lineDelta, column)
+
+    def subtree(self, value):
+        # Collecting while copying would take longer than copying, as the
+        # copies are only new objects.
+        collect = gc.isenabled()
+        gc.disable()
+        try:
+            return self.copy(value)
+        finally:
+            if collect:
+                gc.enable()
+
+    def copy(self, value):
+        if value.__class__ is list:
+            copy = self.copy
+            return [None if item is None else copy(item) for item in value]
+        # The other objects too, as the values of template elements and the
+        # patterns of regular expressions, not to be shared with the cache.
+        if not isinstance(value, Object):
+            return value
+
+        node = value.__class__.__new__(value.__class__)
+        node.__dict__ = attributes = value.__dict__.copy()
+        for key, item in attributes.items():
+            if item.__class__ is list:
+                if key == 'range':
+                    start, end = item
+                    attributes[key] = [start + self.delta, end + self.delta]
+                else:
+                    attributes[key] = self.copy(item)
+            elif isinstance(item, Object) and key != 'loc':
+                attributes[key] = self.copy(item)
+
+        loc = attributes.get('loc')
+        if loc is not None:
+            attributes['loc'] = SourceLocation(
+                self.position(loc.start, '_skewed' in attributes), self.position(loc.end), loc.source,
+            )
+        return node
+
+
+class BodyCache(Object):
+    """Function bodies parsed before, for parse() to reuse across the sources
+    it is given with the `bodyCache` option, as files embedding the same
+    functions verbatim.
+
+    Bodies of at least `minLength` characters are looked up by their text,
+    from brace to brace, as matched by skeleton(), and by what their parse
+    depends on: the options and the strictness and kind of the function.
+    On a hit the parser skips the body and takes a copy of its statements,
+    moved to where the body is. A body is kept from the second time it is
+    parsed, as copying every body would cost about half as much as parsing
+    it. Holds up to `maxsize` bodies, and the hashes of as many bodies seen
+    once, the least recently used being dropped first. `hits` and `misses`
+    count the lookups.
+
+    Bodies are parsed as usual when tokens or comments are collected, with
+    a delegate or a node factory, or with locations but no ranges."""
+
+    def __init__(self, maxsize=1024, minLength=MIN_LENGTH):
+        self.maxsize = maxsize
+        self.minLength = minLength
+        self.entries = OrderedDict()
+        self.seen = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries[key] = entry
+        self.hits += 1
+        return entry
+
+    def wants(self, key):
+        """Whether a body missed is to be put, having been seen before."""
+        seen = self.seen
+        digest = hash(key)
+        if seen.pop(digest, False):
+            return True
+        seen[digest] = True
+        while len(seen) > self.maxsize:
+            seen.popitem(last=False)
+        return False
+
+    def put(self, key, entry):
+        entries = self.entries
+        entries.pop(key, None)
+        entries[key] = entry
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.seen.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def optionsKey(options):
+    """The options of parse() as a tuple, told apart only by what changes
+    the tree: the presets are expanded and the defaults left out."""
+
+    options = dict(options)
+    if options.pop('esnext', False):
+        options['jsx'] = True
+        options['classProperties'] = True
+    if options.get('sourceType') == 'script':
+        del options['sourceType']
+    return tuple(sorted(
+        (name, value) for name, value in options.items()
+        if name not in NEUTRAL_OPTIONS and value is not None and value is not False
+    ))
+
+
+class Frozen(object):
+    """Mixin of the read-only copies of the classes of a frozen tree."""
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Cannot set %r of a frozen %s" % (name, self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("Cannot delete %r of a frozen %s" % (name, self.__class__.__name__))
+
+    # Pickled, and copied, as not frozen.
+    def __reduce__(self):
+        return thaw, (self.__class__.__bases__[1], self.__dict__)
+
+
+def thaw(cls, attributes):
+    obj = cls.__new__(cls)
+    obj.__dict__.update(attributes)
+    return obj
+
+
+class FrozenArray(Array):
+    def frozen(self, *args):
+        raise TypeError("Cannot change a frozen list")
+
+    append = extend = insert = pop = remove = reverse = sort = clear = frozen
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = frozen
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+# Read-only copies of the classes, named alike for the visitors.
+frozenClasses = {}
+
+
+def freeze(tree):
+    """Makes the objects of `tree` and their lists read-only. Returns an
+    estimate of the memory they take, in bytes."""
+
+    getsizeof = sys.getsizeof
+    size = 0
+    stack = [tree]
+    while stack:
+        obj = stack.pop()
+        if not isinstance(obj, Object):
+            if isinstance(obj, (basestring, dict)):
+                size += getsizeof(obj)
+            continue
+        if isinstance(obj, Frozen):
+            continue
+        attributes = obj.__dict__
+        size += getsizeof(obj) + getsizeof(attributes)
+        for key, value in list(attributes.items()):
+            if isinstance(value, list):
+                if not isinstance(value, FrozenArray):
+                    value = attributes[key] = FrozenArray(value)
+                size += getsizeof(value)
+                stack.extend(value)
+            elif key == '_span':
+                # The range and loc of a compact location are built anew.
+                attributes[key] = value & ~1
+            else:
+                stack.append(value)
+
+        cls = obj.__class__
+        frozen = frozenClasses.get(cls)
+        if frozen is None:
+            frozen = frozenClasses[cls] = type(cls.__name__, (Frozen, cls), {})
+        object.__setattr__(obj, '__class__', frozen)
+
+    return size
+
+
+class ParseCache(Object):
+    """Trees returned by parse(), by source and options, for sources parsed
+    over and over, as the snippets of a template.
+
+    Holds up to `maxsize` trees and, with `maxbytes`, up to that many bytes
+    of them, the least recently used being dropped first. The trees are kept
+    pickled, each hit returning a copy of its own. With `frozen`, they are
+    kept as they are, shared by the hits and made read-only: setting an
+    attribute of an object of the tree raises AttributeError, changing one
+    of its lists TypeError; their size is then estimated. Sources with
+    errors are parsed every time, those tolerated included.
+
+    `hits`, `misses` and `evictions` count the lookups and the trees
+    dropped, `size` is the bytes held. A cache can be shared by threads,
+    two of them missing the same source both parsing it."""
+
+    def __init__(self, maxsize=256, maxbytes=None, frozen=False):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.frozen = frozen
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (tree or pickle, size), by key
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def parse(self, code, options=None, delegate=None, **kwargs):
+        """Parses as parse() does, or returns the tree cached for the same
+        source and options. Trees parsed with a delegate are not cached."""
+
+        from .esprima import parse
+
+        options = {} if options is None else options.copy()
+        options.update(kwargs)
+        if delegate is not None:
+            return parse(code, options, delegate)
+
+        key = (code, optionsKey(options))
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.entries[key] = entry
+                self.hits += 1
+        if entry is not None:
+            return entry[0] if self.frozen else pickle.loads(entry[0])
+
+        tree = parse(code, options)
+        if tree.errors:
+            # Tolerated errors.
+            return tree
+        if self.frozen:
+            entry = (tree, freeze(tree))
+        else:
+            value = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+            entry = (value, len(value))
+        self.put(key, entry)
+        return tree
+
+    def put(self, key, entry):
+        maxbytes = self.maxbytes
+        if maxbytes is not None and entry[1] > maxbytes:
+            return
+        with self.lock:
+            entries = self.entries
+            previous = entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            entries[key] = entry
+            self.size += entry[1]
+            while len(entries) > self.maxsize or (maxbytes is not None and self.size > maxbytes):
+                _, (_, size) = entries.popitem(last=False)
+                self.size -= size
+                self.evictions += 1
+
+    def hitRate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
@@ -82,7 +82,7 @@ HEX_DIGIT = set(HEX_CONV.keys())
 
 del U_CATEGORIES, UNICODE_LETTER, UNICODE_COMBINING_MARK
 del UNICODE_DIGIT, UNICODE_CONNECTOR_PUNCTUATION
-del DECIMAL_CONV, OCTAL_CONV, HEX_CONV
+del DECIMAL_CONV
 
 class Character:
     @staticmethod
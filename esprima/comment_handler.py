@@ -148,7 +148,11 @@ class CommentHandler(object):
         )
         if node.range:
             comment.range = node.range
-        if node.loc:
+        if node._lines:
+            # Derived from the range when read.
+            del comment.loc
+            comment._lines = node._lines
+        elif node.loc:
             comment.loc = node.loc
         self.comments.append(comment)
 
@@ -161,7 +165,10 @@ class CommentHandler(object):
                 ),
                 start=metadata.start.offset
             )
-            if node.loc:
+            if node._lines:
+                del entry.comment.loc
+                entry.comment._lines = node._lines
+            elif node.loc:
                 entry.comment.loc = node.loc
             node.type = type
             self.leading.append(entry)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+from bisect import bisect
+
+from .incremental import columnOf, countLines
+from .nodes import BlockStatement, ClassBody
+from .objects import Object
+from .parser import Parser
+from .skeleton import skeleton, BLANKS
+from .syntax import Syntax
+from .token import Token
+
+CANDIDATE = re.compile(r'(?<![\w$.])(import|export|require)(?![\w$])', re.UNICODE)
+SKIP_BLANKS = re.compile(r'[%s]*' % BLANKS)
+
+
+class Specifier(Object):
+    """A name bound by an import (`imported` as `local`) or an export
+    (`local` as `exported`). Namespace imports and defaults are `*` and
+    `default`."""
+
+    def __init__(self, local=None, imported=None, exported=None):
+        self.local = local
+        self.imported = imported
+        self.exported = exported
+
+
+class Dependency(Object):
+    """An import or export declaration, an `import()` or a `require()` call.
+    `type` is the declaration's node type, or ImportCall or RequireCall.
+    `source` is the module specifier, None for an `import()` of anything but
+    a string, and `sourceRange` its string literal."""
+
+    def __init__(self, type, source, range, sourceRange, specifiers):
+        self.type = type
+        self.source = source
+        self.range = range
+        self.sourceRange = sourceRange
+        self.specifiers = specifiers
+
+
+class SkimParser(Parser):
+    """Parser skipping the bodies of functions and classes, whose matching
+    braces are known beforehand."""
+
+    def __init__(self, code, closing, options=None):
+        super(SkimParser, self).__init__(code, options=options)
+        self.closing = closing
+
+    # Parses `{`, then resumes at the matching `}`. Returns False if the
+    # brace is not known.
+    def skipBlock(self):
+        close = self.closing.get(self.lookahead.start, -1)
+        if close < 0 or self.lookaheadBuffer or not self.match('{'):
+            return False
+        scanner = self.scanner
+        curlyStack = list(scanner.curlyStack)
+        self.nextToken()
+        scanner.lineNumber += countLines(scanner.source, scanner.index, close)
+        scanner.lineStart = close - columnOf(scanner.source, close, scanner.lineStart)
+        scanner.index = close
+        scanner.curlyStack = curlyStack
+        self.nextToken()
+        self.expect('}')
+        return True
+
+    def parseFunctionSourceElements(self):
+        node = self.createNode()
+        if not self.skipBlock():
+            return super(SkimParser, self).parseFunctionSourceElements()
+        return self.finalize(node, BlockStatement([]))
+
+    def parseClassBody(self):
+        node = self.createNode()
+        if not self.skipBlock():
+            return super(SkimParser, self).parseClassBody()
+        return self.finalize(node, ClassBody([]))
+
+
+def boundNames(pattern, names):
+    type = pattern.type
+    if type is Syntax.Identifier:
+        names.append(pattern.name)
+    elif type is Syntax.ObjectPattern:
+        for property in pattern.properties:
+            boundNames(property.argument if property.type is Syntax.RestElement else property.value, names)
+    elif type is Syntax.ArrayPattern:
+        for element in pattern.elements:
+            if element is not None:
+                boundNames(element, names)
+    elif type is Syntax.RestElement:
+        boundNames(pattern.argument, names)
+    elif type is Syntax.AssignmentPattern:
+        boundNames(pattern.left, names)
+    return names
+
+
+def declarationDependency(node):
+    type = node.type
+    specifiers = []
+    if type is Syntax.ImportDeclaration:
+        for specifier in node.specifiers:
+            if specifier.type is Syntax.ImportDefaultSpecifier:
+                imported = 'default'
+            elif specifier.type is Syntax.ImportNamespaceSpecifier:
+                imported = '*'
+            else:
+                imported = specifier.imported.name
+            specifiers.append(Specifier(local=specifier.local.name, imported=imported))
+    elif type is Syntax.ExportDefaultDeclaration:
+        id = node.declaration.id if node.declaration.type in (Syntax.FunctionDeclaration, Syntax.ClassDeclaration) else None
+        specifiers.append(Specifier(local=id.name if id else None, exported='default'))
+    elif type is Syntax.ExportNamedDeclaration:
+        declaration = node.declaration
+        if declaration is None:
+            for specifier in node.specifiers:
+                specifiers.append(Specifier(local=specifier.local.name, exported=specifier.exported.name))
+        else:
+            if declaration.type is Syntax.VariableDeclaration:
+                names = []
+                for declarator in declaration.declarations:
+                    boundNames(declarator.id, names)
+            else:
+                names = [declaration.id.name]
+            for name in names:
+                specifiers.append(Specifier(local=name, exported=name))
+    source = node.source
+    return Dependency(
+        type, source.value if source else None, node.range, source.range if source else None, specifiers,
+    )
+
+
+def extractDependencies(code, sourceType='module'):
+    """Finds the import and export declarations and the `import()` and
+    `require()` calls in `code`, without parsing the rest of it: the
+    literals and brackets are found by skeleton(), declarations are parsed
+    skipping the function and class bodies in them, and only the string
+    argument of calls is read. Returns the dependencies in source order.
+    Import and export declarations are only looked for in modules."""
+
+    isModule = sourceType == 'module'
+    structure = skeleton(code)
+    spans = structure.spans
+    brackets = structure.brackets
+    starts = spans[1::3]
+    closing = dict(structure.pairs())
+
+    parser = SkimParser(code, closing, options={'range': True})
+    if isModule:
+        parser.context.strict = True
+        parser.context.isModule = True
+        parser.scanner.isModule = True
+    scanner = parser.scanner
+
+    dependencies = []
+    line = 1
+    lineStart = index = 0
+    stack = []  # closing offsets of the brackets around the candidate
+    bracket = 0
+    for m in CANDIDATE.finditer(code):
+        start = m.start()
+        # Skip the words in literals and comments.
+        i = bisect(starts, start) - 1
+        if i >= 0 and spans[3 * i + 2] > start:
+            continue
+
+        word = m.group(1)
+        after = SKIP_BLANKS.match(code, m.end()).end()
+        next = code[after:after + 1]
+
+        if word == 'require' or next == '(':
+            if next != '(':
+                continue
+            scanner.index = after + 1
+            scanner.curlyStack = []
+            scanner.scanComments()
+            if scanner.eof():
+                continue
+            token = scanner.lex()
+            if token.type is Token.StringLiteral:
+                scanner.scanComments()
+                if scanner.source.startswith(')', scanner.index):
+                    dependencies.append(Dependency(
+                        'RequireCall' if word == 'require' else 'ImportCall', token.value,
+                        [start, scanner.index + 1], [token.start, token.end], [],
+                    ))
+                    continue
+            if word == 'import':
+                dependencies.append(Dependency('ImportCall', None, [start, closing.get(after, -1) + 1], None, []))
+            continue
+
+        if not isModule or next == '.':
+            continue
+
+        # Declarations are only found out of any bracket.
+        while bracket < len(brackets) and brackets[bracket] < start:
+            while stack and stack[-1] < brackets[bracket]:
+                stack.pop()
+            close = brackets[bracket + 1]
+            stack.append(close if close >= 0 else len(code))
+            bracket += 2
+        while stack and stack[-1] < start:
+            stack.pop()
+        if stack:
+            continue
+
+        line += countLines(code, index, start)
+        lineStart = start - columnOf(code, start, lineStart)
+        index = start
+        parser.moveTo(start, line, lineStart)
+        dependencies.append(declarationDependency(parser.parseStatementListItem()))
+
+    return dependencies
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals, print_function
+
+import os
+import json
+
+from .error_handler import Error
+from .graph import EXTENSIONS, MIN_POOL, iterFiles
+from .hashing import structuralHash
+from .nodes import Node
+from .objects import Object
+from . import version
+
+# Functions and statements shorter than this, in characters, are too common
+# to be worth reporting.
+MIN_LENGTH = 100
+
+FUNCTIONS = ('FunctionDeclaration', 'FunctionExpression', 'ArrowFunctionExpression')
+
+
+class Occurrence(Object):
+    def __init__(self, path, range, line):
+        self.path = path
+        self.range = range
+        self.line = line
+
+
+class Duplicate(Object):
+    """Functions or statements of the same `type` and structural hash, found
+    at each of `occurrences`, the first being `length` characters long."""
+
+    def __init__(self, hash, type, length, occurrences):
+        self.hash = hash
+        self.type = type
+        self.length = length
+        self.occurrences = occurrences
+
+
+class Duplicates(Object):
+    """The duplicates found in the files under `root`, the longest first, and
+    the errors of the files which could not be parsed, by path."""
+
+    def __init__(self, root):
+        self.root = root
+        self.groups = []
+        self.errors = {}
+
+
+def hashFile(task):
+    """Parses a file with hashes, returning the hash, type, range and line of
+    each of its functions and statements of at least `minLength` characters,
+    or the error it could not be read or parsed with, so that one file does
+    not stop the others."""
+
+    root, path, names, minLength, sourceType = task
+    try:
+        return path, hashNodes(root, path, names, minLength, sourceType), None
+    except Error as e:
+        return path, None, e.message
+    except Exception as e:
+        return path, None, '%s: %s' % (e.__class__.__name__, e)
+
+
+def hashNodes(root, path, names, minLength, sourceType):
+    from .esprima import parse
+
+    with open(os.path.join(root, path), 'rb') as f:
+        code = f.read().decode('utf-8', 'replace')
+    tree = parse(code, sourceType=sourceType, jsx=path.endswith('.jsx'), range=True, loc=True,
+                 hashes=True if names else 'anonymous')
+
+    found = []
+    stack = [tree]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, list):
+            stack.extend(value)
+            continue
+        if not isinstance(value, Node):
+            continue
+        type = value.type
+        start, end = value.range
+        if (
+            end - start >= minLength and
+            (type in FUNCTIONS or type.endswith(('Statement', 'Declaration')))
+        ):
+            found.append((structuralHash(value, names), type, start, end, value.loc.start.line))
+        stack.extend(item for key, item in value.__dict__.items() if key[0] != '_')
+    return found
+
+
+def findDuplicates(root, workers=None, names=True, minLength=MIN_LENGTH, extensions=EXTENSIONS, sourceType='unambiguous'):
+    """Finds the functions and statements of the files under `root` which
+    have the same structure, whatever their positions and comments, and,
+    without `names`, whatever the names of their identifiers.
+
+    Each file is parsed with the `hashes` option, in a pool of `workers`
+    processes, and its functions and statements of at least `minLength`
+    characters grouped by type and structural hash. Groups found only within
+    the occurrences of a longer group are left out, as the statements of a
+    duplicated function."""
+
+    result = Duplicates(root)
+    tasks = [(root, path, names, minLength, sourceType) for path in iterFiles(root, extensions)]
+
+    if workers and workers > 1 and len(tasks) >= MIN_POOL:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+        try:
+            results = pool.map(hashFile, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+        finally:
+            pool.terminate()
+    else:
+        results = [hashFile(task) for task in tasks]
+
+    groups = {}
+    for path, found, error in results:
+        if error is not None:
+            result.errors[path] = error
+            continue
+        for hash, type, start, end, line in found:
+            groups.setdefault((hash, type), []).append(Occurrence(path, [start, end], line))
+
+    # The longest first, so that what they contain is found covered.
+    covered = {}
+    candidates = sorted(
+        ((hash, type, occurrences) for (hash, type), occurrences in groups.items() if len(occurrences) > 1),
+        key=lambda group: (-(group[2][0].range[1] - group[2][0].range[0]), group[1], group[0]),
+    )
+    for hash, type, occurrences in candidates:
+        occurrences.sort(key=lambda occurrence: (occurrence.path, occurrence.range[0]))
+        if all(
+            any(start <= occurrence.range[0] and occurrence.range[1] <= end for start, end in covered.get(occurrence.path, ()))
+            for occurrence in occurrences
+        ):
+            continue
+        for occurrence in occurrences:
+            covered.setdefault(occurrence.path, []).append(occurrence.range)
+        length = occurrences[0].range[1] - occurrences[0].range[0]
+        result.groups.append(Duplicate(hash, type, length, occurrences))
+
+    return result
+
+
+def main(argv=None):
+    import optparse
+
+    usage = "usage: %prog duplicates [options] directory"
+    parser = optparse.OptionParser(usage=usage, version=version, prog='esprima')
+    parser.add_option("--workers", dest="workers", default=None, type='int',
+                      help="Number of processes parsing files [default: one per CPU]")
+    parser.add_option("--anonymous", dest="names", default=True,
+                      action="store_false",
+                      help="Match code whatever the names of its identifiers")
+    parser.add_option("--min-length", dest="minLength", default=MIN_LENGTH, type='int',
+                      help="Leave out code shorter than this many characters [default: %default]")
+    parser.add_option("--module", dest="sourceType", default='unambiguous',
+                      action="store_const", const='module',
+                      help="Parse every file as an ECMAScript module")
+    parser.add_option("--script", dest="sourceType",
+                      action="store_const", const='script',
+                      help="Parse every file as a script")
+    opts, args = parser.parse_args(argv)
+
+    if len(args) != 1:
+        parser.print_help()
+        return 64
+
+    workers = opts.workers
+    if workers is None:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+
+    duplicates = findDuplicates(args[0], workers=workers, names=opts.names, minLength=opts.minLength,
+                                sourceType=opts.sourceType)
+    result = {
+        'duplicates': [
+            {
+                'type': group.type,
+                'length': group.length,
+                'occurrences': [[occurrence.path, occurrence.line] + occurrence.range for occurrence in group.occurrences],
+            }
+            for group in duplicates.groups
+        ],
+        'errors': duplicates.errors,
+    }
+    print(json.dumps(result, indent=2, sort_keys=True))
+    return 0
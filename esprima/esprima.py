@@ -23,21 +23,37 @@
 
 from __future__ import absolute_import, unicode_literals
 
+from .cache import BodyCache, ParseCache
 from .comment_handler import CommentHandler
+from .dependencies import extractDependencies
+from .duplicates import findDuplicates
 from .error_handler import Error
+from .factory import NodeFactory
+from .graph import buildGraph
+from .hashing import structuralHash
+from .incremental import reparse
 from .jsx_parser import JSXParser
 from .jsx_syntax import JSXSyntax
+from .lines import LineIndex
+from .loader import fromDict, load
 from .objects import Array, toDict
 from .parser import Parser
+from .serialize import serialize, deserialize
+from .shared import shareTree, attachTree
+from .skeleton import skeleton, Span
 from .syntax import Syntax
-from .tokenizer import Tokenizer
+from .tokenizer import Tokenizer, TokenStream
+from .validate import moduleErrors, validate
 from .visitor import NodeVisitor
 from . import nodes
 from . import jsx_nodes
 
 
-__all__ = ['Syntax', 'JSXSyntax', 'Error', 'NodeVisitor', 'nodes', 'jsx_nodes',
-           'parse', 'parseModule', 'parseScript', 'tokenize', 'toDict']
+__all__ = ['Syntax', 'JSXSyntax', 'Error', 'NodeVisitor', 'NodeFactory', 'BodyCache', 'ParseCache', 'LineIndex', 'nodes', 'jsx_nodes',
+           'parse', 'parseModule', 'parseScript', 'cachedParse', 'parseCache', 'reparse', 'serialize', 'deserialize', 'shareTree', 'attachTree',
+           'fromDict', 'load',
+           'tokenize', 'TokenStream', 'skeleton', 'Span', 'extractDependencies', 'buildGraph', 'structuralHash', 'findDuplicates',
+           'validate', 'toDict']
 
 
 def parse(code, options=None, delegate=None, **kwargs):
@@ -49,6 +65,13 @@ def parse(code, options=None, delegate=None, **kwargs):
         options['jsx'] = True
         options['classProperties'] = True
 
+    sourceType = options.get('sourceType', 'script')
+
+    workers = options.get('workers', None)
+    if workers and workers > 1 and delegate is None and sourceType != 'unambiguous':
+        from .parallel import parallelParse
+        return parallelParse(code, options, workers)
+
     commentHandler = None
 
     def proxyDelegate(node, metadata):
@@ -69,14 +92,24 @@ def parse(code, options=None, delegate=None, **kwargs):
         options['comment'] = True
         parserDelegate = proxyDelegate
 
-    isModule = options.get('sourceType', 'script') == 'module'
-
     if options.get('jsx', False):
         parser = JSXParser(code, options=options, delegate=parserDelegate)
     else:
         parser = Parser(code, options=options, delegate=parserDelegate)
 
-    ast = parser.parseModule() if isModule else parser.parseScript()
+    if sourceType == 'module':
+        ast = parser.parseModule()
+    elif sourceType == 'unambiguous':
+        try:
+            ast = parser.parseUnambiguous()
+        except Error as error:
+            # Failing as a script before its first import or export, a
+            # module has the errors of one.
+            if moduleErrors(code, options) is None:
+                raise error
+            return parse(code, options, delegate, sourceType='module')
+    else:
+        ast = parser.parseScript()
 
     if collectComment and commentHandler:
         ast.comments = commentHandler.comments
@@ -90,6 +123,14 @@ def parse(code, options=None, delegate=None, **kwargs):
     return ast
 
 
+# Shared by the callers of cachedParse().
+parseCache = ParseCache()
+
+
+def cachedParse(code, options=None, delegate=None, **kwargs):
+    return parseCache.parse(code, options, delegate, **kwargs)
+
+
 def parseModule(code, options=None, delegate=None, **kwargs):
     kwargs['sourceType'] = 'module'
     return parse(code, options, delegate, **kwargs)
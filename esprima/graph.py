@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals, print_function
+
+import io
+import os
+import json
+import hashlib
+
+from .dependencies import Dependency, Specifier, extractDependencies
+from .error_handler import Error
+from .objects import Object
+from . import version
+
+EXTENSIONS = ('.js', '.mjs', '.cjs', '.jsx')
+
+# Directories not walked, besides the hidden ones.
+EXCLUDED = ('node_modules',)
+
+# Bumped whenever the cached entries change.
+CACHE_VERSION = 1
+
+# Fewer files than this are not worth starting a pool for.
+MIN_POOL = 16
+
+
+class DependencyGraph(Object):
+    """The module dependencies of the files under `root`, by path relative
+    to it. `dependencies` holds what extractDependencies() found in each
+    file, `edges` the files they resolve to and `external` the other module
+    specifiers (packages and missing files). `parsed` lists the files
+    extracted again, the others having been found in the cache."""
+
+    def __init__(self, root):
+        self.root = root
+        self.dependencies = {}
+        self.edges = {}
+        self.external = {}
+        self.errors = {}
+        self.parsed = []
+
+    def cycles(self):
+        """The strongly connected components of more than one file, or of a
+        file importing itself, each sorted, found with Tarjan's algorithm
+        (iteratively, so that long chains do not exhaust the stack)."""
+
+        edges = self.edges
+        index = {}
+        low = {}
+        stack = []
+        onStack = set()
+        cycles = []
+
+        for root in sorted(edges):
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            onStack.add(root)
+            work = [(root, iter(edges[root]))]
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        onStack.add(child)
+                        work.append((child, iter(edges[child])))
+                        break
+                    elif child in onStack:
+                        low[node] = min(low[node], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            onStack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in edges[node]:
+                            cycles.append(sorted(component))
+
+        return cycles
+
+
+def iterFiles(root, extensions=EXTENSIONS):
+    for path, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in EXCLUDED and not d.startswith('.'))
+        for filename in sorted(files):
+            if filename.endswith(extensions):
+                yield os.path.relpath(os.path.join(path, filename), root)
+
+
+def extractFile(task):
+    """Reads a file and extracts its dependencies, unless its content hash is
+    still `hash`. Returns the cache entry, without dependencies if the
+    content is unchanged, with the error if it could not be read or
+    extracted."""
+
+    root, path, mtime, size, hash, sourceType = task
+    try:
+        with open(os.path.join(root, path), 'rb') as f:
+            data = f.read()
+    except (IOError, OSError) as e:
+        return path, {'mtime': mtime, 'size': size, 'hash': None, 'dependencies': [], 'error': str(e)}
+    entry = {'mtime': mtime, 'size': size, 'hash': hashlib.sha1(data).hexdigest()}
+    if entry['hash'] == hash:
+        return path, entry
+
+    if sourceType is None:
+        sourceType = 'script' if path.endswith('.cjs') else 'module'
+    try:
+        dependencies = extractDependencies(data.decode('utf-8', 'replace'), sourceType)
+        entry['dependencies'] = [dumpDependency(dependency) for dependency in dependencies]
+    except Error as e:
+        entry['dependencies'] = []
+        entry['error'] = e.message
+    except Exception as e:
+        # One file does not stop the others.
+        entry['dependencies'] = []
+        entry['error'] = '%s: %s' % (e.__class__.__name__, e)
+    return path, entry
+
+
+def dumpDependency(dependency):
+    return [
+        dependency.type, dependency.source, dependency.range, dependency.sourceRange,
+        [[specifier.local, specifier.imported, specifier.exported] for specifier in dependency.specifiers],
+    ]
+
+
+def loadDependency(data):
+    type, source, range, sourceRange, specifiers = data
+    return Dependency(type, source, range, sourceRange, [Specifier(*specifier) for specifier in specifiers])
+
+
+def resolve(files, path, specifier, extensions=EXTENSIONS):
+    """The file a relative or absolute module specifier designates, as
+    Node.js resolves it: the exact file, then with each extension, then
+    the index of a directory."""
+
+    if specifier.startswith('/'):
+        base = specifier
+    elif specifier.startswith(('./', '../')) or specifier in ('.', '..'):
+        base = os.path.join(os.path.dirname(path), specifier)
+    else:
+        return None
+    base = os.path.normpath(base)
+    for candidate in (base,) + tuple(base + extension for extension in extensions):
+        if candidate in files:
+            return candidate
+    for extension in extensions:
+        candidate = os.path.join(base, 'index' + extension)
+        if candidate in files:
+            return candidate
+    return None
+
+
+def loadCache(cache, root, sourceType):
+    try:
+        with io.open(cache, encoding='utf-8') as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if data.get('version') != CACHE_VERSION:
+        return {}
+    # The entries of another tree, or extracted as another source type, would
+    # be reused when the modification times and sizes match.
+    if data.get('root') != os.path.abspath(root) or data.get('sourceType') != sourceType:
+        return {}
+    return data['files']
+
+
+def saveCache(cache, root, sourceType, entries):
+    temporary = cache + '.tmp'
+    with io.open(temporary, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({
+            'version': CACHE_VERSION, 'root': os.path.abspath(root), 'sourceType': sourceType, 'files': entries,
+        }, ensure_ascii=False))
+    getattr(os, 'replace', os.rename)(temporary, cache)
+
+
+def buildGraph(root, cache=None, workers=None, extensions=EXTENSIONS, sourceType=None):
+    """Builds the dependency graph of the files under `root`.
+
+    With `cache`, the path of a JSON file, the dependencies of the files
+    whose modification time and size, or else content hash, did not change
+    since the last build are reused, and the cache is updated. The other
+    files are extracted in a pool of `workers` processes. Files are parsed
+    as `sourceType`, by default as modules but for `.cjs` files. Only import
+    and export declarations are parsed, so that CommonJS files are read as
+    modules as well.
+    """
+
+    entries = loadCache(cache, root, sourceType) if cache else {}
+    graph = DependencyGraph(root)
+
+    files = {}
+    tasks = []
+    for path in iterFiles(root, extensions):
+        stat = os.stat(os.path.join(root, path))
+        entry = entries.get(path)
+        if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+            files[path] = entry
+        else:
+            tasks.append((root, path, stat.st_mtime, stat.st_size, entry['hash'] if entry else None, sourceType))
+
+    if workers and workers > 1 and len(tasks) >= MIN_POOL:
+        from multiprocessing import Pool
+        pool = Pool(workers)
+        try:
+            results = pool.map(extractFile, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+        finally:
+            pool.terminate()
+    else:
+        results = [extractFile(task) for task in tasks]
+
+    for path, entry in results:
+        if 'dependencies' in entry:
+            graph.parsed.append(path)
+        else:
+            # Touched, but not changed.
+            entry = dict(entries[path], mtime=entry['mtime'], size=entry['size'])
+        files[path] = entry
+
+    for path in sorted(files):
+        entry = files[path]
+        dependencies = [loadDependency(dependency) for dependency in entry['dependencies']]
+        graph.dependencies[path] = dependencies
+        if 'error' in entry:
+            graph.errors[path] = entry['error']
+        edges = graph.edges[path] = []
+        external = graph.external[path] = []
+        for dependency in dependencies:
+            if dependency.source is None:
+                continue
+            target = resolve(files, path, dependency.source, extensions)
+            if target is None:
+                if dependency.source not in external:
+                    external.append(dependency.source)
+            elif target not in edges:
+                edges.append(target)
+
+    if cache:
+        saveCache(cache, root, sourceType, files)
+
+    return graph
+
+
+def main(argv=None):
+    import optparse
+
+    usage = "usage: %prog graph [options] directory"
+    parser = optparse.OptionParser(usage=usage, version=version, prog='esprima')
+    parser.add_option("--cache", dest="cache", default=None,
+                      metavar="FILE",
+                      help="Reuse and update the dependencies cached in FILE")
+    parser.add_option("--workers", dest="workers", default=None, type='int',
+                      help="Number of processes extracting dependencies [default: one per CPU]")
+    parser.add_option("--module", dest="sourceType", default=None,
+                      action="store_const", const='module',
+                      help="Parse every file as an ECMAScript module")
+    parser.add_option("--script", dest="sourceType",
+                      action="store_const", const='script',
+                      help="Parse every file as a script")
+    parser.add_option("--cycles", dest="cycles", default=False,
+                      action="store_true",
+                      help="Only list the dependency cycles")
+    opts, args = parser.parse_args(argv)
+
+    if len(args) != 1:
+        parser.print_help()
+        return 64
+
+    workers = opts.workers
+    if workers is None:
+        import multiprocessing
+        workers = multiprocessing.cpu_count()
+
+    graph = buildGraph(args[0], cache=opts.cache, workers=workers, sourceType=opts.sourceType)
+    if opts.cycles:
+        result = graph.cycles()
+    else:
+        result = {
+            'edges': graph.edges,
+            'external': dict((path, external) for path, external in graph.external.items() if external),
+            'errors': graph.errors,
+            'cycles': graph.cycles(),
+        }
+    print(json.dumps(result, indent=2, sort_keys=True))
+    return 1 if graph.errors else 0
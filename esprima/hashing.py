@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import hashlib
+
+from .compat import basestring, long
+from .nodes import Node
+from .objects import Object
+from .syntax import Syntax
+
+# Attributes left out of the hashes: positions and comments.
+SKIPPED = frozenset((
+    'range', 'loc', 'leadingComments', 'trailingComments', 'innerComments',
+    'comments', 'tokens', 'errors',
+))
+
+
+def hashAttribute(names):
+    return '_hash' if names else '_anonymousHash'
+
+
+def encode(value, attribute, names):
+    """The text standing for `value` in the hash of the node holding it."""
+
+    if isinstance(value, Node):
+        digest = value.__dict__.get(attribute)
+        if digest is None:
+            digest = structuralHash(value, names)
+        return digest
+    if value is None:
+        return 'null'
+    if isinstance(value, basestring):
+        return '%d:%s' % (len(value), value)
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, list):
+        return '[%s]' % ','.join([encode(item, attribute, names) for item in value])
+    if isinstance(value, Object):
+        return '{%s}' % encodeAttributes(value.__dict__, attribute, names)
+    # Numbers, and the compiled patterns of regular expressions, which their
+    # pattern and flags stand for.
+    return repr(value) if isinstance(value, (int, long, float)) else ''
+
+
+def encodeAttributes(attributes, attribute, names):
+    if '_cook' in attributes:
+        from .scanner import cookLiteral
+        cookLiteral(attributes)
+    parts = []
+    for key, value in attributes.items():
+        if key in SKIPPED or key[0] == '_':
+            continue
+        if isinstance(value, basestring):
+            if key == 'name' and not names and attributes.get('type') is Syntax.Identifier:
+                continue
+            parts.append('%s %d:%s' % (key, len(value), value))
+        elif isinstance(value, Node):
+            # Most values are children, hashed already.
+            digest = value.__dict__.get(attribute)
+            parts.append('%s %s' % (key, digest if digest is not None else structuralHash(value, names)))
+        else:
+            parts.append('%s %s' % (key, encode(value, attribute, names)))
+    return ' '.join(parts)
+
+
+def nodeHash(node, names=True, digests=None):
+    """The structural hash of `node` from those of its children. With
+    `digests`, a dict, the same text is hashed once, its digest shared by
+    the nodes alike."""
+
+    attribute = hashAttribute(names)
+    text = encodeAttributes(node.__dict__, attribute, names)
+    if digests is None:
+        return hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+    digest = digests.get(text)
+    if digest is None:
+        digest = digests[text] = hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+    return digest
+
+
+def structuralHash(node, names=True):
+    """A hash of `node` and its descendants, as a hex string, alike for the
+    same syntax wherever it is, leaving out positions and comments, and,
+    without `names`, the names of identifiers.
+
+    Parsed with the `hashes` option, True or 'anonymous' for the hashes
+    without names, every node has its hash computed when created, bottom-up;
+    the others are computed here, the children first, and kept."""
+
+    attribute = hashAttribute(names)
+    digest = node.__dict__.get(attribute)
+    if digest is not None:
+        return digest
+    # Children first, without recursion.
+    digests = {}
+    stack = [(node, False)]
+    while stack:
+        value, ready = stack.pop()
+        if ready:
+            value.__dict__[attribute] = nodeHash(value, names, digests)
+            continue
+        stack.append((value, True))
+        children = []
+        for key, item in value.__dict__.items():
+            if key not in SKIPPED and key[0] != '_':
+                children.append(item)
+        while children:
+            item = children.pop()
+            if isinstance(item, Node):
+                if attribute not in item.__dict__:
+                    stack.append((item, False))
+            elif isinstance(item, list):
+                children.extend(item)
+            elif isinstance(item, Object):
+                children.extend(item.__dict__.values())
+    return node.__dict__[attribute]
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+from .error_handler import Error
+from .jsx_parser import JSXParser
+from .lines import LINE_TERMINATOR
+from .nodes import Node
+from .objects import Object
+from .parser import Marker, Parser
+from .syntax import Syntax
+from .token import Token
+
+
+def countLines(source, start, end):
+    return len(LINE_TERMINATOR.findall(source, start, end))
+
+
+def columnOf(source, index, lineStart):
+    for ch in '\n\r\u2028\u2029':
+        lineStart = max(lineStart, source.rfind(ch, lineStart, index) + 1)
+    return index - lineStart
+
+
+def isUseStrict(statements):
+    for statement in statements:
+        if statement.directive is None:
+            break
+        if statement.directive == 'use strict':
+            return True
+    return False
+
+
+def prologueLength(statements):
+    length = 0
+    for statement in statements:
+        if statement.directive is None:
+            break
+        length += 1
+    return length
+
+
+def bisect(entries, index, lo=0, end=False):
+    # First entry (from lo) whose range start, or end, is at or after index.
+    i = 1 if end else 0
+    hi = len(entries)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if entries[mid].range[i] < index:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def children(node):
+    for key, value in node.items():
+        if isinstance(value, Node):
+            yield value
+        elif isinstance(value, list) and key != 'range' and key != 'tokens':
+            for item in value:
+                if isinstance(item, Node):
+                    yield item
+
+
+class Container(Object):
+    def __init__(self, node, statements, strict, function=None):
+        self.node = node
+        self.statements = statements
+        self.strict = strict
+        self.function = function
+
+
+class Shift(Object):
+    """Moves the positions at or after `end`, where the old source resumes
+    unchanged, to their place in the new source."""
+
+    def __init__(self, end, delta, line=None, lineDelta=0, columnDelta=0):
+        self.end = end
+        self.delta = delta
+        self.line = line
+        self.lineDelta = lineDelta
+        self.columnDelta = columnDelta
+
+    def position(self, position, skewed=False):
+        if skewed:
+            # Nodes starting with a token spanning lines have their column
+            # counted from a line after it (see Parser.startNode), after the
+            # edit too: an offset moving with the others if counted from the
+            # line of a following token, else left as it is.
+            if position.column >= 0:
+                position.column += self.delta
+        elif position.line == self.line:
+            position.column += self.columnDelta
+        position.line += self.lineDelta
+
+    def entry(self, entry):
+        range = entry.range
+        loc = entry.loc
+        if range[0] >= self.end:
+            if loc is not None:
+                self.position(loc.start, '_skewed' in entry.__dict__)
+            range[0] += self.delta
+        if range[1] >= self.end:
+            if loc is not None:
+                self.position(loc.end)
+            range[1] += self.delta
+
+    def tree(self, node):
+        # The hot loop of a reparse: every node after the edit is visited.
+        end = self.end
+        entry = self.entry
+        seen = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            attributes = node.__dict__
+            range = attributes.get('range')
+            if range is not None:
+                if range[1] < end:
+                    continue
+                if id(node) in seen:
+                    continue
+                seen.add(id(node))
+                entry(node)
+            for key, value in attributes.items():
+                if isinstance(value, Node):
+                    stack.append(value)
+                elif value.__class__ is list and key != 'range' and key != 'tokens':
+                    stack.extend([item for item in value if isinstance(item, Node)])
+
+
+def findContainers(tree, start, end, isModule):
+    """The statement lists enclosing the edit which can be reparsed on their
+    own: the program body and the bodies of the functions in between."""
+
+    strict = isModule or isUseStrict(tree.body)
+    containers = [Container(tree, tree.body, strict)]
+
+    node = tree
+    while True:
+        if node.type in (Syntax.ForStatement, Syntax.ForInStatement, Syntax.ForOfStatement):
+            # Functions in the head of a for statement are parsed without `in`.
+            candidates = [node.body]
+        else:
+            candidates = children(node)
+        enclosing = [
+            child for child in candidates
+            if child.range is not None and child.range[0] <= start and end <= child.range[1]
+        ]
+        if len(enclosing) != 1:
+            break
+        parent, node = node, enclosing[0]
+
+        if node.type in (Syntax.ClassDeclaration, Syntax.ClassExpression):
+            strict = True
+
+        elif node.type in (Syntax.FunctionDeclaration, Syntax.FunctionExpression, Syntax.ArrowFunctionExpression):
+            body = node.body
+            if body.type is not Syntax.BlockStatement:
+                continue
+            strict = strict or isUseStrict(body.body)
+            # Methods, accessors and arrow functions set up their bodies
+            # differently, so they are only walked through.
+            method = (
+                parent.type in (Syntax.MethodDefinition, Syntax.FieldDefinition) or
+                (parent.type is Syntax.Property and (parent.method or parent.kind != 'init'))
+            )
+            if (
+                node.type is not Syntax.ArrowFunctionExpression and not method and
+                body.range[0] < start and end < body.range[1]
+            ):
+                containers.append(Container(body, body.body, strict, node))
+
+    return containers
+
+
+def reparseContainer(tree, container, oldSource, newSource, edit, options):
+    """Reparse the statements of the container touched by the edit and splice
+    them into the tree. Returns False, leaving the tree alone, if the edit
+    reaches beyond the container or the prologue of directives."""
+
+    start, oldEnd, newEnd = edit
+    delta = newEnd - oldEnd
+    statements = container.statements
+    function = container.function
+    loc = tree.loc is not None
+
+    # The statement before the edit is reparsed too, as where it ends depends
+    # on the tokens after it (automatic semicolon insertion, call arguments).
+    prologue = prologueLength(statements)
+    first = bisect(statements, start, end=True) - 1
+    if first <= prologue:
+        if prologue:
+            return False
+        first = 0
+        if function is None:
+            index, line, column = 0, 1, 0
+        else:
+            index = container.node.range[0] + 1
+            line, column = (container.node.loc.start.line, container.node.loc.start.column + 1) if loc else (1, 0)
+    else:
+        statement = statements[first]
+        index = statement.range[0]
+        line, column = (statement.loc.start.line, statement.loc.start.column) if loc else (1, 0)
+
+    # The old source resumes at the start of a statement after the edit, or
+    # at the end of the container.
+    def boundary(m):
+        if m < len(statements):
+            return statements[m].range[0]
+        return len(oldSource) if function is None else container.node.range[1] - 1
+
+    if options.get('jsx', False):
+        parser = JSXParser(newSource, options=options, delegate=None)
+    else:
+        parser = Parser(newSource, options=options, delegate=None)
+
+    scanner = parser.scanner
+    scanner.index = index
+    scanner.lineNumber = line
+    scanner.lineStart = index - column
+    scanner.curlyStack = [] if function is None else ['{']
+    parser.lookaheadBuffer.clear()
+    parser.tokens = []
+    parser.startMarker = Marker(index=index, line=line, column=column)
+    parser.lastMarker = Marker(index=index, line=line, column=column)
+
+    context = parser.context
+    context.strict = container.strict
+    if options.get('sourceType', 'script') == 'module':
+        context.isModule = True
+        scanner.isModule = True
+    if function is not None:
+        context.allowAwait = function.isAsync
+        context.allowYield = not function.generator
+        context.inFunctionBody = True
+
+    body = []
+    m = bisect(statements, oldEnd + 1, first)
+    try:
+        parser.nextToken()
+        if first == 0 and parser.lookahead.type is Token.StringLiteral:
+            # It could start a prologue of directives.
+            return False
+        programStart = parser.createNode()
+        while True:
+            bound = boundary(m) + delta
+            while parser.lookahead.type is not Token.EOF and parser.lookahead.start < bound:
+                body.append(parser.parseStatementListItem())
+            position = parser.lookahead.start
+            while position > bound and m < len(statements):
+                m += 1
+                bound = boundary(m) + delta
+            if position == bound:
+                break
+            if position > bound or parser.lookahead.type is Token.EOF:
+                return False
+    except Error:
+        return False
+
+    end = boundary(m)
+    shift = Shift(end, delta)
+    if loc:
+        lineStart = index - column
+        shift.line = line + countLines(oldSource, index, oldEnd)
+        shift.lineDelta = line + countLines(newSource, index, newEnd) - shift.line
+        shift.columnDelta = columnOf(newSource, newEnd, lineStart) - columnOf(oldSource, oldEnd, lineStart)
+
+    reachesEnd = m == len(statements)
+    del statements[first:m]
+    shift.tree(tree)
+    statements[first:first] = body
+
+    if tree.tokens is not None:
+        tokens = tree.tokens
+        lo = bisect(tokens, index)
+        hi = bisect(tokens, end, lo)
+        del tokens[lo:hi]
+        for token in tokens[lo:]:
+            shift.entry(token)
+        tokens[lo:lo] = [token for token in parser.tokens if token.range[0] < end + delta]
+
+    if function is None:
+        if first == 0:
+            tree.range[0] = programStart.index
+            if loc:
+                tree.loc.start.line = programStart.line
+                tree.loc.start.column = programStart.column
+        if reachesEnd:
+            if body:
+                index, line, column = parser.lastMarker.index, parser.lastMarker.line, parser.lastMarker.column
+            elif first:
+                # The statements up to the end were removed.
+                previous = statements[first - 1]
+                index = previous.range[1]
+                line, column = (previous.loc.end.line, previous.loc.end.column) if loc else (1, 0)
+            else:
+                # An empty program ends where the end of the source was
+                # found, as after the first token read by Parser().
+                index, line, column = scanner.index, scanner.lineNumber, scanner.index - scanner.lineStart
+            tree.range[1] = index
+            if loc:
+                tree.loc.end.line = line
+                tree.loc.end.column = column
+
+    return True
+
+
+def reparse(tree, oldSource, newSource, edit, options=None, **kwargs):
+    """Parse `newSource`, the result of an `edit` of `oldSource`, reusing
+    `tree`, the result of parsing `oldSource` with the same options.
+
+    The edit is a `(start, oldEnd, newEnd)` tuple of offsets: the text between
+    `start` and `oldEnd` in the old source was replaced by the text between
+    `start` and `newEnd` in the new source.
+
+    Only the statements around the edit, in the innermost enclosing function
+    body (or the program), are parsed again; the rest of the tree is kept,
+    with its ranges and locations moved, and the tree is updated in place.
+    The result is the same as parsing the new source. It falls back to a full
+    parse when the tree has no ranges, when comments are collected or attached,
+    in tolerant mode or when the edit could change the surrounding code."""
+
+    from .esprima import parse
+
+    options = {} if options is None else options.copy()
+    options.update(kwargs)
+
+    # ESNext presset:
+    if options.get('esnext', False):
+        options['jsx'] = True
+        options['classProperties'] = True
+
+    start, oldEnd, newEnd = edit
+    if not (
+        0 <= start <= oldEnd <= len(oldSource) and start <= newEnd <= len(newSource) and
+        len(oldSource) - oldEnd == len(newSource) - newEnd
+    ):
+        raise ValueError("Edit (%d, %d, %d) does not match the sources" % (start, oldEnd, newEnd))
+
+    if (
+        not options.get('range', False) or
+        # Kept nodes would derive their locations from the old source.
+        options.get('loc', False) == 'lazy' or
+        options.get('compact', False) or
+        # The hashes of the containers of the edit would be left as they were.
+        options.get('hashes', False) or
+        options.get('tolerant', False) or
+        options.get('comment', False) or
+        options.get('attachComment', False) or
+        tree.range is None or
+        # The locations of an empty program are on line 0.
+        not newSource or
+        (options.get('tokens', False) and tree.tokens is None) or
+        # A line terminator (CR LF) split by the edit.
+        oldSource[start - 1:start + 1] == '\r\n' or
+        oldSource[oldEnd - 1:oldEnd + 1] == '\r\n' or
+        newSource[newEnd - 1:newEnd + 1] == '\r\n'
+    ):
+        return parse(newSource, options)
+
+    # The function bodies around the edit are taken from the tree, not from a
+    # cache, which would have the whole source scanned for its braces.
+    containerOptions = dict(options, bodyCache=None)
+    unambiguous = options.get('sourceType', 'script') == 'unambiguous'
+    if unambiguous:
+        # Whether the program is a module depends on all of its statements:
+        # function bodies are parsed again as the type found, the program in
+        # full.
+        containerOptions['sourceType'] = tree.sourceType
+
+    isModule = containerOptions.get('sourceType', 'script') == 'module'
+    containers = findContainers(tree, start, oldEnd, isModule)
+    if unambiguous:
+        del containers[0]
+    for container in reversed(containers):
+        if reparseContainer(tree, container, oldSource, newSource, edit, containerOptions):
+            return tree
+
+    return parse(newSource, options)
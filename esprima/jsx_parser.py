@@ -23,16 +23,24 @@
 
 from __future__ import absolute_import, unicode_literals
 
+import re
+
 from .compat import uchr
 from .character import Character
-from . import jsx_nodes as JSXNode
 from .jsx_syntax import JSXSyntax
-from . import nodes as Node
 from .parser import Marker, Parser
-from .token import Token, TokenName
+from .token import Token, TokenCode, TokenName
 from .xhtml_entities import XHTMLEntities
 
 
+# Runs of characters attribute strings take as they are, up to the quote or
+# an entity.
+STRING_CHARACTERS = {
+    '\'': re.compile('[^\'&]+'),
+    '"': re.compile('[^"&]+'),
+}
+
+
 class MetaJSXElement(object):
     def __init__(self, node=None, opening=None, closing=None, children=None):
         self.node = node
@@ -47,9 +55,10 @@ class JSXToken(object):
 
 
 class RawJSXToken(object):
-    def __init__(self, type=None, value=None, lineNumber=None, lineStart=None, start=None, end=None):
+    def __init__(self, type=None, value=None, lineNumber=None, lineStart=None, start=None, end=None, code=0):
         self.type = type
         self.value = value
+        self.code = code
         self.lineNumber = lineNumber
         self.lineStart = lineStart
         self.start = start
@@ -85,6 +94,7 @@ class JSXParser(Parser):
 
     def startJSX(self):
         # Unwind the scanner before the lookahead token.
+        self.lookaheadBuffer.clear()
         self.scanner.index = self.startMarker.index
         self.scanner.lineNumber = self.startMarker.line
         self.scanner.lineStart = self.startMarker.index - self.startMarker.column
@@ -171,6 +181,7 @@ class JSXParser(Parser):
             return RawJSXToken(
                 type=Token.Punctuator,
                 value=value,
+                code=TokenCode[value],
                 lineNumber=self.scanner.lineNumber,
                 lineStart=self.scanner.lineStart,
                 start=self.scanner.index - 1,
@@ -183,7 +194,15 @@ class JSXParser(Parser):
             quote = self.scanner.source[self.scanner.index]
             self.scanner.index += 1
             str = ''
+            characters = STRING_CHARACTERS[quote]
             while not self.scanner.eof():
+                match = characters.match(self.scanner.source, self.scanner.index, self.scanner.length)
+                if match:
+                    str += match.group()
+                    self.scanner.index = match.end()
+                    if self.scanner.eof():
+                        break
+
                 ch = self.scanner.source[self.scanner.index]
                 self.scanner.index += 1
                 if ch == quote:
@@ -259,12 +278,16 @@ class JSXParser(Parser):
         return self.scanner.lex()
 
     def nextJSXToken(self):
-        self.collectComments()
+        entry = None
+        if self.lookaheadBuffer:
+            entry = self.unbufferToken('jsx')
+        else:
+            self.collectComments()
 
         self.startMarker.index = self.scanner.index
         self.startMarker.line = self.scanner.lineNumber
         self.startMarker.column = self.scanner.index - self.scanner.lineStart
-        token = self.lexJSX()
+        token = self.consumeBufferedToken(entry) if entry else self.lexJSX()
         self.lastMarker.index = self.scanner.index
         self.lastMarker.line = self.scanner.lineNumber
         self.lastMarker.column = self.scanner.index - self.scanner.lineStart
@@ -275,6 +298,7 @@ class JSXParser(Parser):
         return token
 
     def nextJSXText(self):
+        self.lookaheadBuffer.clear()
         self.startMarker.index = self.scanner.index
         self.startMarker.line = self.scanner.lineNumber
         self.startMarker.column = self.scanner.index - self.scanner.lineStart
@@ -315,12 +339,7 @@ class JSXParser(Parser):
         return token
 
     def peekJSXToken(self):
-        state = self.scanner.saveState()
-        self.scanner.scanComments()
-        next = self.lexJSX()
-        self.scanner.restoreState(state)
-
-        return next
+        return self.bufferToken('jsx', self.lexJSX).token
 
     # Expect the next JSX token to match the specified punctuator.
     # If not, an exception will be thrown.
@@ -342,7 +361,7 @@ class JSXParser(Parser):
         if token.type is not JSXToken.Identifier:
             self.throwUnexpectedToken(token)
 
-        return self.finalize(node, JSXNode.JSXIdentifier(token.value))
+        return self.finalize(node, self.nodes.JSXIdentifier(token.value))
 
     def parseJSXElementName(self):
         node = self.createJSXNode()
@@ -352,13 +371,13 @@ class JSXParser(Parser):
             namespace = elementName
             self.expectJSX(':')
             name = self.parseJSXIdentifier()
-            elementName = self.finalize(node, JSXNode.JSXNamespacedName(namespace, name))
+            elementName = self.finalize(node, self.nodes.JSXNamespacedName(namespace, name))
         elif self.matchJSX('.'):
             while self.matchJSX('.'):
                 object = elementName
                 self.expectJSX('.')
                 property = self.parseJSXIdentifier()
-                elementName = self.finalize(node, JSXNode.JSXMemberExpression(object, property))
+                elementName = self.finalize(node, self.nodes.JSXMemberExpression(object, property))
 
         return elementName
 
@@ -370,7 +389,7 @@ class JSXParser(Parser):
             namespace = identifier
             self.expectJSX(':')
             name = self.parseJSXIdentifier()
-            attributeName = self.finalize(node, JSXNode.JSXNamespacedName(namespace, name))
+            attributeName = self.finalize(node, self.nodes.JSXNamespacedName(namespace, name))
         else:
             attributeName = identifier
 
@@ -383,7 +402,7 @@ class JSXParser(Parser):
             self.throwUnexpectedToken(token)
 
         raw = self.getTokenRaw(token)
-        return self.finalize(node, Node.Literal(token.value, raw))
+        return self.finalize(node, self.nodes.Literal(token.value, raw))
 
     def parseJSXExpressionAttribute(self):
         node = self.createJSXNode()
@@ -397,7 +416,7 @@ class JSXParser(Parser):
         expression = self.parseAssignmentExpression()
         self.reenterJSX()
 
-        return self.finalize(node, JSXNode.JSXExpressionContainer(expression))
+        return self.finalize(node, self.nodes.JSXExpressionContainer(expression))
 
     def parseJSXAttributeValue(self):
         if self.matchJSX('{'):
@@ -415,7 +434,7 @@ class JSXParser(Parser):
             self.expectJSX('=')
             value = self.parseJSXAttributeValue()
 
-        return self.finalize(node, JSXNode.JSXAttribute(name, value))
+        return self.finalize(node, self.nodes.JSXAttribute(name, value))
 
     def parseJSXSpreadAttribute(self):
         node = self.createJSXNode()
@@ -426,7 +445,7 @@ class JSXParser(Parser):
         argument = self.parseAssignmentExpression()
         self.reenterJSX()
 
-        return self.finalize(node, JSXNode.JSXSpreadAttribute(argument))
+        return self.finalize(node, self.nodes.JSXSpreadAttribute(argument))
 
     def parseJSXAttributes(self):
         attributes = []
@@ -449,7 +468,7 @@ class JSXParser(Parser):
 
         self.expectJSX('>')
 
-        return self.finalize(node, JSXNode.JSXOpeningElement(name, selfClosing, attributes))
+        return self.finalize(node, self.nodes.JSXOpeningElement(name, selfClosing, attributes))
 
     def parseJSXBoundaryElement(self):
         node = self.createJSXNode()
@@ -459,7 +478,7 @@ class JSXParser(Parser):
             self.expectJSX('/')
             elementName = self.parseJSXElementName()
             self.expectJSX('>')
-            return self.finalize(node, JSXNode.JSXClosingElement(elementName))
+            return self.finalize(node, self.nodes.JSXClosingElement(elementName))
 
         name = self.parseJSXElementName()
         attributes = self.parseJSXAttributes()
@@ -469,7 +488,7 @@ class JSXParser(Parser):
 
         self.expectJSX('>')
 
-        return self.finalize(node, JSXNode.JSXOpeningElement(name, selfClosing, attributes))
+        return self.finalize(node, self.nodes.JSXOpeningElement(name, selfClosing, attributes))
 
     def parseJSXEmptyExpression(self):
         node = self.createJSXChildNode()
@@ -477,7 +496,7 @@ class JSXParser(Parser):
         self.lastMarker.index = self.scanner.index
         self.lastMarker.line = self.scanner.lineNumber
         self.lastMarker.column = self.scanner.index - self.scanner.lineStart
-        return self.finalize(node, JSXNode.JSXEmptyExpression())
+        return self.finalize(node, self.nodes.JSXEmptyExpression())
 
     def parseJSXExpressionContainer(self):
         node = self.createJSXNode()
@@ -491,7 +510,7 @@ class JSXParser(Parser):
             expression = self.parseAssignmentExpression()
             self.reenterJSX()
 
-        return self.finalize(node, JSXNode.JSXExpressionContainer(expression))
+        return self.finalize(node, self.nodes.JSXExpressionContainer(expression))
 
     def parseJSXChildren(self):
         children = []
@@ -501,7 +520,7 @@ class JSXParser(Parser):
             token = self.nextJSXText()
             if token.start < token.end:
                 raw = self.getTokenRaw(token)
-                child = self.finalize(node, JSXNode.JSXText(token.value, raw))
+                child = self.finalize(node, self.nodes.JSXText(token.value, raw))
                 children.append(child)
 
             if self.scanner.source[self.scanner.index] == '{':
@@ -522,7 +541,7 @@ class JSXParser(Parser):
             if element.type is JSXSyntax.JSXOpeningElement:
                 opening = element
                 if opening.selfClosing:
-                    child = self.finalize(node, JSXNode.JSXElement(opening, [], None))
+                    child = self.finalize(node, self.nodes.JSXElement(opening, [], None))
                     el.children.append(child)
                 else:
                     stack.append(el)
@@ -541,7 +560,7 @@ class JSXParser(Parser):
                     self.tolerateError('Expected corresponding JSX closing tag for %0', open)
 
                 if stack:
-                    child = self.finalize(el.node, JSXNode.JSXElement(el.opening, el.children, el.closing))
+                    child = self.finalize(el.node, self.nodes.JSXElement(el.opening, el.children, el.closing))
                     el = stack[-1]
                     el.children.append(child)
                     stack.pop()
@@ -567,7 +586,7 @@ class JSXParser(Parser):
             children = el.children
             closing = el.closing
 
-        return self.finalize(node, JSXNode.JSXElement(opening, children, closing))
+        return self.finalize(node, self.nodes.JSXElement(opening, children, closing))
 
     def parseJSXRoot(self):
         # Pop the opening '<' added from the lookahead.
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+import sys
+from bisect import bisect
+
+from .compat import PY3, unicode
+from .scanner import Position, SourceLocation
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+LINE_TERMINATOR = re.compile('\r\n|[\n\r\u2028\u2029]')
+
+# Sources from this length have their lines found with NumPy, when it is
+# installed.
+NUMPY_LENGTH = 1 << 20
+
+# Compact locations pack the offsets, lines and columns of a node in an
+# integer, of as many bits each, above a bit telling whether the range and
+# loc built from it are kept.
+SPAN_BITS = 32
+SPAN_MASK = (1 << SPAN_BITS) - 1
+
+# The code units offsets count, as NumPy reads them.
+if sys.maxunicode > 0xFFFF:
+    ENCODING, DTYPE = 'utf-32-le', '<u4'
+else:
+    ENCODING, DTYPE = 'utf-16-le', '<u2'
+ENCODING_ERRORS = 'surrogatepass' if PY3 else 'strict'
+
+
+def packSpan(start, end, startLine, startColumn, endLine, endColumn, cache=True):
+    span = start
+    for value in (end, startLine, startColumn, endLine, endColumn):
+        span = span << SPAN_BITS | value
+    return span << 1 | cache
+
+
+def unpackSpan(span):
+    """The start, end, startLine, startColumn, endLine, endColumn and
+    cache of a compact location."""
+    cache = span & 1
+    span >>= 1
+    values = []
+    for _ in range(5):
+        values.append(span & SPAN_MASK)
+        span >>= SPAN_BITS
+    values.append(span)
+    values.reverse()
+    values.append(cache)
+    return values
+
+
+def joinSpans(first, last):
+    """The compact location from the start of `first` to the end of `last`."""
+    start, _, startLine, startColumn, _, _, cache = unpackSpan(first)
+    _, end, _, _, endLine, endColumn, _ = unpackSpan(last)
+    return packSpan(start, end, startLine, startColumn, endLine, endColumn, cache)
+
+
+def spanValue(span, name, source=None):
+    """The range or loc a compact location stands for."""
+    start, end, startLine, startColumn, endLine, endColumn, _ = unpackSpan(span)
+    if name == 'range':
+        return [start, end]
+    return SourceLocation(Position(startLine, startColumn), Position(endLine, endColumn), source)
+
+
+def spanAttribute(attributes, name):
+    """The range or loc of an object from its compact location, kept in its
+    attributes unless parsed with compact='uncached'."""
+    span = attributes['_span']
+    value = spanValue(span, name, attributes.get('_source'))
+    if span & 1:
+        attributes[name] = value
+    return value
+
+
+def spanItems(attributes):
+    """The items of the attributes of an object, with the range and loc its
+    compact location stands for in its place, as toDict() gives them."""
+    items = []
+    for key, value in attributes.items():
+        if key == '_span':
+            for name in ('range', 'loc'):
+                if name in attributes:
+                    # Built and kept since.
+                    items.append((name, attributes[name]))
+                else:
+                    items.append((name, spanValue(value, name, attributes.get('_source'))))
+        elif key != 'range' and key != 'loc':
+            items.append((key, value))
+    return items
+
+
+def lineStarts(code):
+    return [0] + [m.end() for m in LINE_TERMINATOR.finditer(code)]
+
+
+def numpyLineStarts(code):
+    units = numpy.frombuffer(code.encode(ENCODING, ENCODING_ERRORS), dtype=DTYPE)
+    ends = (units == 0x0A) | (units == 0x2028) | (units == 0x2029)
+    # A CR ends a line unless a LF follows.
+    cr = units == 0x0D
+    cr[:-1] &= units[1:] != 0x0A
+    ends |= cr
+    return [0] + (numpy.flatnonzero(ends) + 1).tolist()
+
+
+class LineIndex(object):
+    """
+    The offsets at which the lines of `code` start, to convert offsets to
+    lines and columns, counted as the parser does, and back. `source` is
+    the name the locations are given.
+
+    Lines are found with NumPy for large sources when it is installed, or
+    as `useNumpy` says. The bulk conversions take and give NumPy arrays
+    when given one, lists otherwise.
+    """
+
+    def __init__(self, code, source=None, useNumpy=None):
+        code = unicode(code)
+        if useNumpy is None:
+            useNumpy = numpy is not None and len(code) >= NUMPY_LENGTH
+        self.starts = numpyLineStarts(code) if useNumpy else lineStarts(code)
+        self.source = source
+        self.length = len(code)
+        self.array = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def position(self, offset):
+        """The line, from 1, and the column of `offset`."""
+        line = bisect(self.starts, offset)
+        return line, offset - self.starts[line - 1]
+
+    def offset(self, line, column):
+        """The offset of `column` on `line`, from 1."""
+        return self.starts[line - 1] + column
+
+    def named(self, source):
+        """The index of the same code, giving locations the name `source`."""
+        index = LineIndex.__new__(LineIndex)
+        index.__dict__.update(self.__dict__)
+        index.source = source
+        return index
+
+    def location(self, range, start=None):
+        """The SourceLocation of a node or token `range`, as the parser
+        gives it, or starting at the Position `start`, given for the nodes
+        whose start the parser does not count from the range (see
+        Parser.startNode)."""
+        starts = self.starts
+        offset, end = range
+        if not self.length:
+            # The scanner counts no line in an empty source.
+            return SourceLocation(Position(0, 0), Position(0, 0), self.source)
+        line = bisect(starts, offset)
+        endLine = bisect(starts, end, line - 1)
+        if start is None:
+            start = Position(line, offset - starts[line - 1])
+        else:
+            start = Position(start.line, start.column)
+        return SourceLocation(start, Position(endLine, end - starts[endLine - 1]), self.source)
+
+    def startsArray(self):
+        if self.array is None:
+            self.array = numpy.array(self.starts, dtype='int64')
+        return self.array
+
+    def positions(self, offsets):
+        """The lines and the columns of `offsets`, as two sequences."""
+        if numpy is not None and isinstance(offsets, numpy.ndarray):
+            starts = self.startsArray()
+            lines = numpy.searchsorted(starts, offsets, side='right')
+            return lines, offsets - starts[lines - 1]
+        starts = self.starts
+        lines = [bisect(starts, offset) for offset in offsets]
+        return lines, [offset - starts[line - 1] for offset, line in zip(offsets, lines)]
+
+    def offsets(self, lines, columns):
+        """The offsets of `columns` on `lines`, from 1."""
+        if numpy is not None and isinstance(lines, numpy.ndarray):
+            return self.startsArray()[lines - 1] + columns
+        starts = self.starts
+        return [starts[line - 1] + column for line, column in zip(lines, columns)]
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import json
+
+from .comment_handler import Comment
+from .error_handler import ErrorHandler
+from .jsx_parser import TokenName
+from .nodes import Node
+from .objects import Object
+from .parser import TokenEntry
+from .scanner import Position, RegExp, Scanner, SourceLocation
+from .syntax import Syntax
+from .visitor import ToDictVisitor
+from . import jsx_nodes
+from . import nodes
+
+# The attributes toDict() renames, by their names in the dicts.
+RENAMES = dict((v, k) for k, v in ToDictVisitor.map.items())
+
+TOKEN_TYPES = frozenset(TokenName.values())
+
+
+def variant(key, cls, otherwise):
+    return lambda data: cls if data.get(key) else otherwise
+
+
+# The types built by more than one class, or by a class of another name.
+VARIANTS = {
+    Syntax.ArrowFunctionExpression: variant('async', nodes.AsyncArrowFunctionExpression, nodes.ArrowFunctionExpression),
+    Syntax.FunctionDeclaration: variant('async', nodes.AsyncFunctionDeclaration, nodes.FunctionDeclaration),
+    Syntax.FunctionExpression: variant('async', nodes.AsyncFunctionExpression, nodes.FunctionExpression),
+    Syntax.ArrowParameterPlaceHolder: variant('async', nodes.AsyncArrowParameterPlaceHolder, nodes.ArrowParameterPlaceHolder),
+    Syntax.MemberExpression: variant('computed', nodes.ComputedMemberExpression, nodes.StaticMemberExpression),
+    Syntax.ExpressionStatement: variant('directive', nodes.Directive, nodes.ExpressionStatement),
+    Syntax.Literal: variant('regex', nodes.RegexLiteral, nodes.Literal),
+    Syntax.Program: lambda data: nodes.Module if data.get('sourceType') == 'module' else nodes.Script,
+    Syntax.LogicalExpression: lambda data: nodes.BinaryExpression,
+    'Line': lambda data: Comment,
+    'Block': lambda data: Comment,
+}
+
+
+def nodeClasses():
+    classes = {}
+    for module in (nodes, jsx_nodes):
+        for name, cls in vars(module).items():
+            if isinstance(cls, type) and issubclass(cls, Node) and cls.__module__ == module.__name__:
+                classes[name] = cls
+    return classes
+
+
+CLASSES = nodeClasses()
+
+
+def objectClass(data):
+    type = data.get('type')
+    if type is None:
+        if 'line' in data and 'column' in data:
+            return Position
+        if 'start' in data and 'end' in data:
+            return SourceLocation
+        if 'pattern' in data:
+            return RegExp
+        if 'raw' in data:
+            return nodes.TemplateElement.Value
+        return None
+    # Tokens share some types with nodes, which have names or raw text.
+    if type in TOKEN_TYPES and 'name' not in data and 'raw' not in data:
+        return TokenEntry
+    choose = VARIANTS.get(type)
+    if choose is not None:
+        return choose(data)
+    # Types of other tools are kept, in plain nodes.
+    return CLASSES.get(type, Node)
+
+
+def regexValue(regex):
+    handler = ErrorHandler()
+    handler.tolerant = True
+    return Scanner('', handler).testRegExp(regex.pattern, regex.flags)
+
+
+def toObject(data):
+    cls = objectClass(data)
+    if cls is None:
+        return data
+    if cls is nodes.RegexLiteral and isinstance(data['regex'], Object):
+        # JSON has no regular expressions; the value is compiled again.
+        data['value'] = regexValue(data['regex'])
+    obj = cls.__new__(cls)
+    if 'async' in data or 'await' in data:
+        data = dict((RENAMES.get(k, k), v) for k, v in data.items())
+    obj.__dict__ = data
+    return obj
+
+
+def fromDict(data):
+    """
+    Builds the objects parse() gives from an ESTree tree of dicts and lists,
+    such as toDict() returns, so that visitors can walk it. The input is left
+    as it is.
+    """
+    if not isinstance(data, (dict, list)):
+        return data
+    # The containers in preorder, with the indexes of their parents, so that
+    # going backwards finds the children of every container built.
+    containers = [(data, -1, None)]
+    copies = []
+    i = 0
+    while i < len(containers):
+        value = containers[i][0]
+        if isinstance(value, dict):
+            copy = dict(value)
+            items = value.items()
+        else:
+            copy = list(value)
+            items = enumerate(value)
+        copies.append(copy)
+        for key, item in items:
+            if isinstance(item, (dict, list)):
+                containers.append((item, i, key))
+        i += 1
+    for i in range(len(containers) - 1, 0, -1):
+        copy = copies[i]
+        _, parent, key = containers[i]
+        copies[parent][key] = toObject(copy) if isinstance(copy, dict) else copy
+    return toObject(copies[0]) if isinstance(data, dict) else copies[0]
+
+
+def load(fp):
+    """
+    Reads a tree from an ESTree JSON file, building its objects as they are
+    decoded. See fromDict().
+    """
+    return json.load(fp, object_hook=toObject)
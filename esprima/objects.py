@@ -42,5 +42,27 @@ class Object(object):
         from .visitor import ReprVisitor
         return ReprVisitor().visit(self)
 
+    # Without it, unpickling goes through __getattr__ for every object.
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def __getattr__(self, name):
+        # Special methods are looked up by pickle and copy.
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
+        if name == 'loc' or name == 'range':
+            attributes = self.__dict__
+            if '_span' in attributes:
+                # Parsed with the compact option.
+                from .lines import spanAttribute
+                return spanAttribute(attributes, name)
+        if name == 'value' and '_cook' in self.__dict__:
+            # Parsed with lazyValues.
+            from .scanner import cookLiteral
+            return cookLiteral(self.__dict__)
+        if name == 'loc':
+            lines = self.__dict__.get('_lines')
+            if lines is not None:
+                # Parsed with loc='lazy': derived from the range.
+                return lines.location(self.range, self.__dict__.get('_start'))
         return None
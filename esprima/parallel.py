@@ -0,0 +1,637 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import gc
+import re
+
+from .comment_handler import CommentHandler
+from .error_handler import Error
+from .hashing import hashAttribute
+from .incremental import LINE_TERMINATOR, columnOf
+from .jsx_parser import JSXParser
+from .lines import joinSpans
+from .parser import Marker, Parser
+from .shared import SharedArray, attachTree, shareTree
+from .skeleton import BLANKS, BLOCK_COMMENT, COMMENT, LINE_TERMINATORS, REGEX, STRING, TEMPLATE, WHITESPACE
+from .token import Token
+
+# Chunks and function bodies smaller than this are not worth sending to
+# another process.
+MIN_CHUNK = 32 * 1024
+MIN_BODY = 4 * 1024
+
+INTERESTING = re.compile(r'[\'"`/{}()\[\];]')
+WORD = re.compile(r'([\w$]+)[ \t]*$')
+
+# After a statement ending with `;` or `}`: the rest of the line, then the
+# whitespace and comments up to the next token.
+NEXT_LINE = re.compile(
+    r'[%(w)s]*(?:/\*(?:[^*%(t)s]|\*+[^*/%(t)s])*\*+/[%(w)s]*)*(?://[^%(t)s]*)?(?:\r\n|[%(t)s])'
+    r'(?:[%(w)s%(t)s]|//[^%(t)s]*|%(c)s)*' % {'w': WHITESPACE, 't': LINE_TERMINATORS, 'c': BLOCK_COMMENT}
+)
+STATEMENT_START = re.compile(r'[A-Za-z_$][\w$]*|[0-9\'"]')
+TOKEN_START = re.compile(r'[A-Za-z_$][\w$]*|[^/]')
+
+# Words continuing the statement on the previous line.
+CONTINUATIONS = ('else', 'catch', 'finally', 'while', 'in', 'instanceof', 'from')
+
+# Before the parameters of a function, with its `async` and `*`.
+FUNCTION_HEAD = re.compile(r'(?:(?<![\w$])(async)\s+)?(?<![\w$.])function\s*(\*)?\s*[\w$]*\s*$')
+USE_STRICT = re.compile(
+    r'\s*(?:%(c)s\s*|//[^%(t)s]*\s*)*([\'"])use strict\1' % {'t': LINE_TERMINATORS, 'c': BLOCK_COMMENT}
+)
+
+# A slash after those words starts a regular expression.
+REGEX_AFTER = (
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+)
+
+
+class Function(object):
+    def __init__(self, open, close, generator, isAsync, useStrict, declaration):
+        self.open = open
+        self.close = close
+        self.generator = generator
+        self.isAsync = isAsync
+        self.useStrict = useStrict
+        self.declaration = declaration
+        self.children = []
+
+
+def prescan(code):
+    """Finds, without tokenizing, the offsets of tokens likely to start a
+    top-level statement and the bodies of the functions. Strings, comments,
+    templates and regular expressions are skipped and brackets are matched.
+    Only tokens at the start of a line, after a line ending with `;` or `}`,
+    are candidate statements. The scan stops at the first slash that could
+    be a division as well as a regular expression.
+
+    Returns the statement offsets and the functions, by closing offset."""
+
+    starts = []
+    functions = []
+    heads = {}  # open brace of a function body: (generator, async, declaration)
+    stack = []  # offsets of the open brackets and template substitutions
+    paren = close = -1  # offsets of the last ')' and of its '('
+    index = 0
+
+    def candidate(index, semicolon):
+        m = NEXT_LINE.match(code, index)
+        if m and m.end() < len(code):
+            # After `}`, most punctuators would continue an expression.
+            start = (TOKEN_START if semicolon else STATEMENT_START).match(code, m.end())
+            if start and start.group() not in CONTINUATIONS:
+                starts.append(m.end())
+
+    def template(index):
+        m = TEMPLATE.match(code, index)
+        if m.group(1) is None:
+            return None
+        if m.group(1) == '${':
+            stack.append(m.end() - 2)
+        return m.end()
+
+    search = INTERESTING.search
+    while True:
+        m = search(code, index)
+        if m is None:
+            break
+        pos = m.start()
+        ch = code[pos]
+        index = pos + 1
+
+        if ch in '({[':
+            if ch == '{':
+                j = pos - 1
+                while j >= 0 and code[j] in BLANKS:
+                    j -= 1
+                if j == close:
+                    m = FUNCTION_HEAD.search(code, max(0, paren - 64), paren)
+                    if m:
+                        k = m.start() - 1
+                        while k >= 0 and code[k] in BLANKS:
+                            k -= 1
+                        declaration = k < 0 or code[k] in ';{}'
+                        heads[pos] = (m.group(2) is not None, m.group(1) is not None, declaration)
+            stack.append(pos)
+
+        elif ch in ')}]':
+            if not stack:
+                break
+            start = stack.pop()
+            opening = code[start]
+            if opening == '$' and ch == '}':
+                index = template(index)
+                if index is None:
+                    break
+                continue
+            if opening + ch not in ('()', '{}', '[]'):
+                break
+            if ch == ')':
+                paren, close = start, pos
+            elif ch == '}' and start in heads:
+                generator, isAsync, declaration = heads.pop(start)
+                useStrict = USE_STRICT.match(code, start + 1) is not None
+                functions.append(Function(start, pos, generator, isAsync, useStrict, declaration))
+            if not stack and ch == '}':
+                candidate(index, False)
+
+        elif ch == ';':
+            if not stack:
+                candidate(index, True)
+
+        elif ch in '"\'':
+            m = STRING.match(code, pos)
+            if m is None:
+                break
+            index = m.end()
+
+        elif ch == '`':
+            index = template(index)
+            if index is None:
+                break
+
+        elif code[index:index + 1] in ('/', '*'):
+            m = COMMENT.match(code, pos)
+            if m is None:
+                break
+            index = m.end()
+
+        else:
+            j = pos - 1
+            while j >= 0 and code[j] in BLANKS:
+                j -= 1
+            previous = code[j] if j >= 0 else ''
+            if not previous or previous in '(,=:[!&|?{;~*%<>^':
+                regex = True
+            elif previous in '+-':
+                if code[j - 1:j] == previous:
+                    break
+                regex = True
+            elif previous == ')':
+                word = WORD.search(code, max(0, paren - 16), paren)
+                regex = word is not None and word.group(1) in ('if', 'while', 'for', 'with')
+            elif previous in ']"\'`':
+                regex = False
+            elif previous == '$' or previous == '_' or previous.isalnum():
+                word = WORD.search(code, max(0, j - 16), j + 1)
+                regex = word is not None and word.group(1) in REGEX_AFTER
+            else:
+                break
+            if regex:
+                m = REGEX.match(code, pos)
+                if m is None:
+                    break
+                index = m.end()
+
+    return starts, functions
+
+
+def chunkStarts(code, starts, count):
+    """Picks up to `count` - 1 of the `starts`, splitting `code` in chunks of
+    about the same size, with their line numbers and line starts."""
+
+    size = max(MIN_CHUNK, len(code) // count)
+    chunks = []
+    previous = line = lineStart = 0
+    for start in starts:
+        if start - previous >= size and len(code) - start >= size // 2:
+            line += len(LINE_TERMINATOR.findall(code, previous, start))
+            lineStart = start - columnOf(code, start, lineStart)
+            chunks.append((start, line + 1, lineStart))
+            previous = start
+    return chunks
+
+
+# State of the worker processes.
+worker = {}
+
+
+def setup(code, options):
+    # The workers only live for one parse.
+    gc.disable()
+    worker['code'] = code
+    worker['options'] = options
+
+
+def workerParser():
+    options = worker['options']
+
+    commentHandler = None
+    delegate = None
+    if options.get('comment', False):
+        commentHandler = CommentHandler()
+        delegate = commentHandler.visit
+
+    if options.get('jsx', False):
+        parser = JSXParser(worker['code'], options=options, delegate=delegate)
+    else:
+        parser = Parser(worker['code'], options=options, delegate=delegate)
+
+    if options.get('sourceType', 'script') == 'module':
+        parser.context.strict = True
+        parser.context.isModule = True
+        parser.scanner.isModule = True
+
+    return parser, commentHandler
+
+
+def moveParser(parser, commentHandler, start, line, lineStart):
+    # Forget the first token of the source, read by the constructor.
+    if commentHandler:
+        commentHandler.comments = []
+    del parser.errorHandler.errors[:]
+    parser.lookaheadBuffer.clear()
+    parser.tokens = []
+
+    scanner = parser.scanner
+    scanner.index = start
+    scanner.lineNumber = line
+    scanner.lineStart = lineStart
+    parser.startMarker = Marker(index=start, line=line, column=start - lineStart)
+    parser.lastMarker = Marker(index=start, line=line, column=start - lineStart)
+
+
+def parseChunk(chunk):
+    """Parses the top-level statements from `start` up to `end`, the start of
+    the next chunk. Returns None if the statements do not end there."""
+
+    start, line, lineStart, end, strict = chunk
+    parser, commentHandler = workerParser()
+
+    try:
+        if start == 0:
+            node = parser.createNode()
+            body = parser.parseDirectivePrologues()
+        else:
+            moveParser(parser, commentHandler, start, line, lineStart)
+            parser.context.strict = strict
+            parser.nextToken()
+            node = parser.createNode()
+            body = []
+
+        while parser.lookahead.type is not Token.EOF and (end is None or parser.lookahead.start < end):
+            body.append(parser.parseStatementListItem())
+    except Error:
+        return None
+
+    if end is not None and parser.lookahead.start != end:
+        return None
+
+    node = parser.finalize(node, parser.nodes.Module(body) if parser.context.isModule else parser.nodes.Script(body))
+    if end is not None and parser.config.tokens:
+        # The first token of the next chunk.
+        parser.tokens.pop()
+    return (
+        node, commentHandler.comments if commentHandler else None,
+        parser.tokens, parser.errorHandler.errors,
+    )
+
+
+def shareChunk(chunk):
+    """Parses a chunk as parseChunk() does, writing the statements to shared
+    memory. Returns None if they do not end as expected or have errors."""
+
+    result = parseChunk(chunk)
+    if result is None or result[3]:
+        return None
+    node, comments, tokens, _ = result
+    if comments is not None:
+        node.comments = comments
+    if worker['options'].get('tokens', False):
+        node.tokens = tokens
+    return shareTree(node)
+
+
+def attachChunk(result):
+    return None if result is None else attachTree(result)
+
+
+def parseBody(task):
+    """Parses the statements of a function body, as parseFunctionSourceElements
+    does. Returns None if they do not end at the expected closing brace."""
+
+    open, line, lineStart, close, _, _, strict, generator, isAsync, declaration = task
+    parser, commentHandler = workerParser()
+    moveParser(parser, commentHandler, open + 1, line, lineStart)
+    parser.scanner.curlyStack = ['{']
+
+    context = parser.context
+    context.strict = strict
+    context.allowYield = not generator
+    context.allowAwait = isAsync
+    context.isAssignmentTarget = declaration
+    context.isBindingElement = declaration
+    context.firstCoverInitializedNameError = None
+
+    try:
+        parser.nextToken()
+        body = parser.parseDirectivePrologues()
+        context.labelSet = {}
+        context.inIteration = False
+        context.inSwitch = False
+        context.inFunctionBody = True
+        while parser.lookahead.type is not Token.EOF and not parser.match('}'):
+            body.append(parser.parseStatementListItem())
+    except Error:
+        return None
+
+    if parser.lookahead.start != close:
+        return None
+
+    if parser.config.tokens:
+        # The closing brace.
+        parser.tokens.pop()
+    return (
+        body, commentHandler.comments if commentHandler else None,
+        parser.tokens, parser.errorHandler.errors,
+        # What the caller goes on with.
+        (context.isAssignmentTarget, context.isBindingElement, context.firstCoverInitializedNameError),
+    )
+
+
+class Results(object):
+    """The results of the workers, as they come, by the tasks first offset."""
+
+    def __init__(self, tasks, results):
+        self.tasks = iter(tasks)
+        self.results = results
+        self.done = {}
+
+    def get(self, offset):
+        while offset not in self.done:
+            self.done[next(self.tasks)[0]] = next(self.results)
+        return self.done.pop(offset)
+
+
+class SkipBodies(object):
+    """Parser mixin taking the statements of some function bodies from the
+    workers. A body is parsed as usual when the context differs from the one
+    the worker was given, or when the worker failed."""
+
+    def parseFunctionSourceElements(self):
+        task = self.bodies.get(self.lookahead.start)
+        context = self.context
+        if (
+            task is None or self.lookaheadBuffer or not self.match('{') or
+            context.strict != task[6] or context.allowYield == task[7] or context.allowAwait != task[8] or
+            not context.allowIn or context.isAssignmentTarget is not task[9] or
+            context.isBindingElement is not task[9] or context.firstCoverInitializedNameError is not None
+        ):
+            return super(SkipBodies, self).parseFunctionSourceElements()
+
+        result = self.results.get(task[0])
+        if result is None or result[3]:
+            return super(SkipBodies, self).parseFunctionSourceElements()
+        statements, comments, tokens, _, flags = result
+
+        scanner = self.scanner
+        curlyStack = list(scanner.curlyStack)
+        tokenCount = len(self.tokens)
+        commentCount = len(self.comments) if self.comments is not None else 0
+
+        node = self.createNode()
+        self.expect('{')
+        # The directives can make the function strict, which its parameters
+        # are checked for.
+        body = self.parseDirectivePrologues()
+        body[:] = statements
+
+        # Resume at the closing brace, with what the parser would have found
+        # in between.
+        _, _, _, close, line, lineStart, _, _, _, _ = task
+        scanner.index = close
+        scanner.lineNumber = line
+        scanner.lineStart = lineStart
+        scanner.curlyStack = curlyStack
+        self.lookaheadBuffer.clear()
+        self.tokens[tokenCount:] = tokens
+        if self.comments is not None:
+            self.comments[commentCount:] = comments
+        self.nextToken()
+        self.expect('}')
+        context.isAssignmentTarget, context.isBindingElement, context.firstCoverInitializedNameError = flags
+
+        return self.finalize(node, self.nodes.BlockStatement(body))
+
+
+class SkipParser(SkipBodies, Parser):
+    pass
+
+
+class SkipJSXParser(SkipBodies, JSXParser):
+    pass
+
+
+def selectBodies(code, functions, strict, count):
+    """Picks the function bodies for the workers: the ones not bigger than
+    about 1/`count` of the code, or without large enough functions in them,
+    the others being left to the main process. Returns the tasks for
+    parseBody(), by offset of the opening brace."""
+
+    size = max(MIN_BODY, len(code) // count)
+
+    root = Function(-1, len(code), False, False, strict, False)
+    stack = [root]
+    for function in sorted(functions, key=lambda function: function.open):
+        while stack[-1].close < function.open:
+            stack.pop()
+        stack[-1].children.append(function)
+        stack.append(function)
+
+    selected = []
+
+    def select(function, strict):
+        for child in function.children:
+            length = child.close - child.open
+            if length > size and any(c.close - c.open >= MIN_BODY for c in child.children):
+                select(child, strict or child.useStrict)
+            elif length >= MIN_BODY:
+                selected.append((child, strict))
+
+    select(root, strict)
+
+    # Line numbers and line starts of the braces.
+    positions = {}
+    line = 1
+    lineStart = previous = 0
+    for offset in sorted([f.open for f, _ in selected] + [f.close for f, _ in selected]):
+        line += len(LINE_TERMINATOR.findall(code, previous, offset))
+        lineStart = offset - columnOf(code, offset, lineStart)
+        positions[offset] = (line, lineStart)
+        previous = offset
+
+    return dict(
+        (f.open, (f.open,) + positions[f.open] + (f.close,) + positions[f.close] + (
+            strict, f.generator, f.isAsync,
+            # The cover grammar flags the body is likely to be parsed with:
+            # as left by the previous statement for a declaration, or by
+            # parsePrimaryExpression for an expression.
+            f.declaration,
+        ))
+        for f, strict in selected
+    )
+
+
+def parallelParse(code, options, workers):
+    """Parses `code` as `parse` does, with a pool of `workers` processes.
+
+    The top-level statements are split in chunks parsed by the workers. When
+    there are too few of them, as in a bundle wrapped in a single function,
+    the workers parse function bodies instead, while the main process parses
+    the rest. Falls back to parsing sequentially when a part does not end
+    where the prescan expected, or has errors.
+
+    With the `shared` option, the workers parsing chunks write their
+    statements to shared memory instead of sending them pickled, and they
+    are decoded when first accessed."""
+
+    from .esprima import parse
+
+    options = dict(options, workers=None)
+    if options.get('attachComment', False) or options.get('bodyCache') is not None:
+        return parse(code, options)
+
+    # The prologue of directives decides for the whole script.
+    strict = options.get('sourceType', 'script') == 'module'
+    if not strict:
+        parser = Parser(code, options=dict(options, comment=False, tokens=False))
+        try:
+            parser.parseDirectivePrologues()
+        except Error:
+            return parse(code, options)
+        strict = parser.context.strict
+
+    starts, functions = prescan(code)
+    chunks = chunkStarts(code, starts, workers * 4)
+    if chunks:
+        ast = parseStatements(code, options, workers, chunks, strict)
+    else:
+        bodies = selectBodies(code, functions, strict, workers * 4)
+        ast = parseBodies(code, options, workers, bodies) if len(bodies) > 1 else None
+
+    return parse(code, options) if ast is None else ast
+
+
+def runPool(code, options, workers, function, tasks, main=None, receive=None):
+    """Runs `function` on the `tasks` in a pool of workers. Returns the list
+    of results, each passed to `receive` if given, or, with `main`, what
+    `main` returns when called with the results, as they come."""
+
+    from multiprocessing import Pool
+
+    # Collecting while unpickling the results would take longer than parsing.
+    collect = gc.isenabled()
+    gc.disable()
+    pool = Pool(workers, setup, (code, options))
+    try:
+        if main is None:
+            results = pool.map(function, tasks, chunksize=1)
+            return results if receive is None else [receive(result) for result in results]
+        return main(Results(tasks, pool.imap(function, tasks)))
+    finally:
+        pool.terminate()
+        if collect:
+            gc.enable()
+
+
+def parseStatements(code, options, workers, chunks, strict):
+    chunks.insert(0, (0, 1, 0))
+    ends = [start for start, _, _ in chunks[1:]] + [None]
+    tasks = [(start, line, lineStart, end, strict) for (start, line, lineStart), end in zip(chunks, ends)]
+
+    # Shared trees leave out the line index of loc='lazy'.
+    if options.get('shared', False) and options.get('loc', False) != 'lazy':
+        trees = runPool(code, options, workers, shareChunk, tasks, receive=attachChunk)
+        if any(tree is None for tree in trees):
+            return None
+        results = [(tree, tree.comments, tree.tokens, None) for tree in trees]
+    else:
+        results = runPool(code, options, workers, parseChunk, tasks)
+        if any(result is None or result[3] for result in results):
+            return None
+
+    ast = results[0][0]
+    last = results[-1][0]
+    if isinstance(ast.body, SharedArray):
+        # Nothing was decoded yet.
+        ast.body = SharedArray([span for tree in trees for span in tree.body.spans])
+    else:
+        for result in results[1:]:
+            ast.body.extend(result[0].body)
+    if ast._span is not None:
+        # Compact locations.
+        ast._span = joinSpans(ast._span, last._span)
+    else:
+        if ast.range:
+            ast.range[1] = last.range[1]
+        if ast.loc:
+            ast.loc.end = last.loc.end
+    if options.get('hashes', False):
+        # Computed again by structuralHash(), from the joined statements.
+        ast.__dict__.pop(hashAttribute(options['hashes'] != 'anonymous'), None)
+
+    if options.get('comment', False):
+        ast.comments = [comment for result in results for comment in result[1]]
+
+    if options.get('tokens', False):
+        ast.tokens = [token for result in results for token in result[2]]
+
+    if options.get('tolerant', False):
+        ast.errors = []
+
+    return ast
+
+
+def parseBodies(code, options, workers, bodies):
+    commentHandler = CommentHandler() if options.get('comment', False) else None
+    delegate = commentHandler.visit if commentHandler else None
+
+    if options.get('jsx', False):
+        parser = SkipJSXParser(code, options=options, delegate=delegate)
+    else:
+        parser = SkipParser(code, options=options, delegate=delegate)
+    parser.bodies = bodies
+    parser.comments = commentHandler.comments if commentHandler else None
+
+    def main(results):
+        parser.results = results
+        if options.get('sourceType', 'script') == 'module':
+            return parser.parseModule()
+        return parser.parseScript()
+
+    ast = runPool(code, options, workers, parseBody, sorted(bodies.values()), main)
+
+    if commentHandler:
+        ast.comments = commentHandler.comments
+
+    if parser.config.tokens:
+        ast.tokens = parser.tokens
+
+    if parser.config.tolerant:
+        ast.errors = parser.errorHandler.errors
+
+    return ast
@@ -23,15 +23,37 @@
 
 from __future__ import absolute_import, unicode_literals
 
+from collections import deque
+
 from .objects import Object
 from .compat import basestring, unicode
 from .utils import format
+from .cache import CachedBody, Relocation
 from .error_handler import ErrorHandler
+from .factory import NodeFactory
+from .hashing import hashAttribute, nodeHash
 from .messages import Messages
 from .scanner import RawToken, Scanner, SourceLocation, Position, RegExp
-from .token import Token, TokenName
+from .lines import LineIndex, packSpan
+from .skeleton import skeleton
+from .token import Token, TokenCode, TokenName, codeSet
 from .syntax import Syntax
-from . import nodes as Node
+
+# Token codes and code sets tested in the hottest paths of the parser.
+PERIOD = TokenCode['.']
+LEFT_PAREN = TokenCode['(']
+LEFT_BRACKET = TokenCode['[']
+COLON = TokenCode[':']
+IN = TokenCode['in']
+ASSIGNMENT_OPERATORS = codeSet('=', '*=', '**=', '/=', '%=', '+=', '-=', '<<=', '>>=', '>>>=', '&=', '^=', '|=')
+UPDATE_OPERATORS = codeSet('++', '--')
+UNARY_OPERATORS = codeSet('+', '-', '~', '!', 'delete', 'void', 'typeof')
+
+LITERAL_TYPES = (Token.NumericLiteral, Token.StringLiteral, Token.BooleanLiteral, Token.NullLiteral)
+PROPERTY_KEY_TYPES = LITERAL_TYPES + (Token.Identifier, Token.Keyword)
+
+# Identifiers only in sloppy mode scripts.
+MODULE_RESERVED_WORDS = frozenset(Scanner.isStrictModeReservedWord.set | set(['await']))
 
 
 class Value(object):
@@ -52,13 +74,14 @@ class Params(object):
 
 
 class Config(Object):
-    def __init__(self, range=False, loc=False, source=None, tokens=False, comment=False, tolerant=False, **options):
+    def __init__(self, range=False, loc=False, source=None, tokens=False, comment=False, tolerant=False, trusted=False, **options):
         self.range = range
         self.loc = loc
         self.source = source
         self.tokens = tokens
         self.comment = comment
         self.tolerant = tolerant
+        self.trusted = trusted
         for k, v in options.items():
             setattr(self, k, v)
 
@@ -81,6 +104,9 @@ class Context(object):
 
 
 class Marker(object):
+    # Whether the column is not that of the index (see startNode).
+    skewed = False
+
     def __init__(self, index=None, line=None, column=None):
         self.index = index
         self.line = line
@@ -96,16 +122,51 @@ class TokenEntry(Object):
         self.loc = loc
 
 
+class BufferedToken(object):
+    def __init__(self, mode, index, comments, start, token, end, curlyStack):
+        self.mode = mode
+        self.index = index
+        self.comments = comments
+        self.start = start
+        self.token = token
+        self.end = end
+        self.curlyStack = curlyStack
+
+
 class Parser(object):
     def __init__(self, code, options={}, delegate=None):
         self.config = Config(**options)
+        self.lines = self.tokenLines = None
+        # The locations of the nodes are packed in an integer, their range
+        # and loc being built from it when read, and kept unless 'uncached'.
+        # Tokens and comments have theirs as usual.
+        self.compact = bool(self.config.compact and self.config.range and self.config.loc is True)
+        self.spanCache = self.config.compact != 'uncached'
+        # The structural hashes of the nodes are computed as they are
+        # created, from those of their children, with or without names.
+        self.hashNames = None
+        if self.config.hashes:
+            self.hashNames = self.config.hashes != 'anonymous'
+            self.hashAttribute = hashAttribute(self.hashNames)
+            self.hashDigests = {}
+        if self.config.loc == 'lazy':
+            # Only the ranges are tracked, the locations being derived from
+            # them when read. Those of tokens and comments have no source.
+            self.config.loc = False
+            self.config.range = True
+            self.lines = LineIndex(code, self.config.source)
+            self.tokenLines = self.lines.named(None) if self.config.source else self.lines
 
         self.delegate = delegate
+        self.nodes = self.config.nodeFactory or NodeFactory()
 
         self.errorHandler = ErrorHandler()
         self.errorHandler.tolerant = self.config.tolerant
         self.scanner = Scanner(code, self.errorHandler)
         self.scanner.trackComment = self.config.comment
+        # Nodes of a factory may not derive their values.
+        self.scanner.cook = not self.config.lazyValues or self.config.nodeFactory is not None
+        self.scanner.trusted = self.config.trusted and self.config.nodeFactory is None
 
         self.operatorPrecedence = {
             '||': 1,
@@ -132,6 +193,37 @@ class Parser(object):
             '/': 11,
             '%': 11,
         }
+        self.precedenceTable = [0] * (len(TokenCode) + 1)
+        for op, precedence in self.operatorPrecedence.items():
+            self.precedenceTable[TokenCode[op]] = precedence
+
+        # Statement productions, indexed by the code of their leading token.
+        self.statementTable = self.dispatchTable(self.parseExpressionStatement, {
+            '{': self.parseBlock,
+            ';': self.parseEmptyStatement,
+            'break': self.parseBreakStatement,
+            'continue': self.parseContinueStatement,
+            'debugger': self.parseDebuggerStatement,
+            'do': self.parseDoWhileStatement,
+            'for': self.parseForStatement,
+            'function': self.parseFunctionDeclaration,
+            'if': self.parseIfStatement,
+            'return': self.parseReturnStatement,
+            'switch': self.parseSwitchStatement,
+            'throw': self.parseThrowStatement,
+            'try': self.parseTryStatement,
+            'var': self.parseVariableStatement,
+            'while': self.parseWhileStatement,
+            'with': self.parseWithStatement,
+        })
+        self.statementListItemTable = self.dispatchTable(self.parseStatement, {
+            'export': self.parseExportListItem,
+            'import': self.parseImportListItem,
+            'const': self.parseLexicalListItem,
+            'let': self.parseLexicalListItem,
+            'function': self.parseFunctionDeclaration,
+            'class': self.parseClassDeclaration,
+        })
 
         self.lookahead = RawToken(
             type=Token.EOF,
@@ -142,6 +234,23 @@ class Parser(object):
             end=0
         )
         self.hasLineTerminator = False
+        # Set in sloppy mode code by what strict mode code would not allow.
+        self.strictSensitive = False
+
+        config = self.config
+        self.bodyCache = config.bodyCache
+        if (
+            config.tokens or config.comment or delegate or config.nodeFactory or
+            (config.loc and not config.range) or self.lines is not None or self.compact
+        ):
+            self.bodyCache = None
+        else:
+            self.bodyOptions = (
+                self.__class__, config.range, config.loc, config.source,
+                config.tolerant, config.trusted, config.classProperties, config.lazyValues,
+            )
+        # Closing brace offsets, by opening brace offset.
+        self.braces = None
 
         self.context = Context(
             isModule=False,
@@ -159,6 +268,7 @@ class Parser(object):
             strict=False
         )
         self.tokens = []
+        self.lookaheadBuffer = deque(maxlen=2)
 
         self.startMarker = Marker(
             index=0,
@@ -239,37 +349,103 @@ class Parser(object):
     def tolerateUnexpectedToken(self, token=None, message=None):
         self.errorHandler.tolerate(self.unexpectedTokenError(token, message))
 
-    def collectComments(self):
-        if not self.config.comment:
-            self.scanner.scanComments()
-        else:
+    def collectComments(self, comments=None):
+        if comments is None:
             comments = self.scanner.scanComments()
-            if comments:
-                for e in comments:
-                    if e.multiLine:
-                        node = Node.BlockComment(self.scanner.source[e.slice[0]:e.slice[1]])
-                    else:
-                        node = Node.LineComment(self.scanner.source[e.slice[0]:e.slice[1]])
-                    if self.config.range:
-                        node.range = e.range
-                    if self.config.loc:
-                        node.loc = e.loc
-                    if self.delegate:
-                        metadata = SourceLocation(
-                            start=Position(
-                                line=e.loc.start.line,
-                                column=e.loc.start.column,
-                                offset=e.range[0],
-                            ),
-                            end=Position(
-                                line=e.loc.end.line,
-                                column=e.loc.end.column,
-                                offset=e.range[1],
-                            )
+        if self.config.comment and comments:
+            for e in comments:
+                if e.multiLine:
+                    node = self.nodes.BlockComment(self.scanner.source[e.slice[0]:e.slice[1]])
+                else:
+                    node = self.nodes.LineComment(self.scanner.source[e.slice[0]:e.slice[1]])
+                if self.config.range:
+                    node.range = e.range
+                    if self.tokenLines is not None:
+                        node._lines = self.tokenLines
+                if self.config.loc:
+                    node.loc = e.loc
+                if self.delegate:
+                    metadata = SourceLocation(
+                        start=Position(
+                            line=e.loc.start.line,
+                            column=e.loc.start.column,
+                            offset=e.range[0],
+                        ),
+                        end=Position(
+                            line=e.loc.end.line,
+                            column=e.loc.end.column,
+                            offset=e.range[1],
                         )
-                        new_node = self.delegate(node, metadata)
-                        if new_node is not None:
-                            node = new_node
+                    )
+                    new_node = self.delegate(node, metadata)
+                    if new_node is not None:
+                        node = new_node
+
+    # Lookahead buffer.
+    #
+    # Some productions need to see the token after the lookahead before they
+    # decide (`let [`, `async function`, `import(`, JSX names...). Instead of
+    # scanning that token, rewinding the scanner and scanning it all over again
+    # when it's consumed, the scanned token is kept, along with its comments and
+    # the scanner states around it, in a small ring buffer. The next call to
+    # nextToken() (or nextJSXToken()) from the same position consumes it.
+    #
+    # Entries are keyed by the scanner index they were scanned from and by the
+    # lexing mode, and the buffer is cleared whenever the scanner is rewound
+    # (regular expressions, JSX elements and JSX text), so a buffered token is
+    # only ever used where the very same token would have been scanned.
+
+    def bufferToken(self, mode, lex):
+        scanner = self.scanner
+        index = scanner.index
+        for entry in self.lookaheadBuffer:
+            if entry.index == index and entry.mode == mode:
+                return entry
+
+        lineNumber = scanner.lineNumber
+        lineStart = scanner.lineStart
+        curlyStack = scanner.curlyStack
+        scanner.curlyStack = curlyStack[:]
+        comments = scanner.scanComments()
+        start = (scanner.index, scanner.lineNumber, scanner.lineStart)
+        token = lex()
+        entry = BufferedToken(
+            mode=mode,
+            index=index,
+            comments=comments,
+            start=start,
+            token=token,
+            end=(scanner.index, scanner.lineNumber, scanner.lineStart),
+            curlyStack=scanner.curlyStack
+        )
+        scanner.index = index
+        scanner.lineNumber = lineNumber
+        scanner.lineStart = lineStart
+        scanner.curlyStack = curlyStack
+        self.lookaheadBuffer.append(entry)
+
+        return entry
+
+    def unbufferToken(self, mode):
+        scanner = self.scanner
+        index = scanner.index
+        while self.lookaheadBuffer:
+            entry = self.lookaheadBuffer.popleft()
+            if entry.index == index and entry.mode == mode:
+                self.collectComments(entry.comments)
+                scanner.index, scanner.lineNumber, scanner.lineStart = entry.start
+                return entry
+        self.collectComments()
+        return None
+
+    def consumeBufferedToken(self, entry):
+        scanner = self.scanner
+        scanner.index, scanner.lineNumber, scanner.lineStart = entry.end
+        scanner.curlyStack = entry.curlyStack
+        return entry.token
+
+    def peekToken(self):
+        return self.bufferToken('lex', self.scanner.lex).token
 
     # From internal representation to an external structure
 
@@ -283,6 +459,10 @@ class Parser(object):
         )
         if self.config.range:
             t.range = [token.start, token.end]
+            if self.tokenLines is not None:
+                # Derived from the range when read.
+                del t.loc
+                t._lines = self.tokenLines
         if self.config.loc:
             t.loc = SourceLocation(
                 start=Position(
@@ -309,19 +489,26 @@ class Parser(object):
         self.lastMarker.line = self.scanner.lineNumber
         self.lastMarker.column = self.scanner.index - self.scanner.lineStart
 
-        self.collectComments()
+        entry = None
+        if self.lookaheadBuffer:
+            entry = self.unbufferToken('lex')
+        else:
+            self.collectComments()
 
         if self.scanner.index != self.startMarker.index:
             self.startMarker.index = self.scanner.index
             self.startMarker.line = self.scanner.lineNumber
             self.startMarker.column = self.scanner.index - self.scanner.lineStart
 
-        next = self.scanner.lex()
+        next = self.consumeBufferedToken(entry) if entry else self.scanner.lex()
         self.hasLineTerminator = token.lineNumber != next.lineNumber
 
-        if next and self.context.strict and next.type is Token.Identifier:
-            if self.scanner.isStrictModeReservedWord(next.value):
+        if next and next.type is Token.Identifier and next.value in MODULE_RESERVED_WORDS:
+            if self.context.strict and self.scanner.isStrictModeReservedWord(next.value):
                 next.type = Token.Keyword
+                next.code = TokenCode[next.value]
+            else:
+                self.strictSensitive = True
         self.lookahead = next
 
         if self.config.tokens and next.type is not Token.EOF:
@@ -330,6 +517,7 @@ class Parser(object):
         return token
 
     def nextRegexToken(self):
+        self.lookaheadBuffer.clear()
         self.collectComments()
 
         token = self.scanner.scanRegExp()
@@ -346,6 +534,19 @@ class Parser(object):
 
         return token
 
+    # Resumes parsing at the given position.
+    def moveTo(self, index, line, lineStart):
+        scanner = self.scanner
+        scanner.index = index
+        scanner.lineNumber = line
+        scanner.lineStart = lineStart
+        scanner.curlyStack = []
+        self.lookaheadBuffer.clear()
+        self.startMarker = Marker(index=index, line=line, column=index - lineStart)
+        self.lastMarker = Marker(index=index, line=line, column=index - lineStart)
+        self.nextToken()
+        self.lastMarker = Marker(index=scanner.index, line=scanner.lineNumber, column=scanner.index - scanner.lineStart)
+
     def createNode(self):
         return Marker(
             index=self.startMarker.index,
@@ -357,8 +558,15 @@ class Parser(object):
         column = token.start - token.lineStart
         line = token.lineNumber
         if column < 0:
+            # A token spanning lines, as a template or a string with line
+            # continuations: as in esprima.js, the column is counted from
+            # the line of the token after it, if given, else from the last
+            # line of the token, and the line is the one before.
             column += lastLineStart
             line -= 1
+            marker = Marker(index=token.start, line=line, column=column)
+            marker.skewed = True
+            return marker
 
         return Marker(
             index=token.start,
@@ -367,22 +575,40 @@ class Parser(object):
         )
 
     def finalize(self, marker, node):
-        if self.config.range:
-            node.range = [marker.index, self.lastMarker.index]
-
-        if self.config.loc:
-            node.loc = SourceLocation(
-                start=Position(
-                    line=marker.line,
-                    column=marker.column,
-                ),
-                end=Position(
-                    line=self.lastMarker.line,
-                    column=self.lastMarker.column,
-                ),
+        if self.compact:
+            node._span = packSpan(
+                marker.index, self.lastMarker.index,
+                marker.line, marker.column,
+                self.lastMarker.line, self.lastMarker.column,
+                self.spanCache,
             )
             if self.config.source:
-                node.loc.source = self.config.source
+                node._source = self.config.source
+        else:
+            if self.config.range:
+                node.range = [marker.index, self.lastMarker.index]
+                if self.lines is not None:
+                    node._lines = self.lines
+                    if marker.skewed:
+                        # Not derived from the range.
+                        node._start = Position(line=marker.line, column=marker.column)
+
+            if self.config.loc:
+                node.loc = SourceLocation(
+                    start=Position(
+                        line=marker.line,
+                        column=marker.column,
+                    ),
+                    end=Position(
+                        line=self.lastMarker.line,
+                        column=self.lastMarker.column,
+                    ),
+                )
+                if self.config.source:
+                    node.loc.source = self.config.source
+                if marker.skewed:
+                    # For the positions moved by reparse() and BodyCache.
+                    node._skewed = True
 
         if self.delegate:
             metadata = SourceLocation(
@@ -401,8 +627,16 @@ class Parser(object):
             if new_node is not None:
                 node = new_node
 
+        if self.hashNames is not None:
+            node.__dict__[self.hashAttribute] = nodeHash(node, self.hashNames, self.hashDigests)
+
         return node
 
+    def rehash(self, node):
+        # Once changed after being finalized.
+        if self.hashNames is not None:
+            node.__dict__[self.hashAttribute] = nodeHash(node, self.hashNames, self.hashDigests)
+
     # Expect the next token to match the specified punctuator.
     # If not, an exception will be thrown.
 
@@ -434,6 +668,17 @@ class Parser(object):
         if token.type is not Token.Keyword or token.value != keyword:
             self.throwUnexpectedToken(token)
 
+    # Build a list indexed by token code, mapping the given punctuators and
+    # keywords to their productions and every other code to the default one.
+    # Code 0 (tokens which are neither punctuators nor keywords) maps to None.
+
+    def dispatchTable(self, default, productions):
+        table = [default] * (len(TokenCode) + 1)
+        table[0] = None
+        for value, production in productions.items():
+            table[TokenCode[value]] = production
+        return table
+
     # Return true if the next token matches the specified punctuator.
 
     def match(self, *value):
@@ -453,11 +698,7 @@ class Parser(object):
     # Return true if the next token is an assignment operator
 
     def matchAssign(self):
-        if self.lookahead.type is not Token.Punctuator:
-            return False
-
-        op = self.lookahead.value
-        return op in ('=', '*=', '**=', '/=', '%=', '+=', '-=', '<<=', '>>=', '>>>=', '&=', '^=', '|=')
+        return ASSIGNMENT_OPERATORS >> self.lookahead.code & 1 == 1
 
     # Cover grammar support.
     #
@@ -546,33 +787,10 @@ class Parser(object):
         if typ is Token.Identifier:
             if (self.context.isModule or self.context.allowAwait) and self.lookahead.value == 'await':
                 self.tolerateUnexpectedToken(self.lookahead)
-            expr = self.parseFunctionExpression() if self.matchAsyncFunction() else self.finalize(node, Node.Identifier(self.nextToken().value))
-
-        elif typ in (
-            Token.NumericLiteral,
-            Token.StringLiteral,
-        ):
-            if self.context.strict and self.lookahead.octal:
-                self.tolerateUnexpectedToken(self.lookahead, Messages.StrictOctalLiteral)
-            self.context.isAssignmentTarget = False
-            self.context.isBindingElement = False
-            token = self.nextToken()
-            raw = self.getTokenRaw(token)
-            expr = self.finalize(node, Node.Literal(token.value, raw))
-
-        elif typ is Token.BooleanLiteral:
-            self.context.isAssignmentTarget = False
-            self.context.isBindingElement = False
-            token = self.nextToken()
-            raw = self.getTokenRaw(token)
-            expr = self.finalize(node, Node.Literal(token.value == 'true', raw))
+            expr = self.parseFunctionExpression() if self.matchAsyncFunction() else self.finalize(node, self.nodes.Identifier(self.nextToken().value))
 
-        elif typ is Token.NullLiteral:
-            self.context.isAssignmentTarget = False
-            self.context.isBindingElement = False
-            token = self.nextToken()
-            raw = self.getTokenRaw(token)
-            expr = self.finalize(node, Node.Literal(None, raw))
+        elif typ in LITERAL_TYPES:
+            expr = self.parseLiteral()
 
         elif typ is Token.Template:
             expr = self.parseTemplateLiteral()
@@ -592,15 +810,22 @@ class Parser(object):
                 self.scanner.index = self.startMarker.index
                 token = self.nextRegexToken()
                 raw = self.getTokenRaw(token)
-                expr = self.finalize(node, Node.RegexLiteral(token.regex, raw, token.pattern, token.flags))
+                literal = self.nodes.RegexLiteral(token.regex, raw, token.pattern, token.flags)
+                if self.scanner.trusted:
+                    # Trusted: compiled when read.
+                    del literal.value
+                    literal._cook = True
+                expr = self.finalize(node, literal)
             else:
                 expr = self.throwUnexpectedToken(self.nextToken())
 
         elif typ is Token.Keyword:
             if not self.context.strict and self.context.allowYield and self.matchKeyword('yield'):
+                self.strictSensitive = True
                 expr = self.parseIdentifierName()
             elif not self.context.strict and self.matchKeyword('let'):
-                expr = self.finalize(node, Node.Identifier(self.nextToken().value))
+                self.strictSensitive = True
+                expr = self.finalize(node, self.nodes.Identifier(self.nextToken().value))
             else:
                 self.context.isAssignmentTarget = False
                 self.context.isBindingElement = False
@@ -608,7 +833,7 @@ class Parser(object):
                     expr = self.parseFunctionExpression()
                 elif self.matchKeyword('this'):
                     self.nextToken()
-                    expr = self.finalize(node, Node.ThisExpression())
+                    expr = self.finalize(node, self.nodes.ThisExpression())
                 elif self.matchKeyword('class'):
                     expr = self.parseClassExpression()
                 elif self.matchImportCall():
@@ -623,11 +848,42 @@ class Parser(object):
 
     # https://tc39.github.io/ecma262/#sec-array-initializer
 
+    def parseLiteral(self):
+        node = self.createNode()
+
+        typ = self.lookahead.type
+        if typ is not Token.BooleanLiteral and typ is not Token.NullLiteral:
+            if self.lookahead.octal:
+                if self.context.strict:
+                    self.tolerateUnexpectedToken(self.lookahead, Messages.StrictOctalLiteral)
+                else:
+                    self.strictSensitive = True
+        self.context.isAssignmentTarget = False
+        self.context.isBindingElement = False
+        token = self.nextToken()
+        raw = self.getTokenRaw(token)
+        if typ is Token.BooleanLiteral:
+            value = token.value == 'true'
+        elif typ is Token.NullLiteral:
+            value = None
+        else:
+            value = token.value
+
+        return self.finalize(node, self.createLiteral(token, value, raw))
+
+    def createLiteral(self, token, value, raw):
+        literal = self.nodes.Literal(value, raw)
+        if value is None and token.type is Token.StringLiteral:
+            # Parsed with lazyValues: cooked from the raw string when read.
+            del literal.value
+            literal._cook = True
+        return literal
+
     def parseSpreadElement(self):
         node = self.createNode()
         self.expect('...')
         arg = self.inheritCoverGrammar(self.parseAssignmentExpression)
-        return self.finalize(node, Node.SpreadElement(arg))
+        return self.finalize(node, self.nodes.SpreadElement(arg))
 
     def parseArrayInitializer(self):
         node = self.createNode()
@@ -646,12 +902,26 @@ class Parser(object):
                     self.expect(',')
                 elements.append(element)
             else:
-                elements.append(self.inheritCoverGrammar(self.parseAssignmentExpression))
+                elements.append(self.parseInitializerElement(']'))
                 if not self.match(']'):
                     self.expect(',')
         self.expect(']')
 
-        return self.finalize(node, Node.ArrayExpression(elements))
+        return self.finalize(node, self.nodes.ArrayExpression(elements))
+
+    # Data-heavy scripts (tables, fixtures, embedded configurations) consist
+    # mostly of literal-only arrays and objects. An element which is a single
+    # literal, directly followed by a comma or by the closing bracket, is built
+    # here without going down the whole assignment expression chain; anything
+    # else takes the general route. The token after the literal is peeked
+    # through the lookahead buffer, so it is scanned only once.
+
+    def parseInitializerElement(self, closer):
+        if self.lookahead.type in LITERAL_TYPES:
+            next = self.peekToken()
+            if next.type is Token.Punctuator and (next.value == ',' or next.value == closer):
+                return self.parseLiteral()
+        return self.inheritCoverGrammar(self.parseAssignmentExpression)
 
     # https://tc39.github.io/ecma262/#sec-object-initializer
 
@@ -682,7 +952,7 @@ class Parser(object):
         method = self.parsePropertyMethod(params)
         self.context.allowYield = previousAllowYield
 
-        return self.finalize(node, Node.FunctionExpression(None, params.params, method, isGenerator))
+        return self.finalize(node, self.nodes.FunctionExpression(None, params.params, method, isGenerator))
 
     def parsePropertyMethodAsyncFunction(self):
         node = self.createNode()
@@ -696,7 +966,7 @@ class Parser(object):
         self.context.allowYield = previousAllowYield
         self.context.allowAwait = previousAwait
 
-        return self.finalize(node, Node.AsyncFunctionExpression(None, params.params, method))
+        return self.finalize(node, self.nodes.AsyncFunctionExpression(None, params.params, method))
 
     def parseObjectPropertyKey(self):
         node = self.createNode()
@@ -707,10 +977,13 @@ class Parser(object):
             Token.StringLiteral,
             Token.NumericLiteral,
         ):
-            if self.context.strict and token.octal:
-                self.tolerateUnexpectedToken(token, Messages.StrictOctalLiteral)
+            if token.octal:
+                if self.context.strict:
+                    self.tolerateUnexpectedToken(token, Messages.StrictOctalLiteral)
+                else:
+                    self.strictSensitive = True
             raw = self.getTokenRaw(token)
-            key = self.finalize(node, Node.Literal(token.value, raw))
+            key = self.finalize(node, self.createLiteral(token, token.value, raw))
 
         elif typ in (
             Token.Identifier,
@@ -718,7 +991,7 @@ class Parser(object):
             Token.NullLiteral,
             Token.Keyword,
         ):
-            key = self.finalize(node, Node.Identifier(token.value))
+            key = self.finalize(node, self.nodes.Identifier(token.value))
 
         elif typ is Token.Punctuator:
             if token.value == '[':
@@ -755,7 +1028,7 @@ class Parser(object):
             self.nextToken()
             computed = self.match('[')
             isAsync = not self.hasLineTerminator and (id == 'async') and not (self.match(':', '(', '*', ','))
-            key = self.parseObjectPropertyKey() if isAsync else self.finalize(node, Node.Identifier(id))
+            key = self.parseObjectPropertyKey() if isAsync else self.finalize(node, self.nodes.Identifier(id))
         elif self.match('*'):
             self.nextToken()
         else:
@@ -801,20 +1074,35 @@ class Parser(object):
                 method = True
 
             elif token.type is Token.Identifier:
-                id = self.finalize(node, Node.Identifier(token.value))
+                id = self.finalize(node, self.nodes.Identifier(token.value))
                 if self.match('='):
                     self.context.firstCoverInitializedNameError = self.lookahead
                     self.nextToken()
                     shorthand = True
                     init = self.isolateCoverGrammar(self.parseAssignmentExpression)
-                    value = self.finalize(node, Node.AssignmentPattern(id, init))
+                    value = self.finalize(node, self.nodes.AssignmentPattern(id, init))
                 else:
                     shorthand = True
                     value = id
             else:
                 self.throwUnexpectedToken(self.nextToken())
 
-        return self.finalize(node, Node.Property(kind, key, computed, value, method, shorthand))
+        return self.finalize(node, self.nodes.Property(kind, key, computed, value, method, shorthand))
+
+    # A `key: value` property with a plain (non-computed) key, the only kind
+    # found in literal-only objects.
+
+    def parseDataProperty(self, hasProto):
+        node = self.createNode()
+        key = self.parseObjectPropertyKey()
+        if self.isPropertyKey(key, '__proto__'):
+            if hasProto.value:
+                self.tolerateError(Messages.DuplicateProtoProperty)
+            hasProto.value = True
+        self.nextToken()
+        value = self.parseInitializerElement('}')
+
+        return self.finalize(node, self.nodes.Property('init', key, False, value, False, False))
 
     def parseObjectInitializer(self):
         node = self.createNode()
@@ -823,12 +1111,17 @@ class Parser(object):
         properties = []
         hasProto = Value(False)
         while not self.match('}'):
-            properties.append(self.parseSpreadElement() if self.match('...') else self.parseObjectProperty(hasProto))
+            if self.match('...'):
+                properties.append(self.parseSpreadElement())
+            elif self.lookahead.type in PROPERTY_KEY_TYPES and self.peekToken().code == COLON:
+                properties.append(self.parseDataProperty(hasProto))
+            else:
+                properties.append(self.parseObjectProperty(hasProto))
             if not self.match('}'):
                 self.expectCommaSeparator()
         self.expect('}')
 
-        return self.finalize(node, Node.ObjectExpression(properties))
+        return self.finalize(node, self.nodes.ObjectExpression(properties))
 
     # https://tc39.github.io/ecma262/#sec-template-literals
 
@@ -840,7 +1133,7 @@ class Parser(object):
         raw = token.value
         cooked = token.cooked
 
-        return self.finalize(node, Node.TemplateElement(raw, cooked, token.tail))
+        return self.finalize(node, self.nodes.TemplateElement(raw, cooked, token.tail))
 
     def parseTemplateElement(self):
         if self.lookahead.type is not Token.Template:
@@ -851,7 +1144,7 @@ class Parser(object):
         raw = token.value
         cooked = token.cooked
 
-        return self.finalize(node, Node.TemplateElement(raw, cooked, token.tail))
+        return self.finalize(node, self.nodes.TemplateElement(raw, cooked, token.tail))
 
     def parseTemplateLiteral(self):
         node = self.createNode()
@@ -866,7 +1159,7 @@ class Parser(object):
             quasi = self.parseTemplateElement()
             quasis.append(quasi)
 
-        return self.finalize(node, Node.TemplateLiteral(quasis, expressions))
+        return self.finalize(node, self.nodes.TemplateLiteral(quasis, expressions))
 
     # https://tc39.github.io/ecma262/#sec-grouping-operator
 
@@ -882,19 +1175,27 @@ class Parser(object):
         elif typ is Syntax.SpreadElement:
             expr.type = Syntax.RestElement
             self.reinterpretExpressionAsPattern(expr.argument)
+            self.rehash(expr)
         elif typ is Syntax.ArrayExpression:
             expr.type = Syntax.ArrayPattern
             for elem in expr.elements:
                 if elem is not None:
                     self.reinterpretExpressionAsPattern(elem)
+            self.rehash(expr)
         elif typ is Syntax.ObjectExpression:
             expr.type = Syntax.ObjectPattern
             for prop in expr.properties:
-                self.reinterpretExpressionAsPattern(prop if prop.type is Syntax.SpreadElement else prop.value)
+                if prop.type is Syntax.SpreadElement:
+                    self.reinterpretExpressionAsPattern(prop)
+                else:
+                    self.reinterpretExpressionAsPattern(prop.value)
+                    self.rehash(prop)
+            self.rehash(expr)
         elif typ is Syntax.AssignmentExpression:
             expr.type = Syntax.AssignmentPattern
             del expr.operator
             self.reinterpretExpressionAsPattern(expr.left)
+            self.rehash(expr)
         else:
             # Allow other node type for tolerant parsing.
             pass
@@ -905,7 +1206,7 @@ class Parser(object):
             self.nextToken()
             if not self.match('=>'):
                 self.expect('=>')
-            expr = Node.ArrowParameterPlaceHolder([])
+            expr = self.nodes.ArrowParameterPlaceHolder([])
         else:
             startToken = self.lookahead
             params = []
@@ -914,7 +1215,7 @@ class Parser(object):
                 self.expect(')')
                 if not self.match('=>'):
                     self.expect('=>')
-                expr = Node.ArrowParameterPlaceHolder([expr])
+                expr = self.nodes.ArrowParameterPlaceHolder([expr])
             else:
                 arrow = False
                 self.context.isBindingElement = True
@@ -934,7 +1235,7 @@ class Parser(object):
                             for expression in expressions:
                                 self.reinterpretExpressionAsPattern(expression)
                             arrow = True
-                            expr = Node.ArrowParameterPlaceHolder(expressions)
+                            expr = self.nodes.ArrowParameterPlaceHolder(expressions)
                         elif self.match('...'):
                             if not self.context.isBindingElement:
                                 self.throwUnexpectedToken(self.lookahead)
@@ -946,20 +1247,20 @@ class Parser(object):
                             for expression in expressions:
                                 self.reinterpretExpressionAsPattern(expression)
                             arrow = True
-                            expr = Node.ArrowParameterPlaceHolder(expressions)
+                            expr = self.nodes.ArrowParameterPlaceHolder(expressions)
                         else:
                             expressions.append(self.inheritCoverGrammar(self.parseAssignmentExpression))
                         if arrow:
                             break
                     if not arrow:
-                        expr = self.finalize(self.startNode(startToken), Node.SequenceExpression(expressions))
+                        expr = self.finalize(self.startNode(startToken), self.nodes.SequenceExpression(expressions))
 
                 if not arrow:
                     self.expect(')')
                     if self.match('=>'):
                         if expr.type is Syntax.Identifier and expr.name == 'yield':
                             arrow = True
-                            expr = Node.ArrowParameterPlaceHolder([expr])
+                            expr = self.nodes.ArrowParameterPlaceHolder([expr])
                         if not arrow:
                             if not self.context.isBindingElement:
                                 self.throwUnexpectedToken(self.lookahead)
@@ -974,7 +1275,7 @@ class Parser(object):
                                 parameters = expr.expressions
                             else:
                                 parameters = [expr]
-                            expr = Node.ArrowParameterPlaceHolder(parameters)
+                            expr = self.nodes.ArrowParameterPlaceHolder(parameters)
                     self.context.isBindingElement = False
 
         return expr
@@ -1013,7 +1314,7 @@ class Parser(object):
         token = self.nextToken()
         if not self.isIdentifierName(token):
             self.throwUnexpectedToken(token)
-        return self.finalize(node, Node.Identifier(token.value))
+        return self.finalize(node, self.nodes.Identifier(token.value))
 
     def parseNewExpression(self):
         node = self.createNode()
@@ -1025,7 +1326,7 @@ class Parser(object):
             self.nextToken()
             if self.lookahead.type is Token.Identifier and self.context.inFunctionBody and self.lookahead.value == 'target':
                 property = self.parseIdentifierName()
-                expr = Node.MetaProperty(id, property)
+                expr = self.nodes.MetaProperty(id, property)
             else:
                 self.throwUnexpectedToken(self.lookahead)
         elif self.matchKeyword('import'):
@@ -1033,7 +1334,7 @@ class Parser(object):
         else:
             callee = self.isolateCoverGrammar(self.parseLeftHandSideExpression)
             args = self.parseArguments() if self.match('(') else []
-            expr = Node.NewExpression(callee, args)
+            expr = self.nodes.NewExpression(callee, args)
             self.context.isAssignmentTarget = False
             self.context.isBindingElement = False
 
@@ -1066,10 +1367,7 @@ class Parser(object):
     def matchImportCall(self):
         match = self.matchKeyword('import')
         if match:
-            state = self.scanner.saveState()
-            self.scanner.scanComments()
-            next = self.scanner.lex()
-            self.scanner.restoreState(state)
+            next = self.peekToken()
             match = (next.type is Token.Punctuator) and (next.value == '(')
 
         return match
@@ -1077,7 +1375,7 @@ class Parser(object):
     def parseImportCall(self):
         node = self.createNode()
         self.expectKeyword('import')
-        return self.finalize(node, Node.Import())
+        return self.finalize(node, self.nodes.Import())
 
     def parseLeftHandSideExpressionAllowCall(self):
         startToken = self.lookahead
@@ -1089,21 +1387,22 @@ class Parser(object):
         if self.matchKeyword('super') and self.context.inFunctionBody:
             expr = self.createNode()
             self.nextToken()
-            expr = self.finalize(expr, Node.Super())
+            expr = self.finalize(expr, self.nodes.Super())
             if not self.match('(') and not self.match('.') and not self.match('['):
                 self.throwUnexpectedToken(self.lookahead)
         else:
             expr = self.inheritCoverGrammar(self.parseNewExpression if self.matchKeyword('new') else self.parsePrimaryExpression)
 
         while True:
-            if self.match('.'):
+            code = self.lookahead.code
+            if code == PERIOD:
                 self.context.isBindingElement = False
                 self.context.isAssignmentTarget = True
                 self.expect('.')
                 property = self.parseIdentifierName()
-                expr = self.finalize(self.startNode(startToken), Node.StaticMemberExpression(expr, property))
+                expr = self.finalize(self.startNode(startToken), self.nodes.StaticMemberExpression(expr, property))
 
-            elif self.match('('):
+            elif code == LEFT_PAREN:
                 asyncArrow = maybeAsync and (startToken.lineNumber == self.lookahead.lineNumber)
                 self.context.isBindingElement = False
                 self.context.isAssignmentTarget = False
@@ -1113,22 +1412,22 @@ class Parser(object):
                     args = self.parseArguments()
                 if expr.type is Syntax.Import and len(args) != 1:
                     self.tolerateError(Messages.BadImportCallArity)
-                expr = self.finalize(self.startNode(startToken), Node.CallExpression(expr, args))
+                expr = self.finalize(self.startNode(startToken), self.nodes.CallExpression(expr, args))
                 if asyncArrow and self.match('=>'):
                     for arg in args:
                         self.reinterpretExpressionAsPattern(arg)
-                    expr = Node.AsyncArrowParameterPlaceHolder(args)
-            elif self.match('['):
+                    expr = self.nodes.AsyncArrowParameterPlaceHolder(args)
+            elif code == LEFT_BRACKET:
                 self.context.isBindingElement = False
                 self.context.isAssignmentTarget = True
                 self.expect('[')
                 property = self.isolateCoverGrammar(self.parseExpression)
                 self.expect(']')
-                expr = self.finalize(self.startNode(startToken), Node.ComputedMemberExpression(expr, property))
+                expr = self.finalize(self.startNode(startToken), self.nodes.ComputedMemberExpression(expr, property))
 
             elif self.lookahead.type is Token.Template and self.lookahead.head:
                 quasi = self.parseTemplateLiteral()
-                expr = self.finalize(self.startNode(startToken), Node.TaggedTemplateExpression(expr, quasi))
+                expr = self.finalize(self.startNode(startToken), self.nodes.TaggedTemplateExpression(expr, quasi))
 
             else:
                 break
@@ -1144,7 +1443,7 @@ class Parser(object):
         if not self.match('[') and not self.match('.'):
             self.throwUnexpectedToken(self.lookahead)
 
-        return self.finalize(node, Node.Super())
+        return self.finalize(node, self.nodes.Super())
 
     def parseLeftHandSideExpression(self):
         assert self.context.allowIn, 'callee of new expression always allow in keyword.'
@@ -1156,24 +1455,25 @@ class Parser(object):
             expr = self.inheritCoverGrammar(self.parseNewExpression if self.matchKeyword('new') else self.parsePrimaryExpression)
 
         while True:
-            if self.match('['):
+            code = self.lookahead.code
+            if code == LEFT_BRACKET:
                 self.context.isBindingElement = False
                 self.context.isAssignmentTarget = True
                 self.expect('[')
                 property = self.isolateCoverGrammar(self.parseExpression)
                 self.expect(']')
-                expr = self.finalize(node, Node.ComputedMemberExpression(expr, property))
+                expr = self.finalize(node, self.nodes.ComputedMemberExpression(expr, property))
 
-            elif self.match('.'):
+            elif code == PERIOD:
                 self.context.isBindingElement = False
                 self.context.isAssignmentTarget = True
                 self.expect('.')
                 property = self.parseIdentifierName()
-                expr = self.finalize(node, Node.StaticMemberExpression(expr, property))
+                expr = self.finalize(node, self.nodes.StaticMemberExpression(expr, property))
 
             elif self.lookahead.type is Token.Template and self.lookahead.head:
                 quasi = self.parseTemplateLiteral()
-                expr = self.finalize(node, Node.TaggedTemplateExpression(expr, quasi))
+                expr = self.finalize(node, self.nodes.TaggedTemplateExpression(expr, quasi))
 
             else:
                 break
@@ -1185,31 +1485,37 @@ class Parser(object):
     def parseUpdateExpression(self):
         startToken = self.lookahead
 
-        if self.match('++', '--'):
+        if UPDATE_OPERATORS >> startToken.code & 1:
             node = self.startNode(startToken)
             token = self.nextToken()
             expr = self.inheritCoverGrammar(self.parseUnaryExpression)
-            if self.context.strict and expr.type is Syntax.Identifier and self.scanner.isRestrictedWord(expr.name):
-                self.tolerateError(Messages.StrictLHSPrefix)
+            if expr.type is Syntax.Identifier and self.scanner.isRestrictedWord(expr.name):
+                if not self.context.strict:
+                    self.strictSensitive = True
+                elif not self.config.trusted:
+                    self.tolerateError(Messages.StrictLHSPrefix)
             if not self.context.isAssignmentTarget:
                 self.tolerateError(Messages.InvalidLHSInAssignment)
             prefix = True
-            expr = self.finalize(node, Node.UpdateExpression(token.value, expr, prefix))
+            expr = self.finalize(node, self.nodes.UpdateExpression(token.value, expr, prefix))
             self.context.isAssignmentTarget = False
             self.context.isBindingElement = False
         else:
             expr = self.inheritCoverGrammar(self.parseLeftHandSideExpressionAllowCall)
             if not self.hasLineTerminator and self.lookahead.type is Token.Punctuator:
-                if self.match('++', '--'):
-                    if self.context.strict and expr.type is Syntax.Identifier and self.scanner.isRestrictedWord(expr.name):
-                        self.tolerateError(Messages.StrictLHSPostfix)
+                if UPDATE_OPERATORS >> self.lookahead.code & 1:
+                    if expr.type is Syntax.Identifier and self.scanner.isRestrictedWord(expr.name):
+                        if not self.context.strict:
+                            self.strictSensitive = True
+                        elif not self.config.trusted:
+                            self.tolerateError(Messages.StrictLHSPostfix)
                     if not self.context.isAssignmentTarget:
                         self.tolerateError(Messages.InvalidLHSInAssignment)
                     self.context.isAssignmentTarget = False
                     self.context.isBindingElement = False
                     operator = self.nextToken().value
                     prefix = False
-                    expr = self.finalize(self.startNode(startToken), Node.UpdateExpression(operator, expr, prefix))
+                    expr = self.finalize(self.startNode(startToken), self.nodes.UpdateExpression(operator, expr, prefix))
 
         return expr
 
@@ -1219,19 +1525,19 @@ class Parser(object):
         node = self.createNode()
         self.nextToken()
         argument = self.parseUnaryExpression()
-        return self.finalize(node, Node.AwaitExpression(argument))
+        return self.finalize(node, self.nodes.AwaitExpression(argument))
 
     def parseUnaryExpression(self):
-        if (
-            self.match('+', '-', '~', '!') or
-            self.matchKeyword('delete', 'void', 'typeof')
-        ):
+        if UNARY_OPERATORS >> self.lookahead.code & 1:
             node = self.startNode(self.lookahead)
             token = self.nextToken()
             expr = self.inheritCoverGrammar(self.parseUnaryExpression)
-            expr = self.finalize(node, Node.UnaryExpression(token.value, expr))
-            if self.context.strict and expr.operator == 'delete' and expr.argument.type is Syntax.Identifier:
-                self.tolerateError(Messages.StrictDelete)
+            expr = self.finalize(node, self.nodes.UnaryExpression(token.value, expr))
+            if expr.operator == 'delete' and expr.argument.type is Syntax.Identifier:
+                if self.context.strict:
+                    self.tolerateError(Messages.StrictDelete)
+                else:
+                    self.strictSensitive = True
             self.context.isAssignmentTarget = False
             self.context.isBindingElement = False
         elif self.context.allowAwait and self.matchContextualKeyword('await'):
@@ -1251,7 +1557,7 @@ class Parser(object):
             self.context.isBindingElement = False
             left = expr
             right = self.isolateCoverGrammar(self.parseExponentiationExpression)
-            expr = self.finalize(self.startNode(startToken), Node.BinaryExpression('**', left, right))
+            expr = self.finalize(self.startNode(startToken), self.nodes.BinaryExpression('**', left, right))
 
         return expr
 
@@ -1265,14 +1571,10 @@ class Parser(object):
     # https://tc39.github.io/ecma262/#sec-binary-logical-operators
 
     def binaryPrecedence(self, token):
-        op = token.value
-        if token.type is Token.Punctuator:
-            precedence = self.operatorPrecedence.get(op, 0)
-        elif token.type is Token.Keyword:
-            precedence = 7 if (op == 'instanceof' or (self.context.allowIn and op == 'in')) else 0
-        else:
-            precedence = 0
-        return precedence
+        code = token.code
+        if code == IN and not self.context.allowIn:
+            return 0
+        return self.precedenceTable[code]
 
     def parseBinaryExpression(self):
         startToken = self.lookahead
@@ -1306,7 +1608,7 @@ class Parser(object):
                     left = stack.pop()
                     markers.pop()
                     node = self.startNode(markers[-1])
-                    stack.append(self.finalize(node, Node.BinaryExpression(operator, left, right)))
+                    stack.append(self.finalize(node, self.nodes.BinaryExpression(operator, left, right)))
 
                 # Shift.
                 stack.append(self.nextToken().value)
@@ -1324,7 +1626,7 @@ class Parser(object):
                 lastLineStart = lastMarker.lineStart if lastMarker else 0
                 node = self.startNode(marker, lastLineStart)
                 operator = stack[i - 1]
-                expr = self.finalize(node, Node.BinaryExpression(operator, stack[i - 2], expr))
+                expr = self.finalize(node, self.nodes.BinaryExpression(operator, stack[i - 2], expr))
                 i -= 2
                 lastMarker = marker
 
@@ -1347,7 +1649,7 @@ class Parser(object):
             self.expect(':')
             alternate = self.isolateCoverGrammar(self.parseAssignmentExpression)
 
-            expr = self.finalize(self.startNode(startToken), Node.ConditionalExpression(expr, consequent, alternate))
+            expr = self.finalize(self.startNode(startToken), self.nodes.ConditionalExpression(expr, consequent, alternate))
             self.context.isAssignmentTarget = False
             self.context.isBindingElement = False
 
@@ -1371,7 +1673,7 @@ class Parser(object):
             for prop in param.properties:
                 self.checkPatternParam(options, prop if prop.type is Syntax.RestElement else prop.value)
 
-        options.simple = options.simple and isinstance(param, Node.Identifier)
+        options.simple = options.simple and param.type is Syntax.Identifier
 
     def reinterpretAsCoverFormalsList(self, expr):
         params = [expr]
@@ -1400,9 +1702,12 @@ class Parser(object):
                     param.right.name = 'yield'
                     del param.right.argument
                     del param.right.delegate
+                    self.rehash(param.right)
+                    self.rehash(param)
             elif asyncArrow and param.type is Syntax.Identifier and param.name == 'await':
                 self.throwUnexpectedToken(self.lookahead)
-            self.checkPatternParam(options, param)
+            if not self.config.trusted:
+                self.checkPatternParam(options, param)
 
         if self.context.strict or not self.context.allowYield:
             for param in params:
@@ -1433,7 +1738,7 @@ class Parser(object):
                 if self.lookahead.type is Token.Identifier or self.matchKeyword('yield'):
                     arg = self.parsePrimaryExpression()
                     self.reinterpretExpressionAsPattern(arg)
-                    expr = Node.AsyncArrowParameterPlaceHolder([arg])
+                    expr = self.nodes.AsyncArrowParameterPlaceHolder([arg])
 
             if expr.type is Syntax.ArrowParameterPlaceHolder or self.match('=>'):
 
@@ -1473,9 +1778,9 @@ class Parser(object):
                     if self.context.strict and list.stricted:
                         self.tolerateUnexpectedToken(list.stricted, list.message)
                     if isAsync:
-                        expr = self.finalize(node, Node.AsyncArrowFunctionExpression(list.params, body, expression))
+                        expr = self.finalize(node, self.nodes.AsyncArrowFunctionExpression(list.params, body, expression))
                     else:
-                        expr = self.finalize(node, Node.ArrowFunctionExpression(list.params, body, expression))
+                        expr = self.finalize(node, self.nodes.ArrowFunctionExpression(list.params, body, expression))
 
                     self.context.strict = previousStrict
                     self.context.allowStrictDirective = previousAllowStrictDirective
@@ -1486,12 +1791,14 @@ class Parser(object):
                     if not self.context.isAssignmentTarget:
                         self.tolerateError(Messages.InvalidLHSInAssignment)
 
-                    if self.context.strict and expr.type is Syntax.Identifier:
+                    if self.context.strict and not self.config.trusted and expr.type is Syntax.Identifier:
                         id = expr
                         if self.scanner.isRestrictedWord(id.name):
                             self.tolerateUnexpectedToken(token, Messages.StrictLHSAssignment)
                         if self.scanner.isStrictModeReservedWord(id.name):
                             self.tolerateUnexpectedToken(token, Messages.StrictReservedWord)
+                    elif not self.context.strict and expr.type is Syntax.Identifier and self.scanner.isRestrictedWord(expr.name):
+                        self.strictSensitive = True
 
                     if not self.match('='):
                         self.context.isAssignmentTarget = False
@@ -1502,7 +1809,7 @@ class Parser(object):
                     token = self.nextToken()
                     operator = token.value
                     right = self.isolateCoverGrammar(self.parseAssignmentExpression)
-                    expr = self.finalize(self.startNode(startToken), Node.AssignmentExpression(operator, expr, right))
+                    expr = self.finalize(self.startNode(startToken), self.nodes.AssignmentExpression(operator, expr, right))
                     self.context.firstCoverInitializedNameError = None
 
         return expr
@@ -1522,7 +1829,7 @@ class Parser(object):
                 self.nextToken()
                 expressions.append(self.isolateCoverGrammar(self.parseAssignmentExpression))
 
-            expr = self.finalize(self.startNode(startToken), Node.SequenceExpression(expressions))
+            expr = self.finalize(self.startNode(startToken), self.nodes.SequenceExpression(expressions))
 
         return expr
 
@@ -1531,33 +1838,27 @@ class Parser(object):
     def parseStatementListItem(self):
         self.context.isAssignmentTarget = True
         self.context.isBindingElement = True
-        if self.lookahead.type is Token.Keyword:
-            value = self.lookahead.value
-            if value == 'export':
-                if not self.context.isModule:
-                    self.tolerateUnexpectedToken(self.lookahead, Messages.IllegalExportDeclaration)
-                statement = self.parseExportDeclaration()
-            elif value == 'import':
-                if self.matchImportCall():
-                    statement = self.parseExpressionStatement()
-                else:
-                    if not self.context.isModule:
-                        self.tolerateUnexpectedToken(self.lookahead, Messages.IllegalImportDeclaration)
-                    statement = self.parseImportDeclaration()
-            elif value == 'const':
-                statement = self.parseLexicalDeclaration(Params(inFor=False))
-            elif value == 'function':
-                statement = self.parseFunctionDeclaration()
-            elif value == 'class':
-                statement = self.parseClassDeclaration()
-            elif value == 'let':
-                statement = self.parseLexicalDeclaration(Params(inFor=False)) if self.isLexicalDeclaration() else self.parseStatement()
-            else:
-                statement = self.parseStatement()
-        else:
-            statement = self.parseStatement()
-
-        return statement
+        production = self.statementListItemTable[self.lookahead.code]
+        if production is None:
+            return self.parseStatement()
+        return production()
+
+    def parseExportListItem(self):
+        if not self.context.isModule:
+            self.tolerateUnexpectedToken(self.lookahead, Messages.IllegalExportDeclaration)
+        return self.parseExportDeclaration()
+
+    def parseImportListItem(self):
+        if self.matchImportCall():
+            return self.parseExpressionStatement()
+        if not self.context.isModule:
+            self.tolerateUnexpectedToken(self.lookahead, Messages.IllegalImportDeclaration)
+        return self.parseImportDeclaration()
+
+    def parseLexicalListItem(self):
+        if self.matchKeyword('const') or self.isLexicalDeclaration():
+            return self.parseLexicalDeclaration(Params(inFor=False))
+        return self.parseStatement()
 
     def parseBlock(self):
         node = self.createNode()
@@ -1570,7 +1871,7 @@ class Parser(object):
             block.append(self.parseStatementListItem())
         self.expect('}')
 
-        return self.finalize(node, Node.BlockStatement(block))
+        return self.finalize(node, self.nodes.BlockStatement(block))
 
     # https://tc39.github.io/ecma262/#sec-let-and-const-declarations
 
@@ -1579,8 +1880,10 @@ class Parser(object):
         params = []
         id = self.parsePattern(params, kind)
 
-        if self.context.strict and id.type is Syntax.Identifier:
-            if self.scanner.isRestrictedWord(id.name):
+        if id.type is Syntax.Identifier and self.scanner.isRestrictedWord(id.name):
+            if not self.context.strict:
+                self.strictSensitive = True
+            elif not self.config.trusted:
                 self.tolerateError(Messages.StrictVarName)
 
         init = None
@@ -1595,7 +1898,7 @@ class Parser(object):
             self.expect('=')
             init = self.isolateCoverGrammar(self.parseAssignmentExpression)
 
-        return self.finalize(node, Node.VariableDeclarator(id, init))
+        return self.finalize(node, self.nodes.VariableDeclarator(id, init))
 
     def parseBindingList(self, kind, options):
         lst = [self.parseLexicalBinding(kind, options)]
@@ -1607,10 +1910,7 @@ class Parser(object):
         return lst
 
     def isLexicalDeclaration(self):
-        state = self.scanner.saveState()
-        self.scanner.scanComments()
-        next = self.scanner.lex()
-        self.scanner.restoreState(state)
+        next = self.peekToken()
 
         return (
             (next.type is Token.Identifier) or
@@ -1628,7 +1928,7 @@ class Parser(object):
         declarations = self.parseBindingList(kind, options)
         self.consumeSemicolon()
 
-        return self.finalize(node, Node.VariableDeclaration(declarations, kind))
+        return self.finalize(node, self.nodes.VariableDeclaration(declarations, kind))
 
     # https://tc39.github.io/ecma262/#sec-destructuring-binding-patterns
 
@@ -1638,7 +1938,7 @@ class Parser(object):
         self.expect('...')
         arg = self.parsePattern(params, kind)
 
-        return self.finalize(node, Node.RestElement(arg))
+        return self.finalize(node, self.nodes.RestElement(arg))
 
     def parseArrayPattern(self, params, kind=None):
         node = self.createNode()
@@ -1659,7 +1959,7 @@ class Parser(object):
                     self.expect(',')
         self.expect(']')
 
-        return self.finalize(node, Node.ArrayPattern(elements))
+        return self.finalize(node, self.nodes.ArrayPattern(elements))
 
     def parsePropertyPattern(self, params, kind=None):
         node = self.createNode()
@@ -1673,13 +1973,13 @@ class Parser(object):
         if self.lookahead.type is Token.Identifier:
             keyToken = self.lookahead
             key = self.parseVariableIdentifier()
-            init = self.finalize(node, Node.Identifier(keyToken.value))
+            init = self.finalize(node, self.nodes.Identifier(keyToken.value))
             if self.match('='):
                 params.append(keyToken)
                 shorthand = True
                 self.nextToken()
                 expr = self.parseAssignmentExpression()
-                value = self.finalize(self.startNode(keyToken), Node.AssignmentPattern(init, expr))
+                value = self.finalize(self.startNode(keyToken), self.nodes.AssignmentPattern(init, expr))
             elif not self.match(':'):
                 params.append(keyToken)
                 shorthand = True
@@ -1693,7 +1993,7 @@ class Parser(object):
             self.expect(':')
             value = self.parsePatternWithDefault(params, kind)
 
-        return self.finalize(node, Node.Property('init', key, computed, value, method, shorthand))
+        return self.finalize(node, self.nodes.Property('init', key, computed, value, method, shorthand))
 
     def parseRestProperty(self, params, kind):
         node = self.createNode()
@@ -1703,7 +2003,7 @@ class Parser(object):
             self.throwError(Messages.DefaultRestProperty)
         if not self.match('}'):
             self.throwError(Messages.PropertyAfterRestProperty)
-        return self.finalize(node, Node.RestElement(arg))
+        return self.finalize(node, self.nodes.RestElement(arg))
 
     def parseObjectPattern(self, params, kind=None):
         node = self.createNode()
@@ -1716,7 +2016,7 @@ class Parser(object):
                 self.expect(',')
         self.expect('}')
 
-        return self.finalize(node, Node.ObjectPattern(properties))
+        return self.finalize(node, self.nodes.ObjectPattern(properties))
 
     def parsePattern(self, params, kind=None):
         if self.match('['):
@@ -1741,7 +2041,7 @@ class Parser(object):
             self.context.allowYield = True
             right = self.isolateCoverGrammar(self.parseAssignmentExpression)
             self.context.allowYield = previousAllowYield
-            pattern = self.finalize(self.startNode(startToken), Node.AssignmentPattern(pattern, right))
+            pattern = self.finalize(self.startNode(startToken), self.nodes.AssignmentPattern(pattern, right))
 
         return pattern
 
@@ -1756,16 +2056,19 @@ class Parser(object):
                 self.tolerateUnexpectedToken(token, Messages.StrictReservedWord)
             elif not self.context.allowYield:
                 self.throwUnexpectedToken(token)
+            else:
+                self.strictSensitive = True
         elif token.type is not Token.Identifier:
             if self.context.strict and token.type is Token.Keyword and self.scanner.isStrictModeReservedWord(token.value):
                 self.tolerateUnexpectedToken(token, Messages.StrictReservedWord)
             else:
                 if self.context.strict or token.value != 'let' or kind != 'var':
                     self.throwUnexpectedToken(token)
+                self.strictSensitive = True
         elif (self.context.isModule or self.context.allowAwait) and token.type is Token.Identifier and token.value == 'await':
             self.tolerateUnexpectedToken(token)
 
-        return self.finalize(node, Node.Identifier(token.value))
+        return self.finalize(node, self.nodes.Identifier(token.value))
 
     def parseVariableDeclaration(self, options):
         node = self.createNode()
@@ -1773,8 +2076,10 @@ class Parser(object):
         params = []
         id = self.parsePattern(params, 'var')
 
-        if self.context.strict and id.type is Syntax.Identifier:
-            if self.scanner.isRestrictedWord(id.name):
+        if id.type is Syntax.Identifier and self.scanner.isRestrictedWord(id.name):
+            if not self.context.strict:
+                self.strictSensitive = True
+            elif not self.config.trusted:
                 self.tolerateError(Messages.StrictVarName)
 
         init = None
@@ -1784,7 +2089,7 @@ class Parser(object):
         elif id.type is not Syntax.Identifier and not options.inFor:
             self.expect('=')
 
-        return self.finalize(node, Node.VariableDeclarator(id, init))
+        return self.finalize(node, self.nodes.VariableDeclarator(id, init))
 
     def parseVariableDeclarationList(self, options):
         opt = Params(inFor=options.inFor)
@@ -1803,14 +2108,14 @@ class Parser(object):
         declarations = self.parseVariableDeclarationList(Params(inFor=False))
         self.consumeSemicolon()
 
-        return self.finalize(node, Node.VariableDeclaration(declarations, 'var'))
+        return self.finalize(node, self.nodes.VariableDeclaration(declarations, 'var'))
 
     # https://tc39.github.io/ecma262/#sec-empty-statement
 
     def parseEmptyStatement(self):
         node = self.createNode()
         self.expect(';')
-        return self.finalize(node, Node.EmptyStatement())
+        return self.finalize(node, self.nodes.EmptyStatement())
 
     # https://tc39.github.io/ecma262/#sec-expression-statement
 
@@ -1818,13 +2123,16 @@ class Parser(object):
         node = self.createNode()
         expr = self.parseExpression()
         self.consumeSemicolon()
-        return self.finalize(node, Node.ExpressionStatement(expr))
+        return self.finalize(node, self.nodes.ExpressionStatement(expr))
 
     # https://tc39.github.io/ecma262/#sec-if-statement
 
     def parseIfClause(self):
-        if self.context.strict and self.matchKeyword('function'):
-            self.tolerateError(Messages.StrictFunction)
+        if self.matchKeyword('function'):
+            if self.context.strict:
+                self.tolerateError(Messages.StrictFunction)
+            else:
+                self.strictSensitive = True
         return self.parseStatement()
 
     def parseIfStatement(self):
@@ -1837,7 +2145,7 @@ class Parser(object):
 
         if not self.match(')') and self.config.tolerant:
             self.tolerateUnexpectedToken(self.nextToken())
-            consequent = self.finalize(self.createNode(), Node.EmptyStatement())
+            consequent = self.finalize(self.createNode(), self.nodes.EmptyStatement())
         else:
             self.expect(')')
             consequent = self.parseIfClause()
@@ -1845,7 +2153,7 @@ class Parser(object):
                 self.nextToken()
                 alternate = self.parseIfClause()
 
-        return self.finalize(node, Node.IfStatement(test, consequent, alternate))
+        return self.finalize(node, self.nodes.IfStatement(test, consequent, alternate))
 
     # https://tc39.github.io/ecma262/#sec-do-while-statement
 
@@ -1869,7 +2177,7 @@ class Parser(object):
             if self.match(';'):
                 self.nextToken()
 
-        return self.finalize(node, Node.DoWhileStatement(body, test))
+        return self.finalize(node, self.nodes.DoWhileStatement(body, test))
 
     # https://tc39.github.io/ecma262/#sec-while-statement
 
@@ -1882,7 +2190,7 @@ class Parser(object):
 
         if not self.match(')') and self.config.tolerant:
             self.tolerateUnexpectedToken(self.nextToken())
-            body = self.finalize(self.createNode(), Node.EmptyStatement())
+            body = self.finalize(self.createNode(), self.nodes.EmptyStatement())
         else:
             self.expect(')')
 
@@ -1891,7 +2199,7 @@ class Parser(object):
             body = self.parseStatement()
             self.context.inIteration = previousInIteration
 
-        return self.finalize(node, Node.WhileStatement(test, body))
+        return self.finalize(node, self.nodes.WhileStatement(test, body))
 
     # https://tc39.github.io/ecma262/#sec-for-statement
     # https://tc39.github.io/ecma262/#sec-for-in-and-for-of-statements
@@ -1924,27 +2232,30 @@ class Parser(object):
                     decl = declarations[0]
                     if decl.init and (decl.id.type is Syntax.ArrayPattern or decl.id.type is Syntax.ObjectPattern or self.context.strict):
                         self.tolerateError(Messages.ForInOfLoopInitializer, 'for-in')
-                    init = self.finalize(init, Node.VariableDeclaration(declarations, 'var'))
+                    elif decl.init:
+                        self.strictSensitive = True
+                    init = self.finalize(init, self.nodes.VariableDeclaration(declarations, 'var'))
                     self.nextToken()
                     left = init
                     right = self.parseExpression()
                     init = None
                 elif len(declarations) == 1 and declarations[0].init is None and self.matchContextualKeyword('of'):
-                    init = self.finalize(init, Node.VariableDeclaration(declarations, 'var'))
+                    init = self.finalize(init, self.nodes.VariableDeclaration(declarations, 'var'))
                     self.nextToken()
                     left = init
                     right = self.parseAssignmentExpression()
                     init = None
                     forIn = False
                 else:
-                    init = self.finalize(init, Node.VariableDeclaration(declarations, 'var'))
+                    init = self.finalize(init, self.nodes.VariableDeclaration(declarations, 'var'))
                     self.expect(';')
             elif self.matchKeyword('const', 'let'):
                 init = self.createNode()
                 kind = self.nextToken().value
 
                 if not self.context.strict and self.lookahead.value == 'in':
-                    init = self.finalize(init, Node.Identifier(kind))
+                    self.strictSensitive = True
+                    init = self.finalize(init, self.nodes.Identifier(kind))
                     self.nextToken()
                     left = init
                     right = self.parseExpression()
@@ -1956,13 +2267,13 @@ class Parser(object):
                     self.context.allowIn = previousAllowIn
 
                     if len(declarations) == 1 and declarations[0].init is None and self.matchKeyword('in'):
-                        init = self.finalize(init, Node.VariableDeclaration(declarations, kind))
+                        init = self.finalize(init, self.nodes.VariableDeclaration(declarations, kind))
                         self.nextToken()
                         left = init
                         right = self.parseExpression()
                         init = None
                     elif len(declarations) == 1 and declarations[0].init is None and self.matchContextualKeyword('of'):
-                        init = self.finalize(init, Node.VariableDeclaration(declarations, kind))
+                        init = self.finalize(init, self.nodes.VariableDeclaration(declarations, kind))
                         self.nextToken()
                         left = init
                         right = self.parseAssignmentExpression()
@@ -1970,7 +2281,7 @@ class Parser(object):
                         forIn = False
                     else:
                         self.consumeSemicolon()
-                        init = self.finalize(init, Node.VariableDeclaration(declarations, kind))
+                        init = self.finalize(init, self.nodes.VariableDeclaration(declarations, kind))
             else:
                 initStartToken = self.lookahead
                 previousAllowIn = self.context.allowIn
@@ -2003,7 +2314,7 @@ class Parser(object):
                         while self.match(','):
                             self.nextToken()
                             initSeq.append(self.isolateCoverGrammar(self.parseAssignmentExpression))
-                        init = self.finalize(self.startNode(initStartToken), Node.SequenceExpression(initSeq))
+                        init = self.finalize(self.startNode(initStartToken), self.nodes.SequenceExpression(initSeq))
                     self.expect(';')
 
         if left is None:
@@ -2015,7 +2326,7 @@ class Parser(object):
 
         if not self.match(')') and self.config.tolerant:
             self.tolerateUnexpectedToken(self.nextToken())
-            body = self.finalize(self.createNode(), Node.EmptyStatement())
+            body = self.finalize(self.createNode(), self.nodes.EmptyStatement())
         else:
             self.expect(')')
 
@@ -2025,12 +2336,12 @@ class Parser(object):
             self.context.inIteration = previousInIteration
 
         if left is None:
-            return self.finalize(node, Node.ForStatement(init, test, update, body))
+            return self.finalize(node, self.nodes.ForStatement(init, test, update, body))
 
         if forIn:
-            return self.finalize(node, Node.ForInStatement(left, right, body))
+            return self.finalize(node, self.nodes.ForInStatement(left, right, body))
 
-        return self.finalize(node, Node.ForOfStatement(left, right, body))
+        return self.finalize(node, self.nodes.ForOfStatement(left, right, body))
 
     # https://tc39.github.io/ecma262/#sec-continue-statement
 
@@ -2051,7 +2362,7 @@ class Parser(object):
         if label is None and not self.context.inIteration:
             self.throwError(Messages.IllegalContinue)
 
-        return self.finalize(node, Node.ContinueStatement(label))
+        return self.finalize(node, self.nodes.ContinueStatement(label))
 
     # https://tc39.github.io/ecma262/#sec-break-statement
 
@@ -2072,7 +2383,7 @@ class Parser(object):
         if label is None and not self.context.inIteration and not self.context.inSwitch:
             self.throwError(Messages.IllegalBreak)
 
-        return self.finalize(node, Node.BreakStatement(label))
+        return self.finalize(node, self.nodes.BreakStatement(label))
 
     # https://tc39.github.io/ecma262/#sec-return-statement
 
@@ -2094,13 +2405,15 @@ class Parser(object):
         argument = self.parseExpression() if hasArgument else None
         self.consumeSemicolon()
 
-        return self.finalize(node, Node.ReturnStatement(argument))
+        return self.finalize(node, self.nodes.ReturnStatement(argument))
 
     # https://tc39.github.io/ecma262/#sec-with-statement
 
     def parseWithStatement(self):
         if self.context.strict:
             self.tolerateError(Messages.StrictModeWith)
+        else:
+            self.strictSensitive = True
 
         node = self.createNode()
 
@@ -2110,12 +2423,12 @@ class Parser(object):
 
         if not self.match(')') and self.config.tolerant:
             self.tolerateUnexpectedToken(self.nextToken())
-            body = self.finalize(self.createNode(), Node.EmptyStatement())
+            body = self.finalize(self.createNode(), self.nodes.EmptyStatement())
         else:
             self.expect(')')
             body = self.parseStatement()
 
-        return self.finalize(node, Node.WithStatement(object, body))
+        return self.finalize(node, self.nodes.WithStatement(object, body))
 
     # https://tc39.github.io/ecma262/#sec-switch-statement
 
@@ -2136,7 +2449,7 @@ class Parser(object):
                 break
             consequent.append(self.parseStatementListItem())
 
-        return self.finalize(node, Node.SwitchCase(test, consequent))
+        return self.finalize(node, self.nodes.SwitchCase(test, consequent))
 
     def parseSwitchStatement(self):
         node = self.createNode()
@@ -2165,7 +2478,7 @@ class Parser(object):
 
         self.context.inSwitch = previousInSwitch
 
-        return self.finalize(node, Node.SwitchStatement(discriminant, cases))
+        return self.finalize(node, self.nodes.SwitchStatement(discriminant, cases))
 
     # https://tc39.github.io/ecma262/#sec-labelled-statements
 
@@ -2190,17 +2503,19 @@ class Parser(object):
                 declaration = self.parseFunctionDeclaration()
                 if self.context.strict:
                     self.tolerateUnexpectedToken(token, Messages.StrictFunction)
-                elif declaration.generator:
-                    self.tolerateUnexpectedToken(token, Messages.GeneratorInLegacyContext)
+                else:
+                    if declaration.generator:
+                        self.tolerateUnexpectedToken(token, Messages.GeneratorInLegacyContext)
+                    self.strictSensitive = True
                 body = declaration
             else:
                 body = self.parseStatement()
             del self.context.labelSet[key]
 
-            statement = Node.LabeledStatement(id, body)
+            statement = self.nodes.LabeledStatement(id, body)
         else:
             self.consumeSemicolon()
-            statement = Node.ExpressionStatement(expr)
+            statement = self.nodes.ExpressionStatement(expr)
 
         return self.finalize(node, statement)
 
@@ -2216,7 +2531,7 @@ class Parser(object):
         argument = self.parseExpression()
         self.consumeSemicolon()
 
-        return self.finalize(node, Node.ThrowStatement(argument))
+        return self.finalize(node, self.nodes.ThrowStatement(argument))
 
     # https://tc39.github.io/ecma262/#sec-try-statement
 
@@ -2238,14 +2553,16 @@ class Parser(object):
                 self.tolerateError(Messages.DuplicateBinding, p.value)
             paramMap[key] = True
 
-        if self.context.strict and param.type is Syntax.Identifier:
-            if self.scanner.isRestrictedWord(param.name):
+        if param.type is Syntax.Identifier and self.scanner.isRestrictedWord(param.name):
+            if not self.context.strict:
+                self.strictSensitive = True
+            elif not self.config.trusted:
                 self.tolerateError(Messages.StrictCatchVariable)
 
         self.expect(')')
         body = self.parseBlock()
 
-        return self.finalize(node, Node.CatchClause(param, body))
+        return self.finalize(node, self.nodes.CatchClause(param, body))
 
     def parseFinallyClause(self):
         self.expectKeyword('finally')
@@ -2262,7 +2579,7 @@ class Parser(object):
         if not handler and not finalizer:
             self.throwError(Messages.NoCatchOrFinally)
 
-        return self.finalize(node, Node.TryStatement(block, handler, finalizer))
+        return self.finalize(node, self.nodes.TryStatement(block, handler, finalizer))
 
     # https://tc39.github.io/ecma262/#sec-debugger-statement
 
@@ -2270,11 +2587,16 @@ class Parser(object):
         node = self.createNode()
         self.expectKeyword('debugger')
         self.consumeSemicolon()
-        return self.finalize(node, Node.DebuggerStatement())
+        return self.finalize(node, self.nodes.DebuggerStatement())
 
     # https://tc39.github.io/ecma262/#sec-ecmascript-language-statements-and-declarations
 
     def parseStatement(self):
+        # Punctuators and keywords are dispatched on their token code.
+        production = self.statementTable[self.lookahead.code]
+        if production is not None:
+            return production()
+
         typ = self.lookahead.type
         if typ in (
             Token.BooleanLiteral,
@@ -2286,53 +2608,9 @@ class Parser(object):
         ):
             statement = self.parseExpressionStatement()
 
-        elif typ is Token.Punctuator:
-            value = self.lookahead.value
-            if value == '{':
-                statement = self.parseBlock()
-            elif value == '(':
-                statement = self.parseExpressionStatement()
-            elif value == ';':
-                statement = self.parseEmptyStatement()
-            else:
-                statement = self.parseExpressionStatement()
-
         elif typ is Token.Identifier:
             statement = self.parseFunctionDeclaration() if self.matchAsyncFunction() else self.parseLabelledStatement()
 
-        elif typ is Token.Keyword:
-            value = self.lookahead.value
-            if value == 'break':
-                statement = self.parseBreakStatement()
-            elif value == 'continue':
-                statement = self.parseContinueStatement()
-            elif value == 'debugger':
-                statement = self.parseDebuggerStatement()
-            elif value == 'do':
-                statement = self.parseDoWhileStatement()
-            elif value == 'for':
-                statement = self.parseForStatement()
-            elif value == 'function':
-                statement = self.parseFunctionDeclaration()
-            elif value == 'if':
-                statement = self.parseIfStatement()
-            elif value == 'return':
-                statement = self.parseReturnStatement()
-            elif value == 'switch':
-                statement = self.parseSwitchStatement()
-            elif value == 'throw':
-                statement = self.parseThrowStatement()
-            elif value == 'try':
-                statement = self.parseTryStatement()
-            elif value == 'var':
-                statement = self.parseVariableStatement()
-            elif value == 'while':
-                statement = self.parseWhileStatement()
-            elif value == 'with':
-                statement = self.parseWithStatement()
-            else:
-                statement = self.parseExpressionStatement()
-
         else:
             statement = self.throwUnexpectedToken(self.lookahead)
 
@@ -2341,6 +2619,11 @@ class Parser(object):
     # https://tc39.github.io/ecma262/#sec-function-definitions
 
     def parseFunctionSourceElements(self):
+        if self.bodyCache is not None and not self.lookaheadBuffer and self.match('{'):
+            return self.parseCachedFunctionBody()
+        return self.parseFunctionBody()
+
+    def parseFunctionBody(self):
         node = self.createNode()
 
         self.expect('{')
@@ -2368,7 +2651,82 @@ class Parser(object):
         self.context.inSwitch = previousInSwitch
         self.context.inFunctionBody = previousInFunctionBody
 
-        return self.finalize(node, Node.BlockStatement(body))
+        return self.finalize(node, self.nodes.BlockStatement(body))
+
+    def parseCachedFunctionBody(self):
+        cache = self.bodyCache
+        context = self.context
+        token = self.lookahead
+        if self.braces is None:
+            brackets = skeleton(self.scanner.source).brackets
+            self.braces = dict(zip(brackets[0::2], brackets[1::2]))
+        close = self.braces.get(token.start, -1)
+        if close - token.start < cache.minLength or context.firstCoverInitializedNameError is not None:
+            return self.parseFunctionBody()
+
+        # What the statements of the body are parsed with, besides their text.
+        key = (
+            self.scanner.source[token.start:close + 1], self.bodyOptions,
+            context.isModule, context.strict, context.allowStrictDirective, context.allowIn,
+            context.allowYield, context.allowAwait, context.isAssignmentTarget, context.isBindingElement,
+        )
+        entry = cache.get(key)
+        if entry is None:
+            return self.parseStoredFunctionBody(key, close)
+
+        scanner = self.scanner
+        curlyStack = list(scanner.curlyStack)
+        line = token.lineNumber
+        column = token.start - token.lineStart
+        relocation = Relocation(token.start - entry.open, entry.line, line - entry.line, column - entry.column)
+
+        node = self.createNode()
+        self.expect('{')
+        # The directives can make the function strict, which its parameters
+        # are checked for.
+        body = self.parseDirectivePrologues()
+        body[:] = relocation.subtree(entry.statements)
+
+        # Resume at the closing brace, as SkipBodies does.
+        scanner.index = close
+        scanner.lineNumber = entry.closeLine + relocation.lineDelta
+        scanner.lineStart = close - (entry.closeColumn + (relocation.columnDelta if entry.closeLine == entry.line else 0))
+        scanner.curlyStack = curlyStack
+        self.lookaheadBuffer.clear()
+        self.nextToken()
+        self.expect('}')
+        context.isAssignmentTarget, context.isBindingElement = entry.flags
+        self.strictSensitive = self.strictSensitive or entry.sensitive
+
+        return self.finalize(node, self.nodes.BlockStatement(body))
+
+    def parseStoredFunctionBody(self, key, close):
+        context = self.context
+        token = self.lookahead
+        errors = len(self.errorHandler.errors)
+        sensitive = self.strictSensitive
+        self.strictSensitive = False
+
+        node = self.parseFunctionBody()
+
+        # Kept if the body ends at the brace skeleton() matched, and its parse
+        # left nothing a copy would miss.
+        entry = None
+        if (
+            self.lastMarker.index == close + 1 and
+            context.firstCoverInitializedNameError is None and len(self.errorHandler.errors) == errors and
+            self.bodyCache.wants(key)
+        ):
+            entry = CachedBody(
+                Relocation(0).subtree(node.body), token.start, token.lineNumber, token.start - token.lineStart,
+                self.lastMarker.line, self.lastMarker.column - 1,
+                (context.isAssignmentTarget, context.isBindingElement), self.strictSensitive,
+            )
+        self.strictSensitive = sensitive or self.strictSensitive
+        if entry is not None:
+            self.bodyCache.put(key, entry)
+
+        return node
 
     def validateParam(self, options, param, name):
         key = '$' + name
@@ -2389,6 +2747,8 @@ class Parser(object):
             elif key in options.paramSet:
                 options.stricted = param
                 options.message = Messages.StrictParamDupe
+            if options.firstRestricted or options.stricted:
+                self.strictSensitive = True
 
         options.paramSet[key] = True
 
@@ -2402,14 +2762,15 @@ class Parser(object):
         if not self.match(')'):
             self.throwError(Messages.ParameterAfterRestParameter)
 
-        return self.finalize(node, Node.RestElement(arg))
+        return self.finalize(node, self.nodes.RestElement(arg))
 
     def parseFormalParameter(self, options):
         params = []
         param = self.parseRestElement(params) if self.match('...') else self.parsePatternWithDefault(params)
-        for p in params:
-            self.validateParam(options, p, p.value)
-        options.simple = options.simple and isinstance(param, Node.Identifier)
+        if not self.config.trusted:
+            for p in params:
+                self.validateParam(options, p, p.value)
+        options.simple = options.simple and param.type is Syntax.Identifier
         options.params.append(param)
 
     def parseFormalParameters(self, firstRestricted=None):
@@ -2442,12 +2803,10 @@ class Parser(object):
     def matchAsyncFunction(self):
         match = self.matchContextualKeyword('async')
         if match:
-            state = self.scanner.saveState()
-            self.scanner.scanComments()
-            next = self.scanner.lex()
-            self.scanner.restoreState(state)
+            lineNumber = self.scanner.lineNumber
+            next = self.peekToken()
 
-            match = (state.lineNumber == next.lineNumber) and (next.type is Token.Keyword) and (next.value == 'function')
+            match = (lineNumber == next.lineNumber) and (next.type is Token.Keyword) and (next.value == 'function')
 
         return match
 
@@ -2471,15 +2830,17 @@ class Parser(object):
             token = self.lookahead
             id = self.parseVariableIdentifier()
             if self.context.strict:
-                if self.scanner.isRestrictedWord(token.value):
+                if not self.config.trusted and self.scanner.isRestrictedWord(token.value):
                     self.tolerateUnexpectedToken(token, Messages.StrictFunctionName)
-            else:
+            elif not self.config.trusted:
                 if self.scanner.isRestrictedWord(token.value):
                     firstRestricted = token
                     message = Messages.StrictFunctionName
+                    self.strictSensitive = True
                 elif self.scanner.isStrictModeReservedWord(token.value):
                     firstRestricted = token
                     message = Messages.StrictReservedWord
+                    self.strictSensitive = True
 
         previousAllowAwait = self.context.allowAwait
         previousAllowYield = self.context.allowYield
@@ -2508,9 +2869,9 @@ class Parser(object):
         self.context.allowYield = previousAllowYield
 
         if isAsync:
-            return self.finalize(node, Node.AsyncFunctionDeclaration(id, params, body))
+            return self.finalize(node, self.nodes.AsyncFunctionDeclaration(id, params, body))
 
-        return self.finalize(node, Node.FunctionDeclaration(id, params, body, isGenerator))
+        return self.finalize(node, self.nodes.FunctionDeclaration(id, params, body, isGenerator))
 
     def parseFunctionExpression(self):
         node = self.createNode()
@@ -2537,15 +2898,17 @@ class Parser(object):
             token = self.lookahead
             id = self.parseIdentifierName() if not self.context.strict and not isGenerator and self.matchKeyword('yield') else self.parseVariableIdentifier()
             if self.context.strict:
-                if self.scanner.isRestrictedWord(token.value):
+                if not self.config.trusted and self.scanner.isRestrictedWord(token.value):
                     self.tolerateUnexpectedToken(token, Messages.StrictFunctionName)
-            else:
+            elif not self.config.trusted:
                 if self.scanner.isRestrictedWord(token.value):
                     firstRestricted = token
                     message = Messages.StrictFunctionName
+                    self.strictSensitive = True
                 elif self.scanner.isStrictModeReservedWord(token.value):
                     firstRestricted = token
                     message = Messages.StrictReservedWord
+                    self.strictSensitive = True
 
         formalParameters = self.parseFormalParameters(firstRestricted)
         params = formalParameters.params
@@ -2568,9 +2931,9 @@ class Parser(object):
         self.context.allowYield = previousAllowYield
 
         if isAsync:
-            return self.finalize(node, Node.AsyncFunctionExpression(id, params, body))
+            return self.finalize(node, self.nodes.AsyncFunctionExpression(id, params, body))
 
-        return self.finalize(node, Node.FunctionExpression(id, params, body, isGenerator))
+        return self.finalize(node, self.nodes.FunctionExpression(id, params, body, isGenerator))
 
     # https://tc39.github.io/ecma262/#sec-directive-prologues-and-the-use-strict-directive
 
@@ -2582,7 +2945,7 @@ class Parser(object):
         directive = self.getTokenRaw(token)[1:-1] if expr.type is Syntax.Literal else None
         self.consumeSemicolon()
 
-        return self.finalize(node, Node.Directive(expr, directive) if directive else Node.ExpressionStatement(expr))
+        return self.finalize(node, self.nodes.Directive(expr, directive) if directive else self.nodes.ExpressionStatement(expr))
 
     def parseDirectivePrologues(self):
         firstRestricted = None
@@ -2640,7 +3003,7 @@ class Parser(object):
         method = self.parsePropertyMethod(formalParameters)
         self.context.allowYield = previousAllowYield
 
-        return self.finalize(node, Node.FunctionExpression(None, formalParameters.params, method, isGenerator))
+        return self.finalize(node, self.nodes.FunctionExpression(None, formalParameters.params, method, isGenerator))
 
     def parseSetterMethod(self):
         node = self.createNode()
@@ -2651,12 +3014,12 @@ class Parser(object):
         formalParameters = self.parseFormalParameters()
         if len(formalParameters.params) != 1:
             self.tolerateError(Messages.BadSetterArity)
-        elif isinstance(formalParameters.params[0], Node.RestElement):
+        elif formalParameters.params[0].type is Syntax.RestElement:
             self.tolerateError(Messages.BadSetterRestParameter)
         method = self.parsePropertyMethod(formalParameters)
         self.context.allowYield = previousAllowYield
 
-        return self.finalize(node, Node.FunctionExpression(None, formalParameters.params, method, isGenerator))
+        return self.finalize(node, self.nodes.FunctionExpression(None, formalParameters.params, method, isGenerator))
 
     def parseGeneratorMethod(self):
         node = self.createNode()
@@ -2670,7 +3033,7 @@ class Parser(object):
         method = self.parsePropertyMethod(params)
         self.context.allowYield = previousAllowYield
 
-        return self.finalize(node, Node.FunctionExpression(None, params.params, method, isGenerator))
+        return self.finalize(node, self.nodes.FunctionExpression(None, params.params, method, isGenerator))
 
     # https://tc39.github.io/ecma262/#sec-generator-function-definitions
 
@@ -2704,7 +3067,7 @@ class Parser(object):
                 argument = self.parseAssignmentExpression()
             self.context.allowYield = previousAllowYield
 
-        return self.finalize(node, Node.YieldExpression(argument, delegate))
+        return self.finalize(node, self.nodes.YieldExpression(argument, delegate))
 
     # https://tc39.github.io/ecma262/#sec-class-definitions
 
@@ -2758,7 +3121,7 @@ class Parser(object):
                 value = self.parseSetterMethod()
             elif self.config.classProperties and not self.match('('):
                 kind = 'init'
-                id = self.finalize(node, Node.Identifier(token.value))
+                id = self.finalize(node, self.nodes.Identifier(token.value))
                 if self.match('='):
                     self.nextToken()
                     value = self.parseAssignmentExpression()
@@ -2789,10 +3152,10 @@ class Parser(object):
                 kind = 'constructor'
 
         if kind in ('constructor', 'method', 'get', 'set'):
-            return self.finalize(node, Node.MethodDefinition(key, computed, value, kind, isStatic))
+            return self.finalize(node, self.nodes.MethodDefinition(key, computed, value, kind, isStatic))
 
         else:
-            return self.finalize(node, Node.FieldDefinition(key, computed, value, kind, isStatic))
+            return self.finalize(node, self.nodes.FieldDefinition(key, computed, value, kind, isStatic))
 
     def parseClassElementList(self):
         body = []
@@ -2812,7 +3175,7 @@ class Parser(object):
         node = self.createNode()
         elementList = self.parseClassElementList()
 
-        return self.finalize(node, Node.ClassBody(elementList))
+        return self.finalize(node, self.nodes.ClassBody(elementList))
 
     def parseClassDeclaration(self, identifierIsOptional=False):
         node = self.createNode()
@@ -2829,7 +3192,7 @@ class Parser(object):
         classBody = self.parseClassBody()
         self.context.strict = previousStrict
 
-        return self.finalize(node, Node.ClassDeclaration(id, superClass, classBody))
+        return self.finalize(node, self.nodes.ClassDeclaration(id, superClass, classBody))
 
     def parseClassExpression(self):
         node = self.createNode()
@@ -2845,7 +3208,7 @@ class Parser(object):
         classBody = self.parseClassBody()
         self.context.strict = previousStrict
 
-        return self.finalize(node, Node.ClassExpression(id, superClass, classBody))
+        return self.finalize(node, self.nodes.ClassExpression(id, superClass, classBody))
 
     # https://tc39.github.io/ecma262/#sec-scripts
     # https://tc39.github.io/ecma262/#sec-modules
@@ -2858,14 +3221,86 @@ class Parser(object):
         body = self.parseDirectivePrologues()
         while self.lookahead.type is not Token.EOF:
             body.append(self.parseStatementListItem())
-        return self.finalize(node, Node.Module(body))
+        return self.finalize(node, self.nodes.Module(body))
 
     def parseScript(self):
         node = self.createNode()
         body = self.parseDirectivePrologues()
         while self.lookahead.type is not Token.EOF:
             body.append(self.parseStatementListItem())
-        return self.finalize(node, Node.Script(body))
+        return self.finalize(node, self.nodes.Script(body))
+
+    # A script until an import or export declaration at the top level, then
+    # a module: the statements before it which could be invalid in strict mode
+    # code, or in a module, are checked again.
+
+    def parseUnambiguous(self):
+        node = self.createNode()
+        self.strictSensitive = False
+        body = self.parseDirectivePrologues()
+        sensitive = [None] if body and self.strictSensitive else []
+        errors = self.errorHandler.errors
+        while self.lookahead.type is not Token.EOF:
+            token = self.lookahead
+            if self.matchKeyword('export') or self.matchKeyword('import') and not self.matchImportCall():
+                self.switchToModule(sensitive)
+                while self.lookahead.type is not Token.EOF:
+                    body.append(self.parseStatementListItem())
+                return self.finalize(node, self.nodes.Module(body))
+            # Its first token was read with the previous statement.
+            self.strictSensitive = token.type is Token.Identifier and token.value in MODULE_RESERVED_WORDS
+            last = self.lastMarker
+            marker = Marker(index=last.index, line=last.line, column=last.column)
+            begin = len(errors)
+            body.append(self.parseStatementListItem())
+            if self.strictSensitive:
+                sensitive.append((len(body), token.start, token.lineNumber, token.lineStart, marker, begin, len(errors)))
+        return self.finalize(node, self.nodes.Script(body))
+
+    def switchToModule(self, sensitive):
+        from .validate import ValidatingJSXParser, ValidatingParser
+
+        # Statements valid in a module have the same tree there, HTML-like
+        # comments aside, so checking them again needs no tree.
+        Validator = ValidatingJSXParser if self.config.jsx else ValidatingParser
+        options = dict(vars(self.config), range=False, loc=False, tokens=False, comment=False)
+        source = self.scanner.source[:self.lookahead.start]
+        if sensitive or '<!--' in source:
+            validator = Validator(source, options=options, delegate=None)
+            errors = self.errorHandler.errors
+            checked = validator.errorHandler.errors
+            if None in sensitive or '<!--' in source:
+                validator.parseModule()
+                errors[:] = checked
+            else:
+                validator.context.strict = True
+                validator.context.isModule = True
+                validator.scanner.isModule = True
+                # The errors of each statement are those found as module code.
+                found = []
+                following = None
+                for index, start, line, lineStart, marker, begin, end in sensitive:
+                    count = len(checked)
+                    validator.moveTo(start, line, lineStart)
+                    if index == following:
+                        # Its first token was read with the previous statement.
+                        del checked[count:]
+                    # Errors are placed after the previous token, as there.
+                    validator.lastMarker = marker
+                    validator.parseStatementListItem()
+                    found.append((begin, end, checked[count:]))
+                    following = index + 1
+                for begin, end, statementErrors in reversed(found):
+                    errors[begin:end] = statementErrors
+
+        if self.config.tokens and not self.context.strict:
+            for token in self.tokens:
+                if token.type == 'Identifier' and self.scanner.isStrictModeReservedWord(token.value):
+                    token.type = 'Keyword'
+
+        self.context.strict = True
+        self.context.isModule = True
+        self.scanner.isModule = True
 
     # https://tc39.github.io/ecma262/#sec-imports
 
@@ -2877,7 +3312,7 @@ class Parser(object):
 
         token = self.nextToken()
         raw = self.getTokenRaw(token)
-        return self.finalize(node, Node.Literal(token.value, raw))
+        return self.finalize(node, self.createLiteral(token, token.value, raw))
 
     # import {<foo as bar>} ...
     def parseImportSpecifier(self):
@@ -2898,7 +3333,7 @@ class Parser(object):
             else:
                 self.throwUnexpectedToken(self.nextToken())
 
-        return self.finalize(node, Node.ImportSpecifier(local, imported))
+        return self.finalize(node, self.nodes.ImportSpecifier(local, imported))
 
     # {foo, bar as bas
     def parseNamedImports(self):
@@ -2916,7 +3351,7 @@ class Parser(object):
     def parseImportDefaultSpecifier(self):
         node = self.createNode()
         local = self.parseIdentifierName()
-        return self.finalize(node, Node.ImportDefaultSpecifier(local))
+        return self.finalize(node, self.nodes.ImportDefaultSpecifier(local))
 
     # import <* as foo> ...
     def parseImportNamespaceSpecifier(self):
@@ -2928,7 +3363,7 @@ class Parser(object):
         self.nextToken()
         local = self.parseIdentifierName()
 
-        return self.finalize(node, Node.ImportNamespaceSpecifier(local))
+        return self.finalize(node, self.nodes.ImportNamespaceSpecifier(local))
 
     def parseImportDeclaration(self):
         if self.context.inFunctionBody:
@@ -2971,7 +3406,7 @@ class Parser(object):
             src = self.parseModuleSpecifier()
         self.consumeSemicolon()
 
-        return self.finalize(node, Node.ImportDeclaration(specifiers, src))
+        return self.finalize(node, self.nodes.ImportDeclaration(specifiers, src))
 
     # https://tc39.github.io/ecma262/#sec-exports
 
@@ -2984,12 +3419,12 @@ class Parser(object):
             self.nextToken()
             exported = self.parseIdentifierName()
 
-        return self.finalize(node, Node.ExportSpecifier(local, exported))
+        return self.finalize(node, self.nodes.ExportSpecifier(local, exported))
 
     def parseExportDefaultSpecifier(self):
         node = self.createNode()
         local = self.parseIdentifierName()
-        return self.finalize(node, Node.ExportDefaultSpecifier(local))
+        return self.finalize(node, self.nodes.ExportDefaultSpecifier(local))
 
     def parseExportDeclaration(self):
         if self.context.inFunctionBody:
@@ -3005,17 +3440,17 @@ class Parser(object):
                 # export default function foo (:
                 # export default function (:
                 declaration = self.parseFunctionDeclaration(True)
-                exportDeclaration = self.finalize(node, Node.ExportDefaultDeclaration(declaration))
+                exportDeclaration = self.finalize(node, self.nodes.ExportDefaultDeclaration(declaration))
             elif self.matchKeyword('class'):
                 # export default class foo {
                 declaration = self.parseClassDeclaration(True)
-                exportDeclaration = self.finalize(node, Node.ExportDefaultDeclaration(declaration))
+                exportDeclaration = self.finalize(node, self.nodes.ExportDefaultDeclaration(declaration))
             elif self.matchContextualKeyword('async'):
                 # export default async function f (:
                 # export default async function (:
                 # export default async x => x
                 declaration = self.parseFunctionDeclaration(True) if self.matchAsyncFunction() else self.parseAssignmentExpression()
-                exportDeclaration = self.finalize(node, Node.ExportDefaultDeclaration(declaration))
+                exportDeclaration = self.finalize(node, self.nodes.ExportDefaultDeclaration(declaration))
             else:
                 if self.matchContextualKeyword('from'):
                     self.throwError(Messages.UnexpectedToken, self.lookahead.value)
@@ -3029,7 +3464,7 @@ class Parser(object):
                 else:
                     declaration = self.parseAssignmentExpression()
                 self.consumeSemicolon()
-                exportDeclaration = self.finalize(node, Node.ExportDefaultDeclaration(declaration))
+                exportDeclaration = self.finalize(node, self.nodes.ExportDefaultDeclaration(declaration))
 
         elif self.match('*'):
             # export * from 'foo'
@@ -3040,7 +3475,7 @@ class Parser(object):
             self.nextToken()
             src = self.parseModuleSpecifier()
             self.consumeSemicolon()
-            exportDeclaration = self.finalize(node, Node.ExportAllDeclaration(src))
+            exportDeclaration = self.finalize(node, self.nodes.ExportAllDeclaration(src))
 
         elif self.lookahead.type is Token.Keyword:
             # export var f = 1
@@ -3058,11 +3493,11 @@ class Parser(object):
                 declaration = self.parseStatementListItem()
             else:
                 self.throwUnexpectedToken(self.lookahead)
-            exportDeclaration = self.finalize(node, Node.ExportNamedDeclaration(declaration, [], None))
+            exportDeclaration = self.finalize(node, self.nodes.ExportNamedDeclaration(declaration, [], None))
 
         elif self.matchAsyncFunction():
             declaration = self.parseFunctionDeclaration()
-            exportDeclaration = self.finalize(node, Node.ExportNamedDeclaration(declaration, [], None))
+            exportDeclaration = self.finalize(node, self.nodes.ExportNamedDeclaration(declaration, [], None))
 
         else:
             specifiers = []
@@ -3099,6 +3534,6 @@ class Parser(object):
             else:
                 # export {foo}
                 self.consumeSemicolon()
-            exportDeclaration = self.finalize(node, Node.ExportNamedDeclaration(None, specifiers, source))
+            exportDeclaration = self.finalize(node, self.nodes.ExportNamedDeclaration(None, specifiers, source))
 
         return exportDeclaration
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals, print_function, division
+
+import io
+import os
+import re
+import sys
+import time
+import fnmatch
+
+from .error_handler import Error
+from .jsx_parser import JSXParser
+from .parser import Parser
+from .scanner import Scanner
+from . import version
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+# Productions and scanner routines that get instrumented, per class.
+# Only methods defined by the class itself are wrapped, so overrides
+# (e.g. `JSXParser.parsePrimaryExpression`) show up as their own frame.
+ROUTINES = (
+    (Parser, re.compile(r'^(parse|nextToken$|nextRegexToken$|collectComments$)')),
+    (JSXParser, re.compile(r'^(parse|lexJSX$|nextJSXToken$|nextJSXText$|peekJSXToken$|scanXHTMLEntity$)')),
+    (Scanner, re.compile(r'^(lex$|scan|skip|getIdentifier$|getComplexIdentifier$|testRegExp$)')),
+)
+
+
+class Stat(object):
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.cumulative = 0.0
+        self.self = 0.0
+
+
+class Frame(object):
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.children = 0.0
+
+
+class Profiler(object):
+    """
+    Attributes parse time to parser productions and scanner routines.
+
+    While `instrument()` is active, every routine listed in `ROUTINES` is
+    replaced (at class level) by a timing wrapper. Self time is the time spent
+    in a routine minus the time spent in instrumented routines it called;
+    cumulative time is only counted for the outermost activation of a routine,
+    so recursive productions are not counted more than once.
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.stacks = {}
+        self.stack = []
+        self.active = {}
+        self.originals = []
+
+    def wrap(self, name, func):
+        stats = self.stats
+        stacks = self.stacks
+        stack = self.stack
+        active = self.active
+
+        def wrapper(*args, **kwargs):
+            frame = Frame(name, timer())
+            stack.append(frame)
+            active[name] = active.get(name, 0) + 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = timer() - frame.start
+                stack.pop()
+                active[name] -= 1
+
+                stat = stats.get(name)
+                if stat is None:
+                    stat = stats[name] = Stat(name)
+                stat.calls += 1
+                stat.self += elapsed - frame.children
+                if not active[name]:
+                    stat.cumulative += elapsed
+
+                key = tuple(f.name for f in stack) + (name,)
+                stacks[key] = stacks.get(key, 0.0) + elapsed - frame.children
+
+                if stack:
+                    stack[-1].children += elapsed
+
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+
+    def instrument(self):
+        for cls, routines in ROUTINES:
+            for name, func in list(cls.__dict__.items()):
+                if callable(func) and routines.match(name):
+                    self.originals.append((cls, name, func))
+                    setattr(cls, name, self.wrap(name, func))
+
+    def restore(self):
+        while self.originals:
+            cls, name, func = self.originals.pop()
+            setattr(cls, name, func)
+
+    def __enter__(self):
+        self.instrument()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.restore()
+
+    def profile(self, code, options=None, **kwargs):
+        from .esprima import parse
+
+        with self:
+            return self.wrap('<parse>', parse)(code, options=options, **kwargs)
+
+    def report(self, sort='self', limit=None, out=None):
+        out = sys.stdout if out is None else out
+        stats = sorted(self.stats.values(), key=lambda s: getattr(s, sort), reverse=True)
+        if limit:
+            stats = stats[:limit]
+        out.write('%10s %12s %12s  %s\n' % ('calls', 'cumulative', 'self', 'routine'))
+        for stat in stats:
+            out.write('%10d %12.6f %12.6f  %s\n' % (stat.calls, stat.cumulative, stat.self, stat.name))
+
+    def collapsed(self, out):
+        # Brendan Gregg's "collapsed stack" format (as consumed by
+        # flamegraph.pl, speedscope, inferno...), counts in microseconds.
+        for key, elapsed in sorted(self.stacks.items()):
+            count = int(round(elapsed * 1000000))
+            if count > 0:
+                out.write('%s %d\n' % (';'.join(key), count))
+
+
+def iterSources(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for filename in sorted(files):
+                    if fnmatch.fnmatch(filename, '*.js'):
+                        yield os.path.join(root, filename)
+        else:
+            yield path
+
+
+def main(argv=None):
+    import optparse
+
+    usage = "usage: %prog profile [options] file.js|directory..."
+    parser = optparse.OptionParser(usage=usage, version=version, prog='esprima')
+    parser.add_option("--jsx", dest="jsx", default=False,
+                      action="store_true",
+                      help="Support JSX syntax")
+    parser.add_option("--module", dest="sourceType", default='script',
+                      action="store_const", const='module',
+                      help="Parse as an ECMAScript module")
+    parser.add_option("--tolerant", dest="tolerant", default=False,
+                      action="store_true",
+                      help="Tolerate errors on a best-effort basis (experimental)")
+    parser.add_option("--loc", dest="loc", default=False,
+                      action="store_true",
+                      help="Include line-column location info for each syntax node")
+    parser.add_option("--range", dest="range", default=False,
+                      action="store_true",
+                      help="Include index-based range for each syntax node")
+    parser.add_option("--sort", dest="sort", default='self',
+                      choices=('self', 'cumulative', 'calls'),
+                      help="Sort routines by self, cumulative or calls [default: %default]")
+    parser.add_option("--limit", dest="limit", default=30, type='int',
+                      help="Number of routines to report, 0 for all [default: %default]")
+    parser.add_option("--collapsed", dest="collapsed", default=None,
+                      metavar="FILE",
+                      help="Write collapsed stacks (for flame graph tools) to FILE")
+    opts, args = parser.parse_args(argv)
+
+    if not args:
+        parser.print_help()
+        return 64
+
+    options = {
+        'jsx': opts.jsx,
+        'sourceType': opts.sourceType,
+        'tolerant': opts.tolerant,
+        'loc': opts.loc,
+        'range': opts.range,
+    }
+
+    profiler = Profiler()
+    timings = []
+    for filename in iterSources(args):
+        with open(filename, 'rb') as f:
+            code = f.read().decode('utf-8')
+        t = timer()
+        try:
+            profiler.profile(code, options=options)
+            error = None
+        except Error as e:
+            error = e
+        timings.append((timer() - t, len(code), filename, error))
+
+    if len(timings) > 1:
+        print('%12s %10s  %s' % ('seconds', 'chars', 'file'))
+        for dt, size, filename, error in sorted(timings, reverse=True)[:opts.limit or None]:
+            print('%12.6f %10d  %s%s' % (dt, size, filename, ' (%s)' % error if error else ''))
+        print()
+    elif timings and timings[0][3]:
+        print('%s: %s' % (timings[0][2], timings[0][3]))
+        print()
+
+    profiler.report(sort=opts.sort, limit=opts.limit)
+
+    if opts.collapsed:
+        with io.open(opts.collapsed, 'w', encoding='utf-8') as f:
+            profiler.collapsed(f)
+
+    return 0
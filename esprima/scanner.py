@@ -29,7 +29,99 @@ from .objects import Object
 from .compat import xrange, unicode, uchr, uord
 from .character import Character, HEX_CONV, OCTAL_CONV
 from .messages import Messages
-from .token import Token
+from .token import Token, TokenCode
+
+
+# Escapes cooked alike in every string: not octal, \8 and \9 or line
+# continuations, which have the scanner go through the string.
+SIMPLE_ESCAPE = '\\\\(?:[^0-9xu\n\r\u2028\u2029]|0(?![0-9])|x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|u\\{0*(?:[0-9a-fA-F]{1,5}|10[0-9a-fA-F]{4})\\})'
+ESCAPES = re.compile('\\\\(?:x([0-9a-fA-F]{2})|u([0-9a-fA-F]{4})|u\\{([0-9a-fA-F]+)\\}|(.))', re.S)
+SINGLE_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t', 'b': '\b', 'f': '\f', 'v': '\x0B', '0': '\0'}
+
+# The rest of string literals with simple escapes only, after the quote.
+STRING_LITERALS = {}
+for quote in '\'"':
+    plain = '[^%s\\\\\n\r\u2028\u2029]*' % quote
+    STRING_LITERALS[quote] = re.compile('%s(?:%s%s)*%s' % (plain, SIMPLE_ESCAPE, plain, quote))
+del quote, plain
+
+# Runs of characters templates take as they are: up to the backquote, a
+# substitution, an escape or a line terminator.
+TEMPLATE_CHARACTERS = re.compile('[^`$\\\\\n\r\u2028\u2029]+')
+DECIMAL_DIGITS = re.compile('[0-9]+')
+
+
+def unescape(match):
+    ch = match.group(4)
+    if ch is None:
+        return uchr(int(match.group(match.lastindex), 16))
+    return SINGLE_ESCAPES.get(ch, ch)
+
+
+def cookString(body):
+    """The value of a string literal, from its body with simple escapes."""
+    return ESCAPES.sub(unescape, body) if '\\' in body else body
+
+
+def cookLiteral(attributes):
+    """The value of a string literal parsed with lazyValues, from its raw
+    string, or of a regular expression parsed trusted, compiled, kept in its
+    attributes where it would have been."""
+    regex = attributes.get('regex')
+    if regex is None:
+        value = cookString(attributes['raw'][1:-1])
+    else:
+        value = compileRegExp(regex.pattern, regex.flags)
+    items = list(attributes.items())
+    attributes.clear()
+    for key, item in items:
+        if key != '_cook':
+            attributes[key] = item
+            if key == 'type':
+                attributes['value'] = value
+    return value
+
+
+def compileRegExp(pattern, flags, invalid=None):
+    """The regular expression object of a pattern-flag pair, or None if it
+    does not compile. `invalid` is called when the pattern is invalid."""
+
+    # The BMP character to use as a replacement for astral symbols when
+    # translating an ES6 "u"-flagged pattern to an ES5-compatible
+    # approximation.
+    # Note: replacing with '\uFFFF' enables false positives in unlikely
+    # scenarios. For example, `[\u{1044f}-\u{10440}]` is an invalid
+    # pattern that would not be detected by this substitution.
+    astralSubstitute = '\uFFFF'
+
+    # Replace every Unicode escape sequence with the equivalent
+    # BMP character or a constant ASCII code point in the case of
+    # astral symbols. (See the above note on `astralSubstitute`
+    # for more information.)
+    def astralSub(m):
+        codePoint = int(m.group(1) or m.group(2), 16)
+        if codePoint > 0x10FFFF:
+            if invalid is not None:
+                invalid()
+        elif codePoint <= 0xFFFF:
+            return uchr(codePoint)
+        return astralSubstitute
+    pattern = re.sub(r'\\u\{([0-9a-fA-F]+)\}|\\u([a-fA-F0-9]{4})', astralSub, pattern)
+
+    # Replace each paired surrogate with a single ASCII symbol to
+    # avoid throwing on regular expressions that are only valid in
+    # combination with the "u" flag.
+    pattern = re.sub(r'[\uD800-\uDBFF][\uDC00-\uDFFF]', astralSubstitute, pattern)
+
+    # Return a regular expression object for this pattern-flag pair, or
+    # `null` in case the current environment doesn't support the flags it
+    # uses.
+    pyflags = 0 | re.M if 'm' in flags else 0 | re.I if 'i' in flags else 0
+    try:
+        return re.compile(pattern, pyflags)
+    except Exception:
+        if invalid is not None:
+            invalid()
 
 
 def hexValue(ch):
@@ -69,9 +161,10 @@ class Comment(Object):
 
 
 class RawToken(Object):
-    def __init__(self, type=None, value=None, pattern=None, flags=None, regex=None, octal=None, cooked=None, head=None, tail=None, lineNumber=None, lineStart=None, start=None, end=None):
+    def __init__(self, type=None, value=None, pattern=None, flags=None, regex=None, octal=None, cooked=None, head=None, tail=None, lineNumber=None, lineStart=None, start=None, end=None, code=0):
         self.type = type
         self.value = value
+        self.code = code
         self.pattern = pattern
         self.flags = flags
         self.regex = regex
@@ -104,6 +197,10 @@ class Scanner(object):
         self.errorHandler = handler
         self.trackComment = False
         self.isModule = False
+        # Regular expressions are not compiled, and have no value, when set.
+        self.trusted = False
+        # Strings with escapes have no value, but when set.
+        self.cook = True
 
         self.length = len(code)
         self.index = 0
@@ -529,6 +626,7 @@ class Scanner(object):
         return RawToken(
             type=type,
             value=id,
+            code=TokenCode[id] if type is Token.Keyword else 0,
             lineNumber=self.lineNumber,
             lineStart=self.lineStart,
             start=start,
@@ -614,6 +712,7 @@ class Scanner(object):
         return RawToken(
             type=Token.Punctuator,
             value=str,
+            code=TokenCode[str],
             lineNumber=self.lineNumber,
             lineStart=self.lineStart,
             start=start,
@@ -751,18 +850,20 @@ class Scanner(object):
                     if self.isImplicitOctalLiteral():
                         return self.scanOctalLiteral(ch, start)
 
-            while Character.isDecimalDigit(self.source[self.index]):
-                num += self.source[self.index]
-                self.index += 1
+            match = DECIMAL_DIGITS.match(self.source, self.index)
+            if match:
+                num += match.group()
+                self.index = match.end()
 
             ch = self.source[self.index]
 
         if ch == '.':
             num += self.source[self.index]
             self.index += 1
-            while Character.isDecimalDigit(self.source[self.index]):
-                num += self.source[self.index]
-                self.index += 1
+            match = DECIMAL_DIGITS.match(self.source, self.index)
+            if match:
+                num += match.group()
+                self.index = match.end()
 
             ch = self.source[self.index]
 
@@ -775,10 +876,10 @@ class Scanner(object):
                 num += self.source[self.index]
                 self.index += 1
 
-            if Character.isDecimalDigit(self.source[self.index]):
-                while Character.isDecimalDigit(self.source[self.index]):
-                    num += self.source[self.index]
-                    self.index += 1
+            match = DECIMAL_DIGITS.match(self.source, self.index)
+            if match:
+                num += match.group()
+                self.index = match.end()
 
             else:
                 self.throwUnexpectedToken()
@@ -803,6 +904,20 @@ class Scanner(object):
         quote = self.source[start]
         assert quote in ('\'', '"'), 'String literal must starts with a quote'
 
+        match = STRING_LITERALS[quote].match(self.source, start + 1, self.length)
+        if match:
+            self.index = match.end()
+            body = self.source[start + 1:self.index - 1]
+            return RawToken(
+                type=Token.StringLiteral,
+                value=cookString(body) if self.cook or '\\' not in body else None,
+                octal=False,
+                lineNumber=self.lineNumber,
+                lineStart=self.lineStart,
+                start=start,
+                end=self.index
+            )
+
         self.index += 1
         octal = False
         str = ''
@@ -903,6 +1018,13 @@ class Scanner(object):
         self.index += 1
 
         while not self.eof():
+            match = TEMPLATE_CHARACTERS.match(self.source, self.index, self.length)
+            if match:
+                cooked += match.group()
+                self.index = match.end()
+                if self.eof():
+                    break
+
             ch = self.source[self.index]
             self.index += 1
             if ch == '`':
@@ -1006,40 +1128,7 @@ class Scanner(object):
     # https://tc39.github.io/ecma262/#sec-literals-regular-expression-literals
 
     def testRegExp(self, pattern, flags):
-        # The BMP character to use as a replacement for astral symbols when
-        # translating an ES6 "u"-flagged pattern to an ES5-compatible
-        # approximation.
-        # Note: replacing with '\uFFFF' enables false positives in unlikely
-        # scenarios. For example, `[\u{1044f}-\u{10440}]` is an invalid
-        # pattern that would not be detected by this substitution.
-        astralSubstitute = '\uFFFF'
-
-        # Replace every Unicode escape sequence with the equivalent
-        # BMP character or a constant ASCII code point in the case of
-        # astral symbols. (See the above note on `astralSubstitute`
-        # for more information.)
-        def astralSub(m):
-            codePoint = int(m.group(1) or m.group(2), 16)
-            if codePoint > 0x10FFFF:
-                self.tolerateUnexpectedToken(Messages.InvalidRegExp)
-            elif codePoint <= 0xFFFF:
-                return uchr(codePoint)
-            return astralSubstitute
-        pattern = re.sub(r'\\u\{([0-9a-fA-F]+)\}|\\u([a-fA-F0-9]{4})', astralSub, pattern)
-
-        # Replace each paired surrogate with a single ASCII symbol to
-        # avoid throwing on regular expressions that are only valid in
-        # combination with the "u" flag.
-        pattern = re.sub(r'[\uD800-\uDBFF][\uDC00-\uDFFF]', astralSubstitute, pattern)
-
-        # Return a regular expression object for this pattern-flag pair, or
-        # `null` in case the current environment doesn't support the flags it
-        # uses.
-        pyflags = 0 | re.M if 'm' in flags else 0 | re.I if 'i' in flags else 0
-        try:
-            return re.compile(pattern, pyflags)
-        except Exception:
-            self.tolerateUnexpectedToken(Messages.InvalidRegExp)
+        return compileRegExp(pattern, flags, lambda: self.tolerateUnexpectedToken(Messages.InvalidRegExp))
 
     def scanRegExpBody(self):
         ch = self.source[self.index]
@@ -1124,7 +1213,7 @@ class Scanner(object):
 
         pattern = self.scanRegExpBody()
         flags = self.scanRegExpFlags()
-        value = self.testRegExp(pattern, flags)
+        value = None if self.trusted else self.testRegExp(pattern, flags)
 
         return RawToken(
             type=Token.RegularExpression,
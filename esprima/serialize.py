@@ -0,0 +1,514 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import gc
+import re
+import struct
+
+from .comment_handler import Comment
+from .compat import PY3, basestring, long
+from .lines import spanItems
+from .objects import Object
+from .parser import TokenEntry
+from .scanner import Position, RegExp, SourceLocation, cookLiteral
+from . import jsx_nodes
+from . import nodes
+
+MAGIC = b'ESTB'
+VERSION = 1
+
+# The sections after the tree.
+COMMENTS = 1
+TOKENS = 2
+RANGES = 4
+LOCATIONS = 8
+
+# Tags of the values. Objects of the first shapes are tagged with the shape.
+NONE, FALSE, TRUE, INT, NEGATIVE, FLOAT, STRING, LIST, DICT, REGEX, OBJECT = range(11)
+SHAPES = 16
+
+# How the values of the keys of a shape are stored.
+INLINE, CONSTANT, RANGE, LOC, SECTION = range(5)
+
+DOUBLE = struct.Struct(str('<d'))
+PATTERN = type(re.compile(''))
+
+# JavaScript strings can hold lone surrogates.
+ENCODING_ERRORS = 'surrogatepass' if PY3 else 'strict'
+
+
+def objectClasses():
+    classes = {}
+    for module in (nodes, jsx_nodes):
+        for name, cls in vars(module).items():
+            if isinstance(cls, type) and issubclass(cls, Object) and cls.__module__ == module.__name__:
+                classes[name] = cls
+    classes['TemplateElement.Value'] = nodes.TemplateElement.Value
+    for cls in (Comment, TokenEntry, Position, SourceLocation, RegExp):
+        classes[cls.__name__] = cls
+    return classes
+
+
+CLASSES = objectClasses()
+CLASS_NAMES = dict((cls, name) for name, cls in CLASSES.items())
+
+
+def className(cls):
+    name = CLASS_NAMES.get(cls)
+    if name is None:
+        from .cache import Frozen
+        # Frozen trees are stored as the trees they were.
+        if issubclass(cls, Frozen):
+            name = CLASS_NAMES.get(cls.__bases__[1])
+        if name is None:
+            raise ValueError("Cannot serialize %s objects" % cls.__name__)
+    return name
+
+
+def zigzag(n):
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def unzigzag(n):
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+def writeVarint(out, n):
+    while n > 127:
+        out.append(n & 127 | 128)
+        n >>= 7
+    out.append(n)
+
+
+def serialize(tree, range=True, loc=True, comment=True, tokens=True):
+    """Encodes `tree`, as returned by parse(), in a compact binary format
+    which deserialize() decodes back to an equal tree.
+
+    After a header come a table of the strings, each stored once, a table of
+    the classes of the objects and a table of their shapes: class, constant
+    `type` and keys. The tree follows, each object as its shape and its
+    values, then the sections: the comments and the tokens of the program,
+    the ranges of the objects, with varints relative to the previous one,
+    and their locations. The ranges, locations, comments and tokens are
+    left out without `range`, `loc`, `comment` and `tokens`.
+
+    Raises ValueError for objects other than those parse() builds."""
+
+    strings = {}
+    stringList = []
+    shapes = {}
+    shapeTable = bytearray()
+    classes = {}
+    classTable = bytearray()
+    out = bytearray()
+    ranges = bytearray()
+    locations = bytearray()
+    flags = 0
+
+    dropped = set()
+    if not range:
+        dropped.add('range')
+    if not loc:
+        dropped.add('loc')
+    if not comment:
+        dropped.update(('leadingComments', 'trailingComments', 'innerComments'))
+
+    # The comments and tokens of the program come after the tree.
+    sections = []
+    if isinstance(tree, nodes.Node):
+        attributes = tree.__dict__
+        for key, flag, kept in (('comments', COMMENTS, comment), ('tokens', TOKENS, tokens)):
+            if key in attributes:
+                if kept:
+                    flags |= flag
+                    sections.append(attributes[key])
+                else:
+                    dropped.add(key)
+
+    def string(value):
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(stringList)
+            stringList.append(value)
+        return index
+
+    def shape(value, attributes):
+        cls = value.__class__
+        name = className(cls)
+        index = classes.get(cls)
+        if index is None:
+            index = classes[cls] = len(classes)
+            writeVarint(classTable, string(name))
+
+        keys = []
+        inline = []
+        for key in attributes:
+            # Private attributes, as the line index of loc='lazy', are left
+            # out as by toDict().
+            if key in dropped or key[0] == '_':
+                continue
+            if key == 'type' and isinstance(attributes[key], basestring):
+                mode = CONSTANT
+            elif key == 'range':
+                mode = RANGE
+            elif key == 'loc' and isinstance(attributes[key], SourceLocation):
+                mode = LOC
+            elif key in ('comments', 'tokens') and value is root:
+                mode = SECTION
+            else:
+                mode = INLINE
+                inline.append(key)
+            keys.append((key, mode))
+
+        writeVarint(shapeTable, index)
+        constant = attributes.get('type')
+        writeVarint(shapeTable, string(constant) + 1 if isinstance(constant, basestring) else 0)
+        writeVarint(shapeTable, len(keys))
+        for key, mode in keys:
+            writeVarint(shapeTable, string(key))
+            shapeTable.append(mode)
+
+        hasRange = any(mode == RANGE for _, mode in keys)
+        hasLoc = any(mode == LOC for _, mode in keys)
+        return len(shapes), tuple(reversed(inline)), hasRange, hasLoc
+
+    root = tree if isinstance(tree, nodes.Node) else None
+    previousStart = 0
+    previousLine = 1
+    stack = list(reversed(sections))
+    stack.append(tree)
+    while stack:
+        value = stack.pop()
+        cls = value.__class__
+
+        if value is None:
+            out.append(NONE)
+        elif cls is bool:
+            out.append(TRUE if value else FALSE)
+        elif isinstance(value, basestring):
+            out.append(STRING)
+            writeVarint(out, string(value))
+        elif isinstance(value, Object):
+            attributes = value.__dict__
+            if '_cook' in attributes:
+                cookLiteral(attributes)
+            if '_span' in attributes:
+                # The range and loc of compact locations, as by toDict().
+                attributes = dict(spanItems(attributes))
+            key = (cls, tuple(attributes), attributes.get('type'))
+            entry = shapes.get(key)
+            if entry is None:
+                entry = shapes[key] = shape(value, attributes)
+            index, inline, hasRange, hasLoc = entry
+            if index < 256 - SHAPES:
+                out.append(SHAPES + index)
+            else:
+                out.append(OBJECT)
+                writeVarint(out, index)
+            if hasRange:
+                start, end = attributes['range']
+                writeVarint(ranges, zigzag(start - previousStart))
+                writeVarint(ranges, zigzag(end - start))
+                previousStart = start
+            if hasLoc:
+                location = attributes['loc']
+                start = location.start
+                end = location.end
+                writeVarint(locations, zigzag(start.line - previousLine))
+                writeVarint(locations, zigzag(start.column))
+                writeVarint(locations, zigzag(end.line - start.line))
+                writeVarint(locations, zigzag(end.column))
+                writeVarint(locations, 0 if location.source is None else zigzag(string(location.source) + 1))
+                previousLine = start.line
+            for key in inline:
+                stack.append(attributes[key])
+        elif isinstance(value, list):
+            out.append(LIST)
+            writeVarint(out, len(value))
+            stack.extend(reversed(value))
+        elif isinstance(value, (int, long)):
+            if value >= 0:
+                out.append(INT)
+                writeVarint(out, value)
+            else:
+                out.append(NEGATIVE)
+                writeVarint(out, -value)
+        elif cls is float:
+            out.append(FLOAT)
+            out.extend(DOUBLE.pack(value))
+        elif cls is dict:
+            out.append(DICT)
+            writeVarint(out, len(value))
+            for key, item in reversed(list(value.items())):
+                stack.append(item)
+                stack.append(key)
+        elif cls is PATTERN:
+            out.append(REGEX)
+            writeVarint(out, string(value.pattern))
+            writeVarint(out, value.flags)
+        else:
+            raise ValueError("Cannot serialize %s values" % cls.__name__)
+
+    if shapes and any(hasRange for _, _, hasRange, _ in shapes.values()):
+        flags |= RANGES
+    if shapes and any(hasLoc for _, _, _, hasLoc in shapes.values()):
+        flags |= LOCATIONS
+
+    header = bytearray(MAGIC)
+    header.append(VERSION)
+    header.append(flags)
+    writeVarint(header, len(strings))
+    for value in stringList:
+        data = value.encode('utf-8', ENCODING_ERRORS)
+        writeVarint(header, len(data))
+        header.extend(data)
+    writeVarint(header, len(classes))
+    header.extend(classTable)
+    writeVarint(header, len(shapes))
+    header.extend(shapeTable)
+
+    return bytes(header + out + ranges + locations)
+
+
+class Shape(object):
+    def __init__(self, cls, attributes, inline, hasRange, hasLoc):
+        self.cls = cls
+        self.attributes = attributes
+        self.inline = inline
+        self.hasRange = hasRange
+        self.hasLoc = hasLoc
+
+
+def readVarint(data, pos):
+    """The varint at `pos` and the offset after it."""
+    n = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 127) << shift
+        if byte < 128:
+            return n, pos
+        shift += 7
+
+
+def deserialize(data):
+    """Decodes a tree encoded by serialize(). Raises ValueError if `data`
+    is not in that format."""
+
+    # Collecting while decoding would take longer than decoding, as the
+    # objects are only new ones.
+    collect = gc.isenabled()
+    gc.disable()
+    try:
+        return decode(bytearray(data))
+    finally:
+        if collect:
+            gc.enable()
+
+
+def decode(data):
+    if data[:4] != MAGIC or len(data) < 6:
+        raise ValueError("Not a serialized tree")
+    if data[4] != VERSION:
+        raise ValueError("Unsupported serialized tree version %d" % data[4])
+    flags = data[5]
+    pos = 6
+
+    count, pos = readVarint(data, pos)
+    strings = []
+    for _ in range(count):
+        length, pos = readVarint(data, pos)
+        strings.append(bytes(data[pos:pos + length]).decode('utf-8', ENCODING_ERRORS))
+        pos += length
+
+    count, pos = readVarint(data, pos)
+    classes = []
+    for _ in range(count):
+        name, pos = readVarint(data, pos)
+        cls = CLASSES.get(strings[name])
+        if cls is None:
+            raise ValueError("Unknown serialized class %s" % strings[name])
+        classes.append(cls)
+
+    count, pos = readVarint(data, pos)
+    shapes = []
+    for _ in range(count):
+        cls, pos = readVarint(data, pos)
+        constant, pos = readVarint(data, pos)
+        keys, pos = readVarint(data, pos)
+        attributes = {}
+        inline = []
+        hasRange = hasLoc = False
+        for _ in range(keys):
+            key, pos = readVarint(data, pos)
+            key = strings[key]
+            mode = data[pos]
+            pos += 1
+            attributes[key] = strings[constant - 1] if mode == CONSTANT else None
+            if mode == INLINE:
+                inline.append(key)
+            elif mode == RANGE:
+                hasRange = True
+            elif mode == LOC:
+                hasLoc = True
+        shapes.append(Shape(classes[cls], attributes, tuple(inline), hasRange, hasLoc))
+
+    ranged = []
+    located = []
+
+    def value(pos):
+        # Iterative, as trees can be deeper than the recursion limit.
+        result = []
+        # The containers being filled: their tag, the list, attributes or
+        # dict, the keys and the number of values left.
+        frames = [[LIST, result, None, 1]]
+        while frames:
+            tag = data[pos]
+            pos += 1
+            child = None
+
+            if tag >= SHAPES:
+                shape = shapes[tag - SHAPES]
+            elif tag == OBJECT:
+                index, pos = readVarint(data, pos)
+                shape = shapes[index]
+            else:
+                shape = None
+
+            if shape is not None:
+                cls = shape.cls
+                item = cls.__new__(cls)
+                attributes = item.__dict__
+                attributes.update(shape.attributes)
+                if shape.hasRange:
+                    ranged.append(attributes)
+                if shape.hasLoc:
+                    located.append(attributes)
+                if shape.inline:
+                    child = [OBJECT, attributes, shape.inline, len(shape.inline)]
+            elif tag == STRING:
+                item = data[pos]
+                pos += 1
+                if item > 127:
+                    item, pos = readVarint(data, pos - 1)
+                item = strings[item]
+            elif tag == NONE:
+                item = None
+            elif tag == LIST:
+                count = data[pos]
+                pos += 1
+                if count > 127:
+                    count, pos = readVarint(data, pos - 1)
+                item = []
+                if count:
+                    child = [LIST, item, None, count]
+            elif tag == TRUE:
+                item = True
+            elif tag == FALSE:
+                item = False
+            elif tag == INT or tag == NEGATIVE:
+                item, pos = readVarint(data, pos)
+                if tag == NEGATIVE:
+                    item = -item
+            elif tag == FLOAT:
+                item = DOUBLE.unpack_from(data, pos)[0]
+                pos += 8
+            elif tag == DICT:
+                count, pos = readVarint(data, pos)
+                item = {}
+                if count:
+                    child = [DICT, item, [], count * 2]
+            elif tag == REGEX:
+                pattern, pos = readVarint(data, pos)
+                flags, pos = readVarint(data, pos)
+                item = re.compile(strings[pattern], flags)
+            else:
+                raise ValueError("Invalid serialized tree")
+
+            frame = frames[-1]
+            kind, container, keys, left = frame
+            if kind == OBJECT:
+                container[keys[-left]] = item
+            elif kind == LIST:
+                container.append(item)
+            elif left & 1:
+                container[keys.pop()] = item
+            else:
+                # The key of the next value of the dict.
+                keys.append(item)
+            if left == 1:
+                frames.pop()
+            else:
+                frame[3] = left - 1
+            if child is not None:
+                frames.append(child)
+
+        return result[0], pos
+
+    tree, pos = value(pos)
+    if flags & COMMENTS:
+        tree.__dict__['comments'], pos = value(pos)
+    if flags & TOKENS:
+        tree.__dict__['tokens'], pos = value(pos)
+
+    numbers = sectionNumbers(data, pos)
+
+    if flags & RANGES:
+        start = 0
+        count = 2 * len(ranged)
+        for attributes, delta, length in zip(ranged, numbers[0:count:2], numbers[1:count:2]):
+            start += delta
+            attributes['range'] = [start, start + length]
+        del numbers[:count]
+
+    if flags & LOCATIONS:
+        line = 1
+        for attributes, delta, column, lines, endColumn, source in zip(
+            located, numbers[0::5], numbers[1::5], numbers[2::5], numbers[3::5], numbers[4::5],
+        ):
+            line += delta
+            attributes['loc'] = SourceLocation(
+                Position(line, column), Position(line + lines, endColumn),
+                strings[source - 1] if source else None,
+            )
+
+    return tree
+
+
+def sectionNumbers(data, pos):
+    """The zigzag varints from `pos` to the end of `data`, decoded."""
+    numbers = []
+    append = numbers.append
+    n = shift = 0
+    for byte in data[pos:]:
+        if byte < 128:
+            n |= byte << shift
+            append(-((n + 1) >> 1) if n & 1 else n >> 1)
+            n = shift = 0
+        else:
+            n |= (byte & 127) << shift
+            shift += 7
+    return numbers
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import mmap
+import os
+import struct
+import tempfile
+
+from .objects import Array, Object
+from .serialize import deserialize, serialize
+
+# Memory backed where there is such a file system.
+SHARED_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+OFFSET = struct.Struct(str('<Q'))
+
+
+class SharedTree(Object):
+    """A tree written by shareTree(), as sent to another process."""
+
+    def __init__(self, path):
+        self.path = path
+
+
+def shareTree(tree):
+    """
+    Writes `tree` to a memory mapped file for another process to open with
+    attachTree(). The statements of its body are serialized apart, to be
+    decoded when first accessed. Returns the SharedTree to send.
+    """
+    body = tree.body
+    if isinstance(body, list):
+        tree.body = []
+        try:
+            blobs = [serialize(tree)]
+        finally:
+            tree.body = body
+        blobs.extend(serialize(statement) for statement in body)
+    else:
+        blobs = [serialize(tree)]
+
+    # The number of blobs and their offsets, then the blobs.
+    header = bytearray(OFFSET.pack(len(blobs)))
+    offset = OFFSET.size * (len(blobs) + 2)
+    header.extend(OFFSET.pack(offset))
+    for blob in blobs:
+        offset += len(blob)
+        header.extend(OFFSET.pack(offset))
+
+    fd, path = tempfile.mkstemp(prefix='esprima-', suffix='.estb', dir=SHARED_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    return SharedTree(path)
+
+
+def attachTree(shared):
+    """
+    Opens a tree written by shareTree(), removing its file. The statements of
+    its body are decoded when first accessed, the others being left in the
+    mapped memory, which is released with the last of them.
+    """
+    with open(shared.path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        os.unlink(shared.path)
+    except OSError:
+        # Mapped files cannot be removed on Windows.
+        data = buffer[:]
+        buffer.close()
+        os.unlink(shared.path)
+        buffer = data
+
+    count = OFFSET.unpack_from(buffer, 0)[0]
+    offsets = struct.unpack_from(str('<%dQ') % (count + 1), buffer, OFFSET.size)
+    tree = deserialize(buffer[offsets[0]:offsets[1]])
+    if isinstance(tree.body, list):
+        tree.body = SharedArray([(buffer, offsets[i], offsets[i + 1]) for i in range(1, count)])
+    return tree
+
+
+def materializing(method):
+    def materialized(self, *args, **kwargs):
+        if self.spans is not None:
+            self.materialize()
+        return method(self, *args, **kwargs)
+    return materialized
+
+
+class SharedArray(Array):
+    """The statements of a tree opened by attachTree(), decoded when first
+    accessed. Changing the list decodes the others first."""
+
+    def __init__(self, spans):
+        super(SharedArray, self).__init__([None] * len(spans))
+        # The buffer and slice of each statement not decoded yet.
+        self.spans = spans
+        self.pending = len(spans)
+
+    def load(self, index):
+        spans = self.spans
+        if spans is None or spans[index] is None:
+            return
+        buffer, start, end = spans[index]
+        list.__setitem__(self, index, deserialize(buffer[start:end]))
+        spans[index] = None
+        self.pending -= 1
+        if not self.pending:
+            # The last reference to the buffer, which unmaps it.
+            self.spans = None
+
+    def materialize(self):
+        for index in range(len(self)):
+            self.load(index)
+
+    def __getitem__(self, index):
+        if self.spans is not None:
+            if isinstance(index, slice):
+                for i in range(*index.indices(len(self))):
+                    self.load(i)
+            else:
+                self.load(index)
+        return list.__getitem__(self, index)
+
+    def __getslice__(self, i, j):
+        return self.__getitem__(slice(i, j))
+
+    def __iter__(self):
+        if self.spans is None:
+            return list.__iter__(self)
+        return self.iterate()
+
+    def iterate(self):
+        index = 0
+        while index < len(self):
+            yield self[index]
+            index += 1
+
+    def __reduce__(self):
+        return Array, (list(self),)
+
+    __reversed__ = materializing(list.__reversed__)
+    __contains__ = materializing(list.__contains__)
+    __repr__ = materializing(list.__repr__)
+    __eq__ = materializing(list.__eq__)
+    __ne__ = materializing(list.__ne__)
+    __lt__ = materializing(list.__lt__)
+    __le__ = materializing(list.__le__)
+    __gt__ = materializing(list.__gt__)
+    __ge__ = materializing(list.__ge__)
+    __add__ = materializing(list.__add__)
+    __mul__ = materializing(list.__mul__)
+    __rmul__ = materializing(list.__rmul__)
+    __setitem__ = materializing(list.__setitem__)
+    __delitem__ = materializing(list.__delitem__)
+    __iadd__ = materializing(list.__iadd__)
+    __imul__ = materializing(list.__imul__)
+    index = materializing(list.index)
+    count = materializing(list.count)
+    append = materializing(list.append)
+    extend = materializing(list.extend)
+    insert = materializing(list.insert)
+    pop = materializing(list.pop)
+    remove = materializing(list.remove)
+    reverse = materializing(list.reverse)
+    sort = materializing(list.sort)
+    if hasattr(list, 'clear'):
+        clear = materializing(list.clear)
+        copy = materializing(list.copy)
+    if hasattr(list, '__setslice__'):
+        __setslice__ = materializing(list.__setslice__)
+        __delslice__ = materializing(list.__delslice__)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+import re
+from array import array
+
+from .objects import Object
+from .scanner import Scanner
+from .tokenizer import Reader
+
+WHITESPACE = (
+    ' \t\v\f\xa0\ufeff\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006'
+    '\u2007\u2008\u2009\u200a\u202f\u205f\u3000'
+)
+LINE_TERMINATORS = '\n\r\u2028\u2029'
+BLANKS = WHITESPACE + LINE_TERMINATORS
+
+# Cannot extend past the first `*/`, to avoid backtracking in repetitions.
+BLOCK_COMMENT = r'/\*(?:[^*]|\*+[^*/])*\*+/'
+
+STRING = re.compile(r'"(?:[^"\\\n\r]|\\(?:\r\n|[\s\S]))*"|\'(?:[^\'\\\n\r]|\\(?:\r\n|[\s\S]))*\'')
+COMMENT = re.compile(r'//[^%(t)s]*|%(c)s' % {'t': LINE_TERMINATORS, 'c': BLOCK_COMMENT})
+REGEX = re.compile(
+    r'/(?:[^\\/\[%(t)s]|\\[^%(t)s]|\[(?:[^\]\\%(t)s]|\\[^%(t)s])*\])+/[\w$]*' % {'t': LINE_TERMINATORS},
+    re.UNICODE,
+)
+# The rest of a template, after "`" or the "}" ending a substitution.
+TEMPLATE = re.compile(r'(?:[^`\\$]|\\[\s\S]|\$(?!\{))*(`|\$\{)?')
+LINE_REST = re.compile(r'[^%s]*' % LINE_TERMINATORS)
+
+# The next token, after blanks. Unterminated strings and comments extend
+# to the end of the line and of the source.
+TOKEN = re.compile(
+    r'[%(b)s]*(?:'
+    r'((?:[^\W\d]|\$|\\u\{?[0-9a-fA-F]+\}?)(?:[\w$]|\\u\{?[0-9a-fA-F]+\}?)*)|'  # 1: word
+    r'((?:\d\w*(?:\.\w*)?|\.\d\w*)(?:(?<=[eE])[+-]\d+)?)|'  # 2: number
+    r'([{(\[])|'  # 3: opening bracket
+    r'([})\]])|'  # 4: closing bracket
+    r'("(?:[^"\\%(t)s]|\\(?:\r\n|[\s\S]))*"?|\'(?:[^\'\\%(t)s]|\\(?:\r\n|[\s\S]))*\'?)|'  # 5: string
+    r'(//[^%(t)s]*|%(c)s|/\*[\s\S]*|<!--[^%(t)s]*)|'  # 6: comment
+    r'(/)|'  # 7: slash
+    r'(`)|'  # 8: template
+    r'(>>>=|\.\.\.|===|!==|>>>|<<=|>>=|\*\*=|&&|\|\||\+\+|--|<<|>>|=>|\*\*|[=!+\-*&|^%%<>]=|'
+    r'[.;,:?~<>=!+\-*%%&|^])|'  # 9: punctuator
+    r'([\s\S])'  # 10: anything else
+    r')' % {'b': BLANKS, 't': LINE_TERMINATORS, 'c': BLOCK_COMMENT},
+    re.UNICODE,
+)
+
+KEYWORDS = Scanner.isKeyword.set
+BRACKETS = {')': '(', ']': '[', '}': '{'}
+
+
+class Span:
+    String = 1
+    Template = 2
+    LineComment = 3
+    BlockComment = 4
+    RegularExpression = 5
+
+
+SpanName = {}
+SpanName[Span.String] = "String"
+SpanName[Span.Template] = "Template"
+SpanName[Span.LineComment] = "LineComment"
+SpanName[Span.BlockComment] = "BlockComment"
+SpanName[Span.RegularExpression] = "RegularExpression"
+
+
+class Skeleton(Object):
+    """The brackets and literals of a source, as flat arrays of offsets.
+
+    `brackets` holds the opening and closing offsets of each bracket pair,
+    by opening offset, the closing offset being -1 for an unclosed bracket.
+    `spans` holds the kind, start and end offsets of each string, template
+    part, comment and regular expression, in source order. The braces
+    around template substitutions are part of the template spans."""
+
+    def __init__(self, brackets, spans):
+        self.brackets = brackets
+        self.spans = spans
+
+    def pairs(self):
+        brackets = self.brackets
+        for i in range(0, len(brackets), 2):
+            yield brackets[i], brackets[i + 1]
+
+    def literals(self):
+        spans = self.spans
+        for i in range(0, len(spans), 3):
+            yield spans[i], spans[i + 1], spans[i + 2]
+
+
+def skeleton(code):
+    """Scans the structure of `code` without tokenizing it: matches the
+    brackets and finds the spans of the literals and comments, telling
+    regular expressions from divisions as the tokenizer does. The code is
+    scanned as a script, HTML-like comments included. Never fails;
+    mismatched closing brackets are ignored."""
+
+    brackets = array(str('l'))
+    spans = array(str('l'))
+    stack = []  # (slot of the opening offset in brackets, bracket or '${')
+    reader = Reader()
+    push = reader.push
+    match = TOKEN.match
+    length = len(code)
+    index = 0
+
+    while True:
+        m = match(code, index)
+        if m is None:
+            break
+        group = m.lastindex
+        start = m.start(group)
+        index = m.end()
+
+        if group == 1:
+            value = m.group(1)
+            push(value if value in KEYWORDS else None)
+
+        elif group == 3:
+            bracket = m.group(3)
+            push(bracket)
+            stack.append((len(brackets), bracket))
+            brackets.append(start)
+            brackets.append(-1)
+
+        elif group == 4:
+            bracket = m.group(4)
+            opening = BRACKETS[bracket]
+            if stack and stack[-1][1] == '${' and bracket == '}':
+                # The rest of the template, up to the next substitution.
+                stack.pop()
+                index = scanTemplate(code, start, spans, stack)
+                push(None)
+                continue
+            for depth in range(len(stack) - 1, -1, -1):
+                if stack[depth][1] == opening:
+                    brackets[stack[depth][0] + 1] = start
+                    del stack[depth:]
+                    break
+            push(bracket)
+
+        elif group == 9:
+            value = m.group(9)
+            if value == '--' and code.startswith('>', index) and atLineStart(code, start, spans):
+                # An HTML-like comment.
+                index = LINE_REST.match(code, index).end()
+                spans.extend((Span.LineComment, start, index))
+            else:
+                push(value)
+
+        elif group == 6:
+            kind = Span.BlockComment if code[start + 1] == '*' else Span.LineComment
+            spans.extend((kind, start, index))
+
+        elif group == 7:
+            regex = REGEX.match(code, start) if reader.isRegexStart() else None
+            if regex:
+                index = regex.end()
+                spans.extend((Span.RegularExpression, start, index))
+                push(None)
+            else:
+                if code.startswith('=', index):
+                    index += 1
+                push(code[start:index])
+
+        elif group == 8:
+            index = scanTemplate(code, start, spans, stack)
+            push(None)
+
+        elif group == 5:
+            spans.extend((Span.String, start, index))
+            push(None)
+
+        else:
+            push(None)
+
+        if index >= length:
+            break
+
+    return Skeleton(brackets, spans)
+
+
+def scanTemplate(code, start, spans, stack):
+    m = TEMPLATE.match(code, start + 1)
+    if m.group(1) == '${':
+        stack.append((None, '${'))
+    spans.extend((Span.Template, start, m.end()))
+    return m.end()
+
+
+# Whether only blanks and comments are before `index` on its line.
+def atLineStart(code, index, spans):
+    last = len(spans) - 3
+    while True:
+        while index > 0 and code[index - 1] in WHITESPACE:
+            index -= 1
+        if index == 0 or code[index - 1] in LINE_TERMINATORS:
+            return True
+        if last < 0 or spans[last + 2] != index or spans[last] != Span.BlockComment:
+            return False
+        index = spans[last + 1]
+        last -= 3
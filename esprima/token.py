@@ -48,3 +48,37 @@ TokenName[Token.Punctuator] = "Punctuator"
 TokenName[Token.StringLiteral] = "String"
 TokenName[Token.RegularExpression] = "RegularExpression"
 TokenName[Token.Template] = "Template"
+
+
+# Punctuators and keywords (including the ones only reserved in strict mode)
+# are given small integer codes. The scanner attaches the code to the token
+# once, so the parser can match tokens with integer comparisons, test operator
+# classes with bitsets and index tables by code. Code 0 is never assigned.
+Punctuators = (
+    '{', '}', '(', ')', '[', ']', '.', '...', ';', ',', '?', ':', '~', '=>',
+    '<', '>', '<=', '>=', '==', '!=', '===', '!==',
+    '+', '-', '*', '**', '/', '%', '++', '--', '<<', '>>', '>>>',
+    '&', '|', '^', '!', '&&', '||',
+    '=', '+=', '-=', '*=', '**=', '/=', '%=', '<<=', '>>=', '>>>=', '&=', '|=', '^=',
+)
+
+Keywords = (
+    'break', 'case', 'catch', 'class', 'const', 'continue', 'debugger',
+    'default', 'delete', 'do', 'else', 'enum', 'export', 'extends', 'finally',
+    'for', 'function', 'if', 'import', 'in', 'instanceof', 'let', 'new',
+    'return', 'super', 'switch', 'this', 'throw', 'try', 'typeof', 'var',
+    'void', 'while', 'with', 'yield',
+    'implements', 'interface', 'package', 'private', 'protected', 'public', 'static',
+)
+
+TokenCode = {}
+for code, value in enumerate(Punctuators + Keywords, 1):
+    TokenCode[value] = code
+del code, value
+
+
+def codeSet(*values):
+    mask = 0
+    for value in values:
+        mask |= 1 << TokenCode[value]
+    return mask
@@ -25,8 +25,9 @@ from __future__ import absolute_import, unicode_literals
 
 from collections import deque
 
+from .compat import xrange
 from .objects import Object
-from .error_handler import ErrorHandler
+from .error_handler import Error, ErrorHandler
 from .scanner import Scanner, SourceLocation, Position, RegExp
 from .token import Token, TokenName
 
@@ -44,6 +45,43 @@ class Reader(object):
     def __init__(self):
         self.values = []
         self.curly = self.paren = -1
+        # Copies drop the values before `base`, except the few still
+        # looked up by isRegexStart(), which are kept in `saved`.
+        self.base = 0
+        self.saved = {}
+
+    def value(self, index):
+        if index < 0:
+            # Before any opening paren or curly, as an unbalanced closer.
+            return None
+        if index < self.base:
+            return self.saved[index]
+        return self.values[index - self.base]
+
+    def count(self):
+        return self.base + len(self.values)
+
+    # A constant size copy, enough to resume tokenizing from here.
+    def copy(self):
+        reader = Reader()
+        reader.base = max(0, self.count() - 6)
+        reader.values = [self.value(i) for i in range(reader.base, self.count())]
+        reader.curly = self.curly
+        reader.paren = self.paren
+        for index in (self.paren - 1, self.curly - 3, self.curly - 4, self.curly - 5):
+            if 0 <= index < reader.base:
+                reader.saved[index] = self.value(index)
+        return reader
+
+    # Everything isRegexStart() can look at, now or after more tokens.
+    # Two readers with the same key classify every following slash alike.
+    def key(self):
+        def at(index):
+            return index if index < 0 else self.value(index)
+        return (
+            tuple(self.values[-6:]), min(self.count(), 4),
+            at(self.paren - 1), at(self.curly - 3), at(self.curly - 4), at(self.curly - 5),
+        )
 
     # A function following one of those tokens is an expression.
     def beforeFunctionExpression(self, t):
@@ -62,7 +100,7 @@ class Reader(object):
     # Determine if forward slash (/) is an operator or part of a regular expression
     # https://github.com/mozilla/sweet.js/wiki/design
     def isRegexStart(self):
-        if not self.values:
+        if not self.count():
             return True
 
         previous = self.values[-1]
@@ -74,33 +112,34 @@ class Reader(object):
         ):
             regex = False
         elif previous == ')':
-            keyword = self.values[self.paren - 1]
+            keyword = self.value(self.paren - 1)
             regex = keyword in ('if', 'while', 'for', 'with')
 
         elif previous == '}':
             # Dividing a function by anything makes little sense,
             # but we have to check for that.
             regex = True
-            if len(self.values) >= 3 and self.values[self.curly - 3] == 'function':
+            if self.count() >= 3 and self.value(self.curly - 3) == 'function':
                 # Anonymous function, e.g. function(){} /42
-                check = self.values[self.curly - 4]
+                check = self.value(self.curly - 4)
                 regex = not self.beforeFunctionExpression(check) if check else False
-            elif len(self.values) >= 4 and self.values[self.curly - 4] == 'function':
+            elif self.count() >= 4 and self.value(self.curly - 4) == 'function':
                 # Named function, e.g. function f(){} /42/
-                check = self.values[self.curly - 5]
+                check = self.value(self.curly - 5)
                 regex = not self.beforeFunctionExpression(check) if check else True
 
         return regex
 
     def append(self, token):
-        if token.type in (Token.Punctuator, Token.Keyword):
-            if token.value == '{':
-                self.curly = len(self.values)
-            elif token.value == '(':
-                self.paren = len(self.values)
-            self.values.append(token.value)
-        else:
-            self.values.append(None)
+        self.push(token.value if token.type in (Token.Punctuator, Token.Keyword) else None)
+
+    # The value of a punctuator or keyword, None for any other token.
+    def push(self, value):
+        if value == '{':
+            self.curly = self.count()
+        elif value == '(':
+            self.paren = self.count()
+        self.values.append(value)
 
 
 class Config(Object):
@@ -191,3 +230,273 @@ class Tokenizer(object):
                 self.buffer.append(entry)
 
         return self.buffer.popleft() if self.buffer else None
+
+
+class Block(Object):
+    """Tokens scanned from a checkpoint. Positions of the entries are kept
+    relative to the checkpoint, so that an edit before the block only has
+    to move the block itself."""
+
+    def __init__(self, index, lineNumber, lineStart, curlyStack, reader):
+        self.index = index
+        self.lineNumber = lineNumber
+        self.lineStart = lineStart
+        self.curlyStack = curlyStack
+        self.reader = reader
+        self.entries = []
+
+
+class TokenStream(object):
+    """The tokens of a source, kept up to date through edits.
+
+    The scanner state is checkpointed every `interval` tokens. After an
+    edit, tokenizing resumes from the last checkpoint before the edited
+    line and stops as soon as it reaches an old checkpoint in the same
+    state, the tokens after it being reused.
+
+    The blocks after it are moved lazily: those from `pending` on are still
+    to be moved by `delta` characters and `lineDelta` lines, those before
+    `sameLine` having their first line start at `lineStart`. They are moved
+    when reached, so that, the copy of the source made by the scanner
+    aside, an edit only costs the blocks around it."""
+
+    def __init__(self, code, options=None, interval=64, **kwargs):
+        options = {} if options is None else options.copy()
+        options.update(kwargs)
+
+        self.options = options
+        self.config = Config(**options)
+        self.interval = interval
+        self.source = code
+
+        self.blocks = []
+        self.pending = self.sameLine = 0
+        self.delta = self.lineDelta = 0
+        self.lineStart = None
+        self.blocks, _ = self.lex(code, self.begin(code), 0)
+        self.pending = self.sameLine = len(self.blocks)
+
+    def __iter__(self):
+        self.settle(len(self.blocks))
+        for block in self.blocks:
+            for record in block.entries:
+                yield self.entry(block, record)
+
+    def between(self, start, end):
+        """The tokens (and comments) overlapping `start`...`end`."""
+        blocks = self.blocks
+        i = max(0, self.bisect(start) - 1)
+        while i < len(blocks):
+            self.settle(i + 1)
+            block = blocks[i]
+            if block.index >= end:
+                break
+            for record in block.entries:
+                if block.index + record[3] >= end:
+                    break
+                if block.index + record[4] > start:
+                    yield self.entry(block, record)
+            i += 1
+
+    def bisect(self, index):
+        """The number of blocks starting at or before `index`, as bisect()
+        on their indexes."""
+        blocks = self.blocks
+        low, high = 0, len(blocks)
+        while low < high:
+            middle = (low + high) // 2
+            start = blocks[middle].index
+            if middle >= self.pending:
+                start += self.delta
+            if index < start:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def settle(self, end):
+        """Moves the blocks before `end` which are still to be moved."""
+        blocks = self.blocks
+        for i in xrange(self.pending, min(end, len(blocks))):
+            block = blocks[i]
+            block.index += self.delta
+            block.lineNumber += self.lineDelta
+            if i < self.sameLine:
+                block.lineStart = self.lineStart
+            else:
+                block.lineStart += self.delta
+            self.pending = i + 1
+        self.sameLine = max(self.sameLine, self.pending)
+        if self.pending == len(blocks):
+            self.delta = self.lineDelta = 0
+
+    def begin(self, code):
+        scanner = Scanner(code, None)
+        return Block(scanner.index, scanner.lineNumber, scanner.lineStart, [], Reader())
+
+    def entry(self, block, record):
+        type, value, regex, start, end, startLine, startLineStart, endLine, endLineStart = record
+        start += block.index
+        end += block.index
+        entry = BufferEntry(type=type, value=value, regex=regex)
+        if self.config.range:
+            entry.range = [start, end]
+        if self.config.loc:
+            startLineStart = block.lineStart if startLineStart is None else block.index + startLineStart
+            endLineStart = block.lineStart if endLineStart is None else block.index + endLineStart
+            entry.loc = SourceLocation(
+                start=Position(line=block.lineNumber + startLine, column=start - startLineStart),
+                end=Position(line=block.lineNumber + endLine, column=end - endLineStart),
+            )
+        return entry
+
+    def record(self, block, entry):
+        start, end = entry.range
+        startLine = entry.loc.start.line - block.lineNumber
+        endLine = entry.loc.end.line - block.lineNumber
+        return (
+            entry.type, entry.value, entry.regex,
+            start - block.index, end - block.index,
+            startLine, start - entry.loc.start.column - block.index if startLine else None,
+            endLine, end - entry.loc.end.column - block.index if endLine else None,
+        )
+
+    def lex(self, code, start, first, delta=0, limit=0):
+        """Tokenizes `code` from the checkpoint `start`, until the end or
+        until reaching one of the blocks from `first` on, moved by `delta`,
+        in the same state. Only blocks at or after `limit` (before moving)
+        are considered. Returns the new blocks and the position of the
+        reached block, if any."""
+
+        tokenizer = Tokenizer(code, dict(self.options, range=True, loc=True))
+        scanner = tokenizer.scanner
+        scanner.index = start.index
+        scanner.lineNumber = start.lineNumber
+        scanner.lineStart = start.lineStart
+        scanner.curlyStack = list(start.curlyStack)
+        tokenizer.reader = start.reader.copy()
+
+        blocks = self.blocks
+        position = max(first, self.bisect(limit - 1))
+
+        lexed = [Block(start.index, start.lineNumber, start.lineStart, start.curlyStack, start.reader)]
+        while True:
+            while position < len(blocks):
+                self.settle(position + 1)
+                if blocks[position].index + delta >= scanner.index:
+                    break
+                position += 1
+            reached = blocks[position] if position < len(blocks) else None
+            if (
+                reached is not None and
+                reached.index + delta == scanner.index and
+                reached.curlyStack == scanner.curlyStack and
+                reached.reader.key() == tokenizer.reader.key()
+            ):
+                self.move(position, delta, scanner)
+                return lexed, position
+
+            block = lexed[-1]
+            if len(block.entries) >= self.interval:
+                block = Block(
+                    scanner.index, scanner.lineNumber, scanner.lineStart,
+                    list(scanner.curlyStack), tokenizer.reader.copy()
+                )
+                lexed.append(block)
+
+            try:
+                entry = tokenizer.getNextToken()
+            except Error as e:
+                tokenizer.errorHandler.tolerate(e)
+                entry = None
+            if not entry:
+                return lexed, None
+            block.entries.append(self.record(block, entry))
+            while tokenizer.buffer:
+                block.entries.append(self.record(block, tokenizer.buffer.popleft()))
+
+    def move(self, position, delta, scanner):
+        """Moves the blocks from `position` on, the first of them found by
+        the scanner in the same state. Those still to be moved are moved
+        with them later."""
+        blocks = self.blocks
+        reached = blocks[position]
+        index = reached.index
+        lineDelta = scanner.lineNumber - reached.lineNumber
+        if not self.delta and not self.lineDelta and self.sameLine == self.pending:
+            # Nothing else to move.
+            self.pending = self.sameLine = position + 1
+        # Only the first line of a block can start before it, on the line
+        # where `reached` is.
+        for block in blocks[position:self.pending]:
+            block.index += delta
+            block.lineNumber += lineDelta
+            if block.lineStart >= index:
+                block.lineStart += delta
+            else:
+                block.lineStart = scanner.lineStart
+
+        # Lines start in the order of the blocks: those on the line where
+        # `reached` is come first.
+        if self.pending < self.sameLine and self.lineStart >= index:
+            self.lineStart += delta
+        else:
+            low, high = max(self.pending, self.sameLine), len(blocks)
+            while low < high:
+                middle = (low + high) // 2
+                if blocks[middle].lineStart + self.delta < index:
+                    low = middle + 1
+                else:
+                    high = middle
+            self.sameLine = low
+            self.lineStart = scanner.lineStart
+        self.delta += delta
+        self.lineDelta += lineDelta
+
+    def update(self, code, edit):
+        """Updates the tokens for `code`, which is the previous source
+        with `edit` applied: a (start, oldEnd, newEnd) triple, as for
+        reparse(). Returns the range of `code` that was tokenized again."""
+
+        start, oldEnd, newEnd = edit
+        delta = newEnd - oldEnd
+        if not (0 <= start <= oldEnd <= len(self.source) and start <= newEnd) or len(code) != len(self.source) + delta:
+            raise ValueError('Inconsistent edit')
+
+        blocks = self.blocks
+        first = max(0, self.bisect(start - 2) - 1)
+        self.settle(first + 1)
+
+        # Failed regular expressions are rescanned as slashes, after
+        # reading up to the end of their line: resume before any of them
+        # on the edited line.
+        lineStart = blocks[first].lineStart
+        lineStart = max([lineStart] + [self.source.rfind(c, lineStart, start) + 1 for c in '\n\r\u2028\u2029'])
+        for i in range(first, 0, -1):
+            block = blocks[i - 1]
+            if any(
+                record[0] == 'Punctuator' and record[1] in ('/', '/=') and block.index + record[3] >= lineStart
+                for record in block.entries
+            ):
+                first = i - 1
+            elif block.index < lineStart:
+                break
+
+        index = blocks[first].index
+        # The first line number depends on the source being empty or not.
+        begin = self.begin(code) if first == 0 else blocks[first]
+        lexed, reached = self.lex(code, begin, first + 1, delta, oldEnd)
+        if reached is None:
+            blocks[first:] = lexed
+            self.pending = self.sameLine = len(blocks)
+            self.delta = self.lineDelta = 0
+            end = len(code)
+        else:
+            end = blocks[reached].index
+            blocks[first:reached] = lexed
+            offset = len(lexed) - (reached - first)
+            self.pending += offset
+            self.sameLine += offset
+        self.source = code
+
+        return index, end
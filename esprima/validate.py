@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, unicode_literals
+
+from .error_handler import Error
+from .jsx_parser import JSXParser
+from .parser import Marker, Parser
+from .token import Token
+
+# Markers only carry positions to finalize, which ignores them here.
+MARKER = Marker(0, 0, 0)
+
+
+class Validating(object):
+    """Parser mixin running the grammar and its early errors without
+    building a tree: markers are shared, finalize leaves nodes bare and
+    the statements of programs and function bodies are dropped once
+    parsed."""
+
+    def createNode(self):
+        return MARKER
+
+    def startNode(self, token, lastLineStart=0):
+        return MARKER
+
+    def finalize(self, marker, node):
+        return node
+
+    def parseProgram(self):
+        self.parseDirectivePrologues()
+        while self.lookahead.type is not Token.EOF:
+            self.parseStatementListItem()
+
+    def parseModule(self):
+        self.context.strict = True
+        self.context.isModule = True
+        self.scanner.isModule = True
+        self.parseProgram()
+
+    def parseScript(self):
+        self.parseProgram()
+
+    def parseFunctionSourceElements(self):
+        self.expect('{')
+        self.parseDirectivePrologues()
+
+        previousLabelSet = self.context.labelSet
+        previousInIteration = self.context.inIteration
+        previousInSwitch = self.context.inSwitch
+        previousInFunctionBody = self.context.inFunctionBody
+
+        self.context.labelSet = {}
+        self.context.inIteration = False
+        self.context.inSwitch = False
+        self.context.inFunctionBody = True
+
+        while self.lookahead.type is not Token.EOF:
+            if self.match('}'):
+                break
+            self.parseStatementListItem()
+
+        self.expect('}')
+
+        self.context.labelSet = previousLabelSet
+        self.context.inIteration = previousInIteration
+        self.context.inSwitch = previousInSwitch
+        self.context.inFunctionBody = previousInFunctionBody
+
+        return self.nodes.BlockStatement([])
+
+
+class ValidatingParser(Validating, Parser):
+    pass
+
+
+class ValidatingJSXParser(Validating, JSXParser):
+    def createJSXNode(self):
+        self.collectComments()
+        return MARKER
+
+    def createJSXChildNode(self):
+        return MARKER
+
+
+def moduleErrors(code, options):
+    """The errors of `code` parsed as a module, as in `validate`, if it has a
+    top-level import or export declaration and is parsed through; None
+    otherwise. Sources of type 'unambiguous' failing as scripts before their
+    first import or export are told apart this way."""
+
+    options = dict(options, range=False, loc=False, tokens=False, comment=False)
+    Validator = ValidatingJSXParser if options.get('jsx', False) else ValidatingParser
+    try:
+        parser = Validator(code, options=options, delegate=None)
+        parser.context.strict = True
+        parser.context.isModule = True
+        parser.scanner.isModule = True
+        parser.parseDirectivePrologues()
+        module = False
+        while parser.lookahead.type is not Token.EOF:
+            if parser.matchKeyword('export') or parser.matchKeyword('import') and not parser.matchImportCall():
+                module = True
+            parser.parseStatementListItem()
+    except Error:
+        return None
+    return parser.errorHandler.errors if module else None
+
+
+def validate(code, options=None, **kwargs):
+    """Check the syntax of `code` and return the errors found, as in the
+    `errors` of a tolerant parse; the list is empty when the program is valid.
+    Only the first error is reported unless the `tolerant` option is set."""
+
+    options = {} if options is None else options.copy()
+    options.update(kwargs)
+    for name in ('range', 'loc', 'tokens', 'comment', 'attachComment'):
+        options.pop(name, None)
+
+    if options.get('esnext', False):
+        options['jsx'] = True
+        options['classProperties'] = True
+
+    Validator = ValidatingJSXParser if options.get('jsx', False) else ValidatingParser
+    sourceType = options.get('sourceType', 'script')
+
+    errors = []
+    try:
+        # The first token is read, and may fail, in the constructor.
+        parser = Validator(code, options=options, delegate=None)
+        errors = parser.errorHandler.errors
+        if sourceType == 'module':
+            parser.parseModule()
+        elif sourceType == 'unambiguous':
+            try:
+                parser.parseUnambiguous()
+            except Error as error:
+                found = moduleErrors(code, options)
+                if found is None:
+                    raise error
+                errors[:] = found
+        else:
+            parser.parseScript()
+    except Error as e:
+        errors.append(e.toDict())
+
+    return errors
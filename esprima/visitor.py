@@ -29,6 +29,8 @@ from collections import deque
 
 from .objects import Object
 from .compat import PY3, unicode
+from .lines import spanItems
+from .scanner import cookLiteral
 
 
 class VisitRecursionError(Exception):
@@ -142,6 +144,8 @@ class Visitor(object):
         yield Visited(obj)
 
     visit_Array = visit_list
+    visit_FrozenArray = visit_list
+    visit_SharedArray = visit_list
 
     def visit_dict(self, obj):
         for field, value in list(obj.items()):
@@ -202,14 +206,18 @@ class ReprVisitor(Visitor):
         yield Visited(value_repr)
 
     visit_Array = visit_list
+    visit_FrozenArray = visit_list
+    visit_SharedArray = visit_list
 
     def visit_dict(self, obj):
+        if '_cook' in obj:
+            cookLiteral(obj)
         indent1 = self.indent * self.level
         indent2 = indent1 + self.indent
         self.level += 1
         try:
             items = []
-            for k, item in obj.items():
+            for k, item in (spanItems(obj) if '_span' in obj else obj.items()):
                 if item is not None and not k.startswith('_') and k not in self.skip:
                     v = yield item
                     items.append("%s: %s" % (k, v))
@@ -274,10 +282,14 @@ class ToDictVisitor(Visitor):
         yield Visited(items)
 
     visit_Array = visit_list
+    visit_FrozenArray = visit_list
+    visit_SharedArray = visit_list
 
     def visit_dict(self, obj):
+        if '_cook' in obj:
+            cookLiteral(obj)
         items = []
-        for k, item in obj.items():
+        for k, item in (spanItems(obj) if '_span' in obj else obj.items()):
             if item is not None and not k.startswith('_'):
                 v = yield item
                 k = unicode(k)
@@ -23,15 +23,23 @@
 
 from __future__ import absolute_import
 
+import io
 import os
 import re
 import json
 import glob
+import shutil
 import fnmatch
+import tempfile
 import unittest
 
-from esprima import parse, tokenize, Error, toDict
-from esprima.nodes import Script
+from esprima import BodyCache, ParseCache, LineIndex, parse, reparse, serialize, deserialize, shareTree, attachTree, fromDict, load, tokenize, TokenStream, skeleton, Span, extractDependencies, structuralHash, findDuplicates, validate, Error, toDict
+from esprima.factory import NodeFactory
+from esprima.nodes import Identifier, Script
+from esprima.parser import Parser
+from esprima import graph, parallel
+from esprima.profiler import Profiler
+from esprima import lines
 
 BASE_DIR = os.path.dirname(__file__)
 
@@ -197,6 +205,728 @@ class TestEsprima(unittest.TestCase):
         self.assertIsInstance(r, Script)
 
 
+class TestNodeFactory(unittest.TestCase):
+    def test_factory(self):
+        class TaggedIdentifier(Identifier):
+            pass
+
+        class Factory(NodeFactory):
+            def Identifier(self, name):
+                return TaggedIdentifier(name)
+
+        code = 'var a = function (b, ...c) { return b + c; }; <d e={f} />;'
+        ast = parse(code, jsx=True, range=True, nodeFactory=Factory())
+        self.assertIsInstance(ast.body[0].declarations[0].id, TaggedIdentifier)
+        self.assertIsInstance(ast.body[0].declarations[0].init.params[1].argument, TaggedIdentifier)
+        self.assertEqual(ast.toDict(), parse(code, jsx=True, range=True).toDict())
+
+
+class TestTrusted(unittest.TestCase):
+    def test_parity(self):
+        code = (
+            '"use strict";\n'
+            'function f(a, [b, {c}], d = /x+/g, ...e) { return a++ + --b; }\n'
+            'var g = (h, {i = 1}) => h, j = async function k(l) {};\n'
+            'try { g = 1; } catch (m) { for (let n in m) {} }\n'
+        )
+        options = {'range': True, 'loc': True, 'tokens': True}
+        expected = parse(code, options)
+        trusted = parse(code, options, trusted=True)
+        # Regular expressions are compiled when read.
+        regex = trusted.body[1].params[2].right
+        self.assertNotIn('value', regex.__dict__)
+        self.assertEqual(trusted.toDict(), expected.toDict())
+        self.assertEqual(list(regex.__dict__)[:3], ['type', 'value', 'raw'])
+
+    def test_skipped(self):
+        for code in ('"use strict"; function eval(a, a) {}', '"use strict"; arguments = 1; var eval;', '/(/'):
+            self.assertRaises(Error, parse, code)
+            parse(code, trusted=True)
+
+
+class TestUnambiguous(unittest.TestCase):
+    def test_source_type(self):
+        options = {'sourceType': 'unambiguous', 'range': True, 'tokens': True}
+        for code, sourceType in (
+            ('var a = import("b"); let c;', 'script'),
+            ('var a = {let: 1}, b;\nimport c from "d"; export {a};', 'module'),
+            ('export default function () {}', 'module'),
+        ):
+            ast = parse(code, options)
+            self.assertEqual(ast.sourceType, sourceType)
+            self.assertEqual(ast.toDict(), parse(code, options, sourceType=sourceType).toDict())
+
+    def test_checked(self):
+        for code in (
+            'var a = 010; import b from "c";',
+            'with (a) {}\nexport {}',
+            'var await; export {}',
+            'var a;\nfunction f(b, b) {}\nvar c;\nexport {c}',
+        ):
+            with self.assertRaises(Error) as expected:
+                parse(code, sourceType='module')
+            with self.assertRaises(Error) as raised:
+                parse(code, sourceType='unambiguous')
+            self.assertEqual(raised.exception.toDict(), expected.exception.toDict())
+
+    def test_tolerated(self):
+        for code in (
+            'let x\n00\nimport a from "b";',
+            'var a;\nwith (a) {}\nimport b from "c";',
+            'function a(package) { "use strict"; }\nimport b from "c";',
+            'a: function* g() {}\nvar b = 010, c = 010;\nexport {b};',
+            '"\\01"; "use strict";\nexport {}',
+        ):
+            expected = parse(code, sourceType='module', tolerant=True)
+            ast = parse(code, sourceType='unambiguous', tolerant=True)
+            self.assertEqual(ast.errors, expected.errors)
+            self.assertEqual(ast.toDict(), expected.toDict())
+            self.assertEqual(validate(code, sourceType='unambiguous', tolerant=True), expected.errors)
+        self.assertRaises(Error, parse, 'function a(package) { "use strict"; }', sourceType='unambiguous', tolerant=True)
+
+
+class TestBodyCache(unittest.TestCase):
+    function = (
+        "function f(a, b) {\n"
+        "  'use strict';\n"
+        "  var c = `${a}\n${b}`, d = /x/g;\n"
+        "  return function () { return [c, d]; };\n"
+        "}\n"
+    )
+
+    def test_relocated(self):
+        cache = BodyCache(minLength=16)
+        options = {'range': True, 'loc': True}
+        for code in (
+            self.function,
+            'var e;\n' + self.function,
+            'var e;  (' + self.function + ');',
+            '\n\n' + self.function + self.function,
+        ):
+            self.assertEqual(parse(code, options, bodyCache=cache).toDict(), parse(code, options).toDict())
+        # Both bodies are kept from their second parse. The function in
+        # parentheses is parsed with other cover grammar flags.
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (3, 5))
+        self.assertEqual(cache.hitRate(), 0.375)
+
+    def test_copies(self):
+        cache = BodyCache(minLength=16)
+        for i in range(3):
+            tree = parse(self.function, range=True, bodyCache=cache)
+            declarations = tree.body[0].body.body[1].declarations
+            self.assertEqual(declarations[0].init.quasis[0].value.cooked, '')
+            self.assertEqual(declarations[1].init.regex.pattern, 'x')
+            # Changing a copy leaves the cached body alone.
+            declarations[0].init.quasis[0].value.cooked = 'y'
+            declarations[1].init.regex.pattern = 'z'
+        self.assertEqual(cache.hits, 1)
+
+    def test_skewed(self):
+        # The start of the binary expression is counted from the line after
+        # the string (see Parser.startNode), moving with the offsets.
+        function = 'function f() {\n  var q = 1, r = 2;\n  return "a\\\nbbbbbbbbbbbbbbbb" + q + r;\n}'
+        cache = BodyCache(minLength=16)
+        options = {'range': True, 'loc': True}
+        for code in (function, 'var ' + 'z' * 40 + ' = 1;' + function, 'x;\n\n\n    ' + function, '/*' + 'y' * 50 + '*/' + function):
+            self.assertEqual(parse(code, options, bodyCache=cache).toDict(), parse(code, options).toDict())
+        self.assertEqual(cache.hits, 2)
+
+    def test_context(self):
+        cache = BodyCache(minLength=0)
+        parse('function f() { var yield = 1; }', bodyCache=cache)
+        parse('function f() { var yield = 1; }', bodyCache=cache)
+        self.assertRaises(Error, parse, 'function* f() { var yield = 1; }', bodyCache=cache)
+        self.assertRaises(Error, parse, '"use strict"; function f() { var yield = 1; }', bodyCache=cache)
+        self.assertEqual(cache.hits, 0)
+
+
+class TestParseCache(unittest.TestCase):
+    def test_copies(self):
+        cache = ParseCache(maxsize=2)
+        code = 'f(a, `b${c}`, /d/g)'
+        first = cache.parse(code, range=True)
+        first.body[0].expression.arguments.pop()
+        second = cache.parse(code, {'range': 1, 'sourceType': 'script'})
+        self.assertEqual(toDict(second), toDict(parse(code, range=True)))
+        cache.parse('a')
+        cache.parse('b')
+        self.assertEqual((cache.hits, cache.misses, cache.evictions, len(cache)), (1, 3, 1, 2))
+
+    def test_frozen(self):
+        cache = ParseCache(frozen=True)
+        tree = cache.parse('a = [b]', loc=True)
+        self.assertIs(cache.parse('a = [b]', loc=True), tree)
+        self.assertEqual(toDict(tree), toDict(parse('a = [b]', loc=True)))
+        expression = tree.body[0].expression
+        self.assertRaises(AttributeError, setattr, expression.left, 'name', 'c')
+        self.assertRaises(AttributeError, setattr, expression.left.loc.start, 'line', 2)
+        self.assertRaises(TypeError, expression.right.elements.append, None)
+
+    def test_errors(self):
+        cache = ParseCache()
+        for i in range(2):
+            tree = cache.parse('a = (1 = 2)', tolerant=True)
+            self.assertEqual(len(tree.errors), 1)
+        cache.parse('a', tolerant=True)
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 3, 1))
+
+    def test_maxbytes(self):
+        cache = ParseCache(maxbytes=4096)
+        for i in range(20):
+            cache.parse('var a%d = b + c;' % i)
+        self.assertTrue(0 < cache.size <= 4096)
+        self.assertEqual(len(cache) + cache.evictions, 20)
+
+
+class TestSerialize(unittest.TestCase):
+    def dump(self, tree):
+        return json.dumps(toDict(tree), default=lambda o: {'source': o.pattern})
+
+    def test_roundtrip(self):
+        code = '/* a */ var a = [1.5, -0, 1e400, "b\\ud800", /c/giu, null, true, `d${e}`]; // f'
+        tree = parse(code, range=True, loc=True, tokens=True, comment=True)
+        copy = deserialize(serialize(tree))
+        self.assertEqual(self.dump(copy), self.dump(tree))
+        self.assertIs(type(copy.body[0]), type(tree.body[0]))
+        self.assertEqual(copy.body[0].declarations[0].init.elements[4].value.flags, re.I | re.U)
+
+    def test_sections(self):
+        tree = parse('a // b', range=True, loc=True, tokens=True, comment=True)
+        copy = deserialize(serialize(tree, range=False, loc=False, tokens=False))
+        self.assertEqual(self.dump(copy), self.dump(parse('a // b', comment=True)))
+        self.assertRaises(ValueError, serialize, [object()])
+        self.assertRaises(ValueError, deserialize, b'{"type": "Program"}')
+
+
+class TestLineIndex(unittest.TestCase):
+    code = 'a\r\nbc\rd\u2028\ne\n'
+
+    def test_positions(self):
+        index = LineIndex(self.code)
+        self.assertEqual(index.starts, [0, 3, 6, 8, 9, 11])
+        self.assertEqual(index.position(4), (2, 1))
+        self.assertEqual(index.offset(2, 1), 4)
+        lines, columns = index.positions([0, 2, 6, 10])
+        self.assertEqual((lines, columns), ([1, 1, 3, 5], [0, 2, 0, 1]))
+        self.assertEqual(index.offsets(lines, columns), [0, 2, 6, 10])
+
+    @unittest.skipIf(lines.numpy is None, "NumPy is not installed")
+    def test_numpy(self):
+        index = LineIndex(self.code, useNumpy=True)
+        self.assertEqual(index.starts, LineIndex(self.code).starts)
+        offsets = lines.numpy.array([0, 2, 6, 10])
+        self.assertEqual(index.positions(offsets)[1].tolist(), [0, 2, 0, 1])
+
+    def test_lazy(self):
+        code = '/* a */ var b = `c\n${d}`;\r\n  e(f) // g'
+        options = {'range': True, 'tokens': True, 'comment': True, 'source': 'h.js'}
+        tree = parse(code, options, loc='lazy')
+        self.assertNotIn('loc', toDict(tree))
+        self.assertEqual(toDict(tree), toDict(parse(code, options)))
+        eager = parse(code, options, loc=True)
+        for node, other in ((tree, eager), (tree.body[1].expression.arguments[0], eager.body[1].expression.arguments[0]),
+                            (tree.tokens[6], eager.tokens[6]), (tree.comments[1], eager.comments[1])):
+            self.assertEqual(toDict(node.loc), toDict(other.loc))
+
+    def test_skewed(self):
+        # Binary expressions after strings and templates spanning lines
+        # start at a column the parser does not count from their range.
+        code = 'var y;\n  "abcdef\\\nb" + c;\na = `x\n` + \n b * `\ny` - c;'
+        tree = parse(code, range=True, loc='lazy')
+        eager = parse(code, range=True, loc=True)
+        for node, other in ((tree.body[1].expression, eager.body[1].expression),
+                            (tree.body[2].expression.right, eager.body[2].expression.right),
+                            (tree.body[2].expression.right.left, eager.body[2].expression.right.left)):
+            self.assertEqual(toDict(node.loc), toDict(other.loc))
+        self.assertEqual(eager.body[1].expression.loc.start.column, 9)
+
+
+class TestCompact(unittest.TestCase):
+    code = '/* a */ var b = `c\n${d}`;\r\n  e(f) // g'
+    options = {'range': True, 'loc': True, 'tokens': True, 'comment': True, 'source': 'h.js'}
+
+    def test_toDict(self):
+        eager = parse(self.code, self.options)
+        for compact in (True, 'uncached'):
+            tree = parse(self.code, self.options, compact=compact)
+            self.assertNotIn('range', tree.body[0].__dict__)
+            self.assertEqual(json.dumps(toDict(tree), default=repr), json.dumps(toDict(eager), default=repr))
+            self.assertEqual(repr(tree), repr(eager))
+            self.assertEqual(toDict(deserialize(serialize(tree))), toDict(eager))
+
+    def test_cache(self):
+        tree = parse(self.code, self.options, compact=True)
+        call = tree.body[1].expression
+        self.assertIs(call.loc, call.loc)
+        call.range[0] = 0
+        self.assertEqual(toDict(call)['range'], [0, 33])
+        tree = parse(self.code, self.options, compact='uncached')
+        call = tree.body[1].expression
+        self.assertEqual(toDict(call.loc), {'start': {'line': 3, 'column': 2}, 'end': {'line': 3, 'column': 6}, 'source': 'h.js'})
+        self.assertIsNot(call.loc, call.loc)
+        self.assertNotIn('loc', call.__dict__)
+
+
+class TestLazyValues(unittest.TestCase):
+    code = "a = {'b\\n': 'c\\u{1F600}\\x41', d: 'e'}; f('\\g\\0', \"h\\\\\")"
+
+    def test_values(self):
+        eager = parse(self.code)
+        tree = parse(self.code, lazyValues=True)
+        literal = tree.body[0].expression.right.properties[0].value
+        self.assertNotIn('value', literal.__dict__)
+        self.assertEqual(literal.value, 'c\U0001F600A')
+        self.assertEqual(list(literal.__dict__), ['type', 'value', 'raw'])
+        self.assertEqual(json.dumps(toDict(tree)), json.dumps(toDict(eager)))
+        self.assertEqual(tree.body[1].expression.arguments[1].value, 'h\\')
+
+
+class TestHashes(unittest.TestCase):
+    def test_hashes(self):
+        code = "function f(a) { return a + 1; }\n/* g */ function g(b) {\n  return b + 1;\n}\n[c, {d = 2}] = e; c(a + 1);"
+        tree = parse(code, range=True, loc=True, attachComment=True, hashes=True)
+        f, g, assignment, call = tree.body
+        self.assertEqual(structuralHash(f.body.body[0].argument), structuralHash(call.expression.arguments[0]))
+        self.assertNotEqual(structuralHash(f), structuralHash(g))
+        self.assertEqual(structuralHash(f, names=False), structuralHash(g, names=False))
+        # Those computed while parsing, the reinterpreted patterns included.
+        plain = parse(code)
+        self.assertEqual(structuralHash(assignment), structuralHash(plain.body[2]))
+        self.assertEqual(structuralHash(tree), structuralHash(plain))
+        anonymous = parse(code, hashes='anonymous')
+        self.assertEqual(structuralHash(anonymous, names=False), structuralHash(plain, names=False))
+
+    def test_surrogates(self):
+        # Lone surrogates, from escapes, in the values and raw strings.
+        tree = parse("x = '\\uD800'; y = '\uDC00'", hashes=True)
+        self.assertEqual(tree.body[0].expression.right.value, '\uD800')
+        self.assertNotEqual(structuralHash(tree.body[0]), structuralHash(tree.body[1]))
+        self.assertEqual(structuralHash(tree), structuralHash(parse("x = '\\uD800'; y = '\uDC00'")))
+
+    def test_duplicates(self):
+        root = tempfile.mkdtemp()
+        try:
+            for path, code in (('a.js', 'function f(a) { if (a) { return [a, 1]; } }'), ('b.js', 'var g = function (b) { if (b) { return [b, 1]; } };')):
+                with open(os.path.join(root, path), 'w') as f:
+                    f.write(code)
+            self.assertEqual(findDuplicates(root, minLength=10).groups, [])
+            groups = findDuplicates(root, names=False, minLength=10).groups
+            self.assertEqual([group.type for group in groups], ['BlockStatement'])
+            self.assertEqual([(occurrence.path, occurrence.range) for occurrence in groups[0].occurrences], [('a.js', [14, 43]), ('b.js', [21, 50])])
+            # A file failing otherwise than with a syntax error does not stop the others.
+            with open(os.path.join(root, 'c.js'), 'w') as f:
+                f.write('[' * 3000 + ']' * 3000)
+            duplicates = findDuplicates(root, names=False, minLength=10)
+            self.assertEqual(len(duplicates.groups), 1)
+            self.assertEqual(list(duplicates.errors), ['c.js'])
+        finally:
+            shutil.rmtree(root)
+
+
+class TestShared(unittest.TestCase):
+    def test_lazy(self):
+        code = "'use strict'; var a = /b/g; function c() { return a; } // d"
+        tree = parse(code, range=True, loc=True, tokens=True, comment=True)
+        shared = shareTree(tree)
+        copy = attachTree(shared)
+        self.assertFalse(os.path.exists(shared.path))
+        self.assertEqual(copy.body.pending, 3)
+        self.assertEqual(copy.body[-1].id.name, 'c')
+        self.assertEqual(copy.body.pending, 2)
+        self.assertEqual(json.dumps(toDict(copy), default=repr), json.dumps(toDict(tree), default=repr))
+        self.assertIsNone(copy.body.spans)
+
+    def test_changes(self):
+        copy = attachTree(shareTree(parse('a; b; c')))
+        copy.body.insert(0, copy.body[2])
+        self.assertEqual([statement.expression.name for statement in copy.body], ['c', 'a', 'b', 'c'])
+        copy = attachTree(shareTree(parse('a; b')))
+        self.assertEqual([statement.expression.name for statement in reversed(copy.body)], ['b', 'a'])
+        copy = attachTree(shareTree(parse('a; c; b')))
+        copy.body.sort(key=lambda statement: statement.expression.name, reverse=True)
+        self.assertEqual([statement.expression.name for statement in copy.body], ['c', 'b', 'a'])
+
+
+class TestLoad(unittest.TestCase):
+    def test_classes(self):
+        code = '"use strict"; async function f() { a[b] = c.d || /e/i; }'
+        tree = parse(code, range=True, loc=True, tokens=True, comment=True)
+        data = toDict(tree)
+        copy = fromDict(data)
+        self.assertEqual(toDict(copy), data)
+        self.assertIsInstance(data['body'][0], dict)
+        function = copy.body[1]
+        self.assertEqual([type(node).__name__ for node in (copy, copy.body[0], function)], ['Script', 'Directive', 'AsyncFunctionDeclaration'])
+        self.assertIs(function.isAsync, True)
+        assignment = function.body.body[0].expression
+        self.assertEqual(type(assignment.left).__name__, 'ComputedMemberExpression')
+        self.assertEqual(type(assignment.right).__name__, 'BinaryExpression')
+        self.assertEqual(assignment.right.right.value.flags & re.I, re.I)
+        self.assertEqual(copy.loc.end.column, tree.loc.end.column)
+        self.assertEqual(type(copy.tokens[1]).__name__, 'TokenEntry')
+
+    def test_load(self):
+        tree = parse('<a b={c}>d</a>', jsx=True, range=True)
+        copy = load(io.StringIO(json.dumps(toDict(tree))))
+        self.assertEqual(toDict(copy), toDict(tree))
+        self.assertEqual(type(copy.body[0].expression.children[0]).__name__, 'JSXText')
+        unknown = fromDict({'type': 'ChainExpression', 'expression': {'type': 'Identifier', 'name': 'a'}})
+        self.assertEqual((unknown.type, unknown.expression.name), ('ChainExpression', 'a'))
+
+
+class TestProfiler(unittest.TestCase):
+    def test_profile(self):
+        profiler = Profiler()
+        parseStatement = Parser.__dict__['parseStatement']
+        code = 'let a = async function () { return <div>{(1 + 2)}</div>; };'
+        expected = toDict(parse(code, jsx=True))
+        actual = toDict(profiler.profile(code, jsx=True))
+        self.assertEqual(expected, actual)
+        self.assertIs(parseStatement, Parser.__dict__['parseStatement'])
+
+        for name in ('<parse>', 'parseStatementListItem', 'parseGroupExpression', 'parseJSXElement', 'lex', 'scanPunctuator'):
+            self.assertIn(name, profiler.stats)
+        self.assertEqual(profiler.stats['<parse>'].calls, 1)
+        root = profiler.stats['<parse>'].cumulative
+        self.assertAlmostEqual(root, sum(profiler.stacks.values()), places=6)
+
+        out = io.StringIO()
+        profiler.collapsed(out)
+        for line in out.getvalue().splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('<parse>'))
+            self.assertTrue(int(count) > 0)
+
+
+class TestReparse(unittest.TestCase):
+    code = (
+        "'use strict';\n"
+        "var a = 1\n"
+        "(function outer() {\n"
+        "  var b = 2;\n"
+        "  function inner(c) { return c + b; }\n"
+        "  return `${b}\n${inner(a)}`;\n"
+        "})();\n"
+        "a = a + 1;\n"
+    )
+
+    def check(self, old, position, removed, inserted, options):
+        new = old[:position] + inserted + old[position + removed:]
+        tree = parse(old, options)
+        edit = (position, position + removed, position + len(inserted))
+        self.assertEqual(toDict(parse(new, options)), toDict(reparse(tree, old, new, edit, options)))
+        return new
+
+    def test_edits(self):
+        for options in ({'range': True}, {'range': True, 'loc': True, 'tokens': True}):
+            code = self.code
+            # Inside a nested function body, adding a line.
+            self.check(code, code.index('c + b'), 0, 'c *\n', options)
+            # Removing the semicolon joins two statements.
+            self.check(code, code.index('2;'), 2, '2', options)
+            # At the top level, across statements (ASI: `1(function ...`).
+            self.check(code, code.index('1\n'), 1, '1;', options)
+            self.check(code, code.index('a = a'), 0, 'x\n', options)
+            # Appending at the end and inserting at the start.
+            self.check(code, len(code), 0, 'b++', options)
+            self.check(code, 0, 0, '\n', options)
+
+    def test_skewed(self):
+        # Binary expressions starting with a string spanning lines, after
+        # the edit (see Parser.startNode).
+        options = {'range': True, 'loc': True}
+        code = 'var a;\n\nfoo = "x\\\ny" + bar;\nfoo = "x\\\ny" + \n bar * c;\n'
+        self.check(code, 0, 0, 'zz;', options)
+        self.check(code, 6, 0, '\nb;', options)
+
+    def test_empty(self):
+        options = {'range': True, 'loc': True, 'tokens': True}
+        # Typing into an empty or comment-only file, and emptying it.
+        code = self.check('', 0, 0, ' ', options)
+        code = self.check(code, 1, 0, '\n\n', options)
+        self.check(code, 3, 0, '// a\n', options)
+        self.check('// a\n', 4, 0, 'b', options)
+        self.check('a;\nb;\n', 2, 4, '', options)
+        self.check(' ', 0, 1, '', options)
+
+    def test_errors(self):
+        code = self.code
+        options = {'range': True}
+        self.assertRaises(Error, self.check, code, code.index('c + b'), 0, '}', options)
+        self.assertRaises(ValueError, reparse, parse(code, options), code, code, (0, 1, 2), options)
+
+
+class TestTokenStream(unittest.TestCase):
+    code = TestReparse.code + "if (a) /re/g.test(b); // done\n"
+
+    def test_edits(self):
+        options = {'range': True, 'loc': True, 'comment': True, 'tolerant': True}
+        code = self.code
+        stream = TokenStream(code, options, interval=4)
+        for needle, removed, inserted in (
+            ('c + b', 0, 'c *\n'),
+            # Opening a template swallows the rest of the line.
+            ('var b', 0, '`'),
+            ('`var b', 1, ''),
+            # The slash after `if (...)` starts a regular expression.
+            ('(a)', 0, 'x'),
+            ('x(a)', 1, ''),
+            ('', 0, '\n'),
+        ):
+            position = code.index(needle)
+            new = code[:position] + inserted + code[position + removed:]
+            start, end = stream.update(new, (position, position + removed, position + len(inserted)))
+            code = new
+            self.assertLessEqual(start, position)
+            self.assertEqual(toDict(tokenize(code, options)), [toDict(t) for t in stream])
+        self.assertRaises(ValueError, stream.update, code, (0, 1, 2))
+
+    def test_moved(self):
+        # Blocks after an edit are moved when reached, on one line or not.
+        options = {'range': True, 'loc': True, 'tolerant': True}
+        for code in (self.code, self.code.replace('\n', ' ')):
+            stream = TokenStream(code, options, interval=2)
+            for position, removed, inserted in (
+                (len(code) // 2, 0, 'x'), (len(code) // 2, 0, '\n'), (10, 0, 'y'), (len(code) - 5, 1, ''), (0, 0, ' \n'),
+            ):
+                position = code.index(' ', position)
+                code = code[:position] + inserted + code[position + removed:]
+                stream.update(code, (position, position + removed, position + len(inserted)))
+                start, end = position - 10, position + 20
+                self.assertEqual(
+                    [toDict(t) for t in stream.between(start, end)],
+                    [toDict(t) for t in tokenize(code, options) if t.range[1] > start and t.range[0] < end],
+                )
+            self.assertEqual(toDict(tokenize(code, options)), [toDict(t) for t in stream])
+
+
+class TestSkeleton(unittest.TestCase):
+    def test_skeleton(self):
+        code = (
+            "var a = `x${ {b: '}'} }y` / 2; // (\n"
+            "if (a) /[/]}/.test(a);\n"
+            "function f() {} /x/g; x = function () {} / 2;\n"
+            "--> html comment\n"
+            "f((1), [a /* ] */]);\n"
+        )
+        kinds = {
+            'String': Span.String, 'Template': Span.Template, 'RegularExpression': Span.RegularExpression,
+            'LineComment': Span.LineComment, 'BlockComment': Span.BlockComment,
+        }
+        tokens = tokenize(code, range=True, comment=True)
+        result = skeleton(code)
+        self.assertEqual(
+            list(result.literals()),
+            [(kinds[token.type],) + tuple(token.range) for token in tokens if token.type in kinds],
+        )
+        self.assertEqual(
+            [code[open] + code[close] for open, close in result.pairs()],
+            ['{}', '()', '()', '()', '{}', '()', '{}', '()', '()', '[]'],
+        )
+
+    def test_mismatched(self):
+        self.assertEqual(list(skeleton("a(b]) + [c").pairs()), [(1, 4), (8, -1)])
+        # Closers before any opener, the slashes read as the tokenizer does.
+        for code in (')/x/', '}/x/', 'a)}/x/ / 2'):
+            tokens = tokenize(code, range=True, tolerant=True)
+            self.assertEqual(
+                list(skeleton(code).literals()),
+                [(Span.RegularExpression,) + tuple(token.range) for token in tokens if token.type == 'RegularExpression'],
+            )
+
+
+class TestDependencies(unittest.TestCase):
+    def test_extract(self):
+        code = (
+            "import a, {b as c} from './x';\n"
+            "export {a, c as e};\n"
+            "export * from 'all';\n"
+            "export default function main() { require('./y'); return import('./z'); }\n"
+            "export const [h, {i}] = [1, {}], l = class { m() { import(m); } };\n"
+            "var s = \"import x from 'no'\"; // require('no')\n"
+            "foo.require('no'); import.meta;\n"
+            "const o = {import: 1, export: 2}, p = require(/* c */ 'p');\n"
+        )
+        self.assertEqual(
+            [
+                (d.type, d.source, code[d.range[0]:d.range[1]].split('\n')[0],
+                 [(s.local, s.imported or s.exported) for s in d.specifiers])
+                for d in extractDependencies(code, 'module')
+            ],
+            [
+                ('ImportDeclaration', './x', "import a, {b as c} from './x';", [('a', 'default'), ('c', 'b')]),
+                ('ExportNamedDeclaration', None, "export {a, c as e};", [('a', 'a'), ('c', 'e')]),
+                ('ExportAllDeclaration', 'all', "export * from 'all';", []),
+                ('ExportDefaultDeclaration', None, code.split('\n')[3], [('main', 'default')]),
+                ('RequireCall', './y', "require('./y')", []),
+                ('ImportCall', './z', "import('./z')", []),
+                ('ExportNamedDeclaration', None, code.split('\n')[4], [('h', 'h'), ('i', 'i'), ('l', 'l')]),
+                ('ImportCall', None, "import(m)", []),
+                ('RequireCall', 'p', "require(/* c */ 'p')", []),
+            ],
+        )
+        self.assertEqual(
+            [d.source for d in extractDependencies(code.replace('export ', ''), 'script')],
+            ['./y', './z', None, 'p'],
+        )
+
+
+class TestValidate(unittest.TestCase):
+    def test_validate(self):
+        cases = [
+            ('var a = function (b, c) { return b + c; };', {}),
+            ('"use strict"; var interface;', {}),
+            ('function f(a, a) { "use strict"; }', {}),
+            ('"use strict"; 010', {}),
+            ('with (a) {}', {'sourceType': 'module'}),
+            ('for (a in b) {} (a, b) => c; ({a} = b);', {}),
+            ('var if = 1; return', {'tolerant': True}),
+            ('<a b={c}>d</a>', {'jsx': True}),
+        ]
+        for code, options in cases:
+            try:
+                expected = parse(code, options).errors or []
+            except Error as e:
+                expected = [e.toDict()]
+            self.assertEqual(validate(code, options), expected, code)
+
+        self.assertEqual(validate('a +'), [{
+            'index': 3, 'lineNumber': 1, 'column': 4,
+            'message': 'Error: Line 1: Unexpected end of input',
+        }])
+
+
+class TestGraph(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.minPool = graph.MIN_POOL
+        graph.MIN_POOL = 1
+
+    def tearDown(self):
+        graph.MIN_POOL = self.minPool
+        shutil.rmtree(self.root)
+
+    def write(self, path, code):
+        path = os.path.join(self.root, path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(code)
+
+    def test_build(self):
+        self.write('a.js', "import b from './b';\nimport 'lodash';\n")
+        self.write('b.js', "export const c = require('./lib/c');\n")
+        self.write('lib/c.cjs', "import('../a.js'); require('./util');\n")
+        self.write('lib/util/index.js', "with (x) {}\n")
+        self.write('node_modules/x/index.js', "import a from '../../a';\n")
+        cache = os.path.join(self.root, '.cache.json')
+
+        result = graph.buildGraph(self.root, cache=cache, workers=2)
+        self.assertEqual(sorted(result.parsed), ['a.js', 'b.js', 'lib/c.cjs', 'lib/util/index.js'])
+        self.assertEqual(result.edges, {
+            'a.js': ['b.js'], 'b.js': ['lib/c.cjs'],
+            'lib/c.cjs': ['a.js', 'lib/util/index.js'], 'lib/util/index.js': [],
+        })
+        self.assertEqual(result.external['a.js'], ['lodash'])
+        self.assertEqual(result.cycles(), [['a.js', 'b.js', 'lib/c.cjs']])
+
+        # Only the changed file is parsed again.
+        self.write('b.js', "export const c = 1;\n")
+        result = graph.buildGraph(self.root, cache=cache)
+        self.assertEqual(result.parsed, ['b.js'])
+        self.assertEqual(result.edges['a.js'], ['b.js'])
+        self.assertEqual(result.cycles(), [])
+
+        # The cache of another source type is not used.
+        result = graph.buildGraph(self.root, cache=cache, sourceType='script')
+        self.assertEqual(len(result.parsed), 4)
+        self.assertEqual(result.edges['a.js'], [])
+
+        # Nor that of another tree.
+        graph.buildGraph(self.root, cache=cache)
+        other = tempfile.mkdtemp()
+        try:
+            shutil.copy(os.path.join(self.root, 'a.js'), other)
+            shutil.copystat(os.path.join(self.root, 'a.js'), os.path.join(other, 'a.js'))
+            result = graph.buildGraph(other, cache=cache)
+            self.assertEqual(result.parsed, ['a.js'])
+            self.assertEqual(result.external['a.js'], ['./b', 'lodash'])
+        finally:
+            shutil.rmtree(other)
+
+    def test_failures(self):
+        # Any failure of a file is recorded, the others being extracted.
+        def extract(code, sourceType):
+            if code == 'fail':
+                raise IndexError('list index out of range')
+            return extractDependencies(code, sourceType)
+        self.write('a.js', "fail")
+        self.write('b.js', "import './a';\n")
+        graph.extractDependencies = extract
+        try:
+            result = graph.buildGraph(self.root)
+        finally:
+            graph.extractDependencies = extractDependencies
+        self.assertEqual(sorted(result.parsed), ['a.js', 'b.js'])
+        self.assertEqual(result.errors, {'a.js': 'IndexError: list index out of range'})
+        self.assertEqual(result.edges['b.js'], ['a.js'])
+
+
+class TestParallel(unittest.TestCase):
+    def test_prescan(self):
+        code = (
+            "var a = 'x;}', b = `${ {c: 1} };\n`;\n"
+            "if (a) /;}/.test(b);\n"
+            "function f() {\n  return a;\n}\n"
+            "f() // ;\n"
+            "(f)();\n"
+            "/* } */ var c = f()\n"
+            "  / 2;\n"
+            "c++;\n"
+        )
+        self.assertEqual(
+            [code[start:code.index('\n', start)] for start in parallel.prescan(code)[0]],
+            ['if (a) /;}/.test(b);', 'function f() {', 'f() // ;', 'var c = f()', 'c++;'],
+        )
+
+    def setUp(self):
+        self.minChunk, self.minBody = parallel.MIN_CHUNK, parallel.MIN_BODY
+        parallel.MIN_CHUNK = parallel.MIN_BODY = 1024
+
+    def tearDown(self):
+        parallel.MIN_CHUNK, parallel.MIN_BODY = self.minChunk, self.minBody
+
+    def test_parse(self):
+        code = "'use strict';\n" + ''.join(
+            "var a%d = function (b) { return /[;}]/.test(b) ? `${b}` : b; }; // %d\n" % (i, i)
+            for i in range(200)
+        )
+        options = {'range': True, 'loc': True, 'tokens': True, 'comment': True}
+        self.assertEqual(toDict(parse(code, options)), toDict(parse(code, options, workers=2)))
+        self.assertEqual(toDict(parse(code, options)), toDict(parse(code, options, workers=2, shared=True)))
+        # Errors are reported as by a sequential parse.
+        code = code.replace('// 100\n', '// 100\n/')
+        self.assertRaises(Error, parse, code, options, workers=2)
+        self.assertRaises(Error, parse, code, options, workers=2, shared=True)
+
+    def test_parse_bundle(self):
+        statements = ''.join("var a%d = b ? /}/.test(b) : {c: `${b}`}; // %d\n" % (i, i) for i in range(40))
+        code = (
+            "(function (global) {\n"
+            "function f(b) {\n'use strict';\n" + statements + "return a0;\n}\n"
+            "var g = function* (b) {\n" + statements + "yield a0;\n};\n"
+            "async function h(b) {\n" + statements + "await a0;\n}\n"
+            "var i = function (b) {\n" + statements + "with (b) {}\n};\n"
+            "})(this);\n"
+        )
+        options = {'range': True, 'loc': True, 'tokens': True, 'comment': True}
+        self.assertEqual(toDict(parse(code, options)), toDict(parse(code, options, workers=2)))
+        # Errors are reported as by a sequential parse.
+        code = code.replace('with (b)', "'use strict'; with (b)").replace('// 39\n', '// 39\n/', 1)
+        self.assertRaises(Error, parse, code, options, workers=2)
+
+
 # class TestThirdParty(unittest.TestCase):
 #     pass
 
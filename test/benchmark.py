@@ -0,0 +1,582 @@
+# -*- coding: utf-8 -*-
+# Copyright JS Foundation and other contributors, https://js.foundation/
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#   * Redistributions of source code must retain the above copyright
+#     notice, this list of conditions and the following disclaimer.
+#   * Redistributions in binary form must reproduce the above copyright
+#     notice, this list of conditions and the following disclaimer in the
+#     documentation and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF
+# THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import absolute_import, print_function, unicode_literals
+
+import io
+import os
+import json
+import sys
+import time
+import fnmatch
+
+from esprima import BodyCache, Error, LineIndex, ParseCache, parse, parseModule, reparse, serialize, deserialize, shareTree, attachTree, load, tokenize, TokenStream, skeleton, extractDependencies, structuralHash, validate, toDict
+from esprima.factory import NodeFactory
+from esprima.syntax import Syntax
+from esprima.visitor import NodeVisitor, Visited
+
+BASE_DIR = os.path.dirname(__file__)
+
+timer = getattr(time, 'perf_counter', time.time)
+
+BENCHMARKS = []
+
+
+def benchmark(func):
+    """Register a benchmark. The function prepares its input and returns the
+    callable to be timed."""
+    BENCHMARKS.append(func)
+    return func
+
+
+def thirdParty(name):
+    with io.open(os.path.join(BASE_DIR, '3rdparty', name), encoding='utf-8') as f:
+        return f.read()
+
+
+def measure(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = timer()
+        func()
+        times.append(timer() - start)
+    return min(times), sum(times) / len(times)
+
+
+@benchmark
+def statements():
+    """Statement-dense script (YUI 3.12.0)"""
+    code = thirdParty('yui-3.12.0.js')
+    return lambda: parse(code)
+
+
+class SlottedIdentifier(object):
+    __slots__ = ('type', 'name', 'range', 'loc')
+
+    def __init__(self, name):
+        self.type = Syntax.Identifier
+        self.name = name
+
+
+class SlottedLiteral(object):
+    __slots__ = ('type', 'value', 'raw', 'regex', 'range', 'loc')
+
+    def __init__(self, value, raw):
+        self.type = Syntax.Literal
+        self.value = value
+        self.raw = raw
+        self.regex = None
+
+
+class SlottedFactory(NodeFactory):
+    Identifier = SlottedIdentifier
+    Literal = SlottedLiteral
+
+
+@benchmark
+def factory_slotted():
+    """Statement-dense script, identifiers and literals built as slotted objects"""
+    code = thirdParty('yui-3.12.0.js')
+    factory = SlottedFactory()
+    return lambda: parse(code, nodeFactory=factory)
+
+
+@benchmark
+def strict_checked():
+    """Strict-mode library, early errors checked"""
+    code = '"use strict";' + thirdParty('jquery-1.9.1.js')
+    return lambda: parse(code)
+
+
+@benchmark
+def strict_trusted():
+    """Strict-mode library, trusted"""
+    code = '"use strict";' + thirdParty('jquery-1.9.1.js')
+    return lambda: parse(code, trusted=True)
+
+
+@benchmark
+def data_literals():
+    """Literal-only object and array fixture (var DATA = {...})"""
+    rows = [
+        {
+            'id': i,
+            'name': 'item %d' % i,
+            'price': i * 0.25,
+            'active': i % 3 == 0,
+            'parent': None,
+            'tags': ['a', 'b', 'c'][:i % 4],
+            'size': [i % 7, i % 11, i % 13],
+        }
+        for i in range(3000)
+    ]
+    code = 'var DATA = %s;' % json.dumps({'version': 1, 'rows': rows}, indent=1)
+    return lambda: parse(code)
+
+
+def editorSource():
+    # About 1 MB of real-world code.
+    return '\n'.join(thirdParty(name) for name in (
+        'jquery-1.9.1.js', 'yui-3.12.0.js', 'mootools-1.4.5.js',
+        'benchmark.js', 'backbone-1.1.0.js', 'underscore-1.5.2.js',
+    ))
+
+
+def vendorSource():
+    # Concatenated libraries, about 1.7 MB in a hundred top-level statements.
+    return '\n'.join(thirdParty(name) for name in (
+        'jquery-1.9.1.js', 'yui-3.12.0.js', 'mootools-1.4.5.js', 'benchmark.js',
+        'backbone-1.1.0.js', 'underscore-1.5.2.js', 'angular-1.2.5.js',
+    ))
+
+
+@benchmark
+def vendor_sequential():
+    """Parse of concatenated libraries"""
+    code = vendorSource()
+    return lambda: parse(code, range=True, loc=True)
+
+
+@benchmark
+def vendor_parallel():
+    """Parse of concatenated libraries, statements split among processes"""
+    import multiprocessing
+    code = vendorSource()
+    workers = max(2, multiprocessing.cpu_count())
+    return lambda: parse(code, range=True, loc=True, workers=workers)
+
+
+@benchmark
+def vendor_parallel_shared():
+    """Parse of concatenated libraries, statements split among processes and shared"""
+    import multiprocessing
+    code = vendorSource()
+    workers = max(2, multiprocessing.cpu_count())
+    return lambda: parse(code, range=True, loc=True, workers=workers, shared=True)
+
+
+LIBRARIES = ['angular-1.2.5.js', 'backbone-1.1.0.js', 'jquery-1.9.1.js', 'underscore-1.5.2.js']
+
+
+def parseLibrary(name):
+    return parse(thirdParty(name), range=True, loc=True)
+
+
+def shareLibrary(name):
+    return shareTree(parseLibrary(name))
+
+
+def poolParse(function, receive):
+    import multiprocessing
+    pool = multiprocessing.Pool(2)
+    try:
+        return [receive(result) for result in pool.map(function, LIBRARIES, chunksize=1)]
+    finally:
+        pool.terminate()
+
+
+@benchmark
+def transfer_pickle():
+    """Parse of libraries in worker processes, sent back pickled"""
+    return lambda: poolParse(parseLibrary, lambda tree: tree.body[0])
+
+
+@benchmark
+def transfer_shared():
+    """Parse of libraries in worker processes, shared, first statements read"""
+    return lambda: poolParse(shareLibrary, lambda shared: attachTree(shared).body[0])
+
+
+@benchmark
+def transfer_shared_all():
+    """Parse of libraries in worker processes, shared, all statements read"""
+    return lambda: poolParse(shareLibrary, lambda shared: list(attachTree(shared).body))
+
+
+@benchmark
+def bundle_sequential():
+    """Parse of a library wrapped in a single function"""
+    code = thirdParty('jquery.mobile-1.4.2.js')
+    return lambda: parse(code, range=True, loc=True)
+
+
+@benchmark
+def bundle_parallel():
+    """Parse of a library wrapped in a single function, bodies split among processes"""
+    import multiprocessing
+    code = thirdParty('jquery.mobile-1.4.2.js')
+    workers = max(2, multiprocessing.cpu_count())
+    return lambda: parse(code, range=True, loc=True, workers=workers)
+
+
+@benchmark
+def keystroke_full():
+    """Full parse after a keystroke in a 1 MB file"""
+    code = editorSource()
+    return lambda: parse(code, range=True, loc=True)
+
+
+@benchmark
+def keystroke_reparse():
+    """Incremental reparse after a keystroke in a 1 MB file"""
+    code = editorSource()
+    # Typing at the start of a variable name in the middle of the file.
+    position = code.index('var ', len(code) // 2) + 4
+    state = [parse(code, range=True, loc=True), code]
+
+    def keystroke():
+        tree, old = state
+        new = old[:position] + 'x' + old[position:]
+        state[:] = [reparse(tree, old, new, (position, position, position + 1), range=True, loc=True), new]
+
+    return keystroke
+
+
+@benchmark
+def keystroke_tokenize():
+    """Full tokenize after a keystroke in a 1 MB file"""
+    code = editorSource()
+    return lambda: tokenize(code, range=True, loc=True)
+
+
+@benchmark
+def keystroke_retokenize():
+    """Token stream update after a keystroke in a 1 MB file"""
+    code = editorSource()
+    position = code.index('var ', len(code) // 2) + 4
+    stream = TokenStream(code, range=True, loc=True)
+    state = [code]
+
+    def keystroke():
+        old, = state
+        new = old[:position] + 'x' + old[position:]
+        stream.update(new, (position, position, position + 1))
+        state[:] = [new]
+
+    return keystroke
+
+
+@benchmark
+def structure_tokenize():
+    """Tokenization of a library, comments included"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: tokenize(code, comment=True)
+
+
+@benchmark
+def structure_skeleton():
+    """Brackets and literal spans of a library"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: skeleton(code)
+
+
+def vendoredSources():
+    # Files bundling the same libraries after code of their own.
+    return [
+        "var config%d = {id: %d, name: 'file%d'};\n%s\n%s" % (
+            i, i, i, thirdParty('underscore-1.5.2.js'), thirdParty('backbone-1.1.0.js'),
+        )
+        for i in range(10)
+    ]
+
+
+@benchmark
+def vendored_parse():
+    """Parse of 10 files bundling the same libraries"""
+    sources = vendoredSources()
+    return lambda: [parse(code, range=True, loc=True) for code in sources]
+
+
+@benchmark
+def vendored_cached():
+    """Parse of 10 files bundling the same libraries, function bodies cached"""
+    sources = vendoredSources()
+
+    def run():
+        cache = BodyCache()
+        return [parse(code, range=True, loc=True, bodyCache=cache) for code in sources]
+
+    return run
+
+
+def templateSnippets():
+    # The expressions and handlers of a template rendered 50 times.
+    snippets = [
+        'item.name', 'item.price * (1 + tax)', 'items.length > 0 && !loading',
+        'onClick(function (event) { event.preventDefault(); select(item.id); })',
+        'format(item.date, "YYYY-MM-DD")', '`${user.first} ${user.last}`',
+    ]
+    return snippets * 50
+
+
+@benchmark
+def snippets_parse():
+    """Parse of template expressions, repeated"""
+    snippets = templateSnippets()
+    return lambda: [parse(code, range=True) for code in snippets]
+
+
+@benchmark
+def snippets_cached():
+    """Parse of template expressions, repeated, through a ParseCache"""
+    snippets = templateSnippets()
+
+    def run():
+        cache = ParseCache()
+        return [cache.parse(code, range=True) for code in snippets]
+
+    return run
+
+
+@benchmark
+def snippets_frozen():
+    """Parse of template expressions, repeated, through a frozen ParseCache"""
+    snippets = templateSnippets()
+
+    def run():
+        cache = ParseCache(frozen=True)
+        return [cache.parse(code, range=True) for code in snippets]
+
+    return run
+
+
+@benchmark
+def loc_eager():
+    """Parse of a library with locations"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: parse(code, range=True, loc=True)
+
+
+@benchmark
+def loc_lazy():
+    """Parse of a library with locations derived from ranges when read"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: parse(code, loc='lazy')
+
+
+@benchmark
+def loc_compact():
+    """Parse of a library with locations packed in an integer per node"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: parse(code, range=True, loc=True, compact=True)
+
+
+@benchmark
+def lines_index():
+    """Line index of 10 MB of code"""
+    code = thirdParty('jquery-1.9.1.js') * 40
+    return lambda: LineIndex(code)
+
+
+@benchmark
+def lines_positions():
+    """Lines and columns of the offsets of the tokens of 10 MB of code"""
+    code = thirdParty('jquery-1.9.1.js')
+    offsets = [token.range[0] for token in tokenize(code, range=True)]
+    index = LineIndex(code * 40)
+    offsets = [offset + i * len(code) for i in range(40) for offset in offsets]
+    return lambda: index.positions(offsets)
+
+
+def stringTable():
+    words = thirdParty('jquery-1.9.1.js').split()[:3000]
+    return 'var messages = {\n%s\n};\n' % '\n'.join(
+        '  key%d: %s,' % (i, json.dumps('\n'.join(words[(i * 7 + j * 13) % len(words)] for j in range(6))))
+        for i in range(20000)
+    )
+
+
+@benchmark
+def literals_eager():
+    """Parse of a table of 20000 strings with escapes"""
+    code = stringTable()
+    return lambda: parse(code)
+
+
+@benchmark
+def literals_lazy():
+    """Parse of a table of 20000 strings with escapes, cooked when read"""
+    code = stringTable()
+    return lambda: parse(code, lazyValues=True)
+
+
+@benchmark
+def hashes_finalize():
+    """Parse of a library hashing each node as it is created"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: parse(code, hashes=True)
+
+
+@benchmark
+def hashes_traversal():
+    """Parse of a library, then hashing of its tree"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: structuralHash(parse(code))
+
+
+@benchmark
+def serialize_json():
+    """JSON dump of a library tree with locations"""
+    tree = parse(thirdParty('jquery-1.9.1.js'), range=True, loc=True)
+    return lambda: json.dumps(toDict(tree), default=lambda o: {})
+
+
+@benchmark
+def serialize_binary():
+    """Binary serialization of a library tree with locations"""
+    tree = parse(thirdParty('jquery-1.9.1.js'), range=True, loc=True)
+    return lambda: serialize(tree)
+
+
+@benchmark
+def deserialize_binary():
+    """Binary deserialization of a library tree with locations"""
+    data = serialize(parse(thirdParty('jquery-1.9.1.js'), range=True, loc=True))
+    return lambda: deserialize(data)
+
+
+@benchmark
+def load_parse():
+    """Parse of a library with locations"""
+    code = thirdParty('jquery-1.9.1.js')
+    return lambda: parse(code, range=True, loc=True)
+
+
+@benchmark
+def load_json():
+    """Load of the ESTree JSON of a library with locations"""
+    tree = parse(thirdParty('jquery-1.9.1.js'), range=True, loc=True)
+    data = json.dumps(toDict(tree), default=lambda o: {})
+    return lambda: load(io.StringIO(data))
+
+
+@benchmark
+def check_parse():
+    """Syntax check of a library by a parse discarding the tree"""
+    code = thirdParty('angular-1.2.5.js')
+    return lambda: parse(code)
+
+
+@benchmark
+def check_validate():
+    """Syntax check of a library by validate"""
+    code = thirdParty('angular-1.2.5.js')
+    return lambda: validate(code)
+
+
+def moduleSource():
+    # Libraries exported from a module, with a few imports and requires.
+    names = ('jquery-1.9.1.js', 'backbone-1.1.0.js', 'underscore-1.5.2.js')
+    return ''.join(
+        "import {a%d, b%d as c%d} from './dep%d';\n" % (i, i, i, i) for i in range(20)
+    ) + ''.join(
+        "export function lib%d() {\nvar dep = require('./lib%d');\n%s\n}\n" % (i, i, thirdParty(name))
+        for i, name in enumerate(names)
+    )
+
+
+class DependencyVisitor(NodeVisitor):
+    def __init__(self):
+        self.sources = []
+
+    def visit_ImportDeclaration(self, node):
+        self.sources.append(node.source.value)
+        yield Visited(node)
+
+    def visit_CallExpression(self, node):
+        if node.callee.type == 'Import' or node.callee.name == 'require':
+            if node.arguments and node.arguments[0].type == 'Literal':
+                self.sources.append(node.arguments[0].value)
+        yield node.__dict__
+        yield Visited(node)
+
+
+def parseFallback(code):
+    try:
+        return parse(code)
+    except Error:
+        return parseModule(code)
+
+
+@benchmark
+def source_fallback():
+    """Parse of a library ending with an export, as a script then as a module"""
+    code = thirdParty('jquery-1.9.1.js') + '\nexport default jQuery;\n'
+    return lambda: parseFallback(code)
+
+
+@benchmark
+def source_unambiguous():
+    """Parse of a library ending with an export, with sourceType 'unambiguous'"""
+    code = thirdParty('jquery-1.9.1.js') + '\nexport default jQuery;\n'
+    return lambda: parse(code, sourceType='unambiguous')
+
+
+@benchmark
+def dependencies_visitor():
+    """Module dependencies found by parseModule and a visitor"""
+    code = moduleSource()
+
+    def extract():
+        visitor = DependencyVisitor()
+        visitor.visit(parseModule(code))
+        return visitor.sources
+
+    return extract
+
+
+@benchmark
+def dependencies_extract():
+    """Module dependencies found by extractDependencies"""
+    code = moduleSource()
+    return lambda: extractDependencies(code, 'module')
+
+
+def main(argv=None):
+    import optparse
+
+    usage = "usage: %prog [options] [benchmark-pattern...]"
+    parser = optparse.OptionParser(usage=usage, prog='python -m test.benchmark')
+    parser.add_option("--repeat", dest="repeat", default=5, type='int',
+                      help="Number of timed runs per benchmark [default: %default]")
+    parser.add_option("--list", dest="list", default=False,
+                      action="store_true",
+                      help="List the available benchmarks")
+    opts, args = parser.parse_args(argv)
+
+    selected = [
+        func for func in BENCHMARKS
+        if not args or any(fnmatch.fnmatch(func.__name__, pattern) for pattern in args)
+    ]
+
+    for func in selected:
+        if opts.list:
+            print("%-24s %s" % (func.__name__, func.__doc__))
+            continue
+        best, mean = measure(func(), opts.repeat)
+        print("%-24s best %8.3fs  mean %8.3fs  %s" % (func.__name__, best, mean, func.__doc__))
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    sys.exit(main())